@@ -78,6 +78,11 @@ function run-mock {
     wait $MOTO_PID
 }
 
+# (example) ./run.sh benchmark client-reuse --iterations 200
+function benchmark {
+    python "$THIS_DIR/scripts/benchmark.py" "$@"
+}
+
 # run linting, formatting, and other static code quality tools
 function lint {
     pre-commit run --all-files
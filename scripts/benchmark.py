@@ -0,0 +1,506 @@
+# pylint: disable=invalid-name
+"""
+Micro-benchmarks for the files API.
+
+Each benchmark is a sub-command, e.g.
+
+    python scripts/benchmark.py client-reuse --iterations 200
+
+By default the benchmarks run against an in-process mocked S3 (``moto.mock_aws``),
+so they need no AWS credentials. Pass ``--no-mock`` to run against whatever endpoint
+boto3 resolves instead, e.g. the moto server started by ``./run.sh run-mock``:
+
+    AWS_ENDPOINT_URL=http://localhost:5000 python scripts/benchmark.py client-reuse --no-mock
+
+Numbers are only meaningful relative to each other on the same machine.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import tarfile
+import time
+from typing import (
+    Callable,
+    Iterator,
+)
+
+import boto3
+import httpx
+from fastapi import (
+    FastAPI,
+    Request,
+    Response,
+)
+from fastapi.responses import (
+    JSONResponse,
+    StreamingResponse,
+)
+from fastapi.testclient import TestClient
+
+from files_api.main import create_app
+from files_api.middleware import RequestLifecycleMiddleware
+from files_api.s3.read_objects import (
+    fetch_s3_object,
+    object_exists_in_s3,
+)
+from files_api.settings import Settings
+
+BENCHMARK_BUCKET_NAME = "benchmark-bucket"
+SMALL_FILE_KEY = "small-file.txt"
+SMALL_FILE_CONTENT = b"x" * 1024
+
+
+def main() -> None:
+    args = parse_args()
+    with s3_environment(use_mock=args.mock):
+        args.func(args)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--no-mock",
+        dest="mock",
+        action="store_false",
+        help="Use the S3 endpoint boto3 resolves (e.g. AWS_ENDPOINT_URL) instead of an in-process mock.",
+    )
+    subparsers = parser.add_subparsers(required=True)
+
+    client_reuse = subparsers.add_parser(
+        "client-reuse",
+        help="Compare creating a boto3 client per call against reusing the app's shared client.",
+    )
+    client_reuse.add_argument("--iterations", type=int, default=200)
+    client_reuse.set_defaults(func=benchmark_client_reuse)
+
+    concurrency = subparsers.add_parser(
+        "concurrency",
+        help="Compare blocking S3 calls on the event loop against offloading them to a bounded thread pool.",
+    )
+    concurrency.add_argument("--requests", type=int, default=500)
+    concurrency.add_argument("--concurrency", type=int, default=50)
+    concurrency.set_defaults(func=benchmark_concurrency)
+
+    download = subparsers.add_parser(
+        "download",
+        help="Measure large-file download throughput (MB/s per worker) for several download chunk sizes.",
+    )
+    download.add_argument("--size-mb", type=int, default=64)
+    download.add_argument("--iterations", type=int, default=5)
+    download.add_argument(
+        "--chunk-sizes-kb",
+        type=int,
+        nargs="+",
+        default=[64, 256, 1024, 8192],
+        help="Values of DOWNLOAD_CHUNK_SIZE_BYTES to compare, in KiB.",
+    )
+    download.set_defaults(func=benchmark_download)
+
+    listing = subparsers.add_parser(
+        "listing",
+        help="Compare repeated `GET /v1/files` requests with and without the listing cache.",
+    )
+    listing.add_argument("--files", type=int, default=1000)
+    listing.add_argument("--iterations", type=int, default=200)
+    listing.set_defaults(func=benchmark_listing)
+
+    list_all = subparsers.add_parser(
+        "list-all",
+        help="Compare enumerating a large prefix by paging through `GET /v1/files` against `GET /v1/listings`.",
+    )
+    list_all.add_argument("--files", type=int, default=100_000)
+    list_all.add_argument("--sub-directories", type=int, default=100)
+    list_all.add_argument("--max-concurrent-shards", type=int, default=8)
+    list_all.set_defaults(func=benchmark_list_all)
+
+    bulk_upload = subparsers.add_parser(
+        "bulk-upload",
+        help="Compare uploading many small files with one `PUT /v1/files` each against the batch upload endpoints.",
+    )
+    bulk_upload.add_argument("--files", type=int, default=1000)
+    bulk_upload.add_argument("--file-size-kb", type=int, default=4)
+    bulk_upload.set_defaults(func=benchmark_bulk_upload)
+
+    archive = subparsers.add_parser(
+        "archive",
+        help="Compare downloading a directory file by file against one `GET /v1/archives` stream.",
+    )
+    archive.add_argument("--files", type=int, default=1000)
+    archive.add_argument("--file-size-kb", type=int, default=16)
+    archive.add_argument("--max-concurrent-objects", type=int, nargs="+", default=[1, 8])
+    archive.set_defaults(func=benchmark_archive)
+
+    middleware = subparsers.add_parser(
+        "middleware",
+        help="Compare the per-request overhead and streaming of `BaseHTTPMiddleware` against a pure ASGI middleware.",
+    )
+    middleware.add_argument("--requests", type=int, default=5000)
+    middleware.add_argument("--concurrency", type=int, default=50)
+    middleware.add_argument("--stream-size-mb", type=int, default=256)
+    middleware.set_defaults(func=benchmark_middleware)
+
+    return parser.parse_args()
+
+
+@contextlib.contextmanager
+def s3_environment(use_mock: bool) -> Iterator[None]:
+    """Create the benchmark bucket, optionally inside a mocked AWS environment."""
+    mock = contextlib.nullcontext()
+    if use_mock:
+        from moto import mock_aws  # pylint: disable=import-outside-toplevel
+
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+        os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+        mock = mock_aws()
+
+    with mock:
+        s3_client = boto3.client("s3")
+        s3_client.create_bucket(Bucket=BENCHMARK_BUCKET_NAME)
+        s3_client.put_object(Bucket=BENCHMARK_BUCKET_NAME, Key=SMALL_FILE_KEY, Body=SMALL_FILE_CONTENT)
+        yield
+
+
+def report(name: str, iterations: int, func: Callable[[], None]) -> float:
+    """Call ``func`` ``iterations`` times and print the throughput."""
+    func()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    elapsed = time.perf_counter() - start
+    per_second = iterations / elapsed
+    print(f"{name:<48} {per_second:>10.1f} ops/s  {1000 * elapsed / iterations:>8.2f} ms/op")
+    return per_second
+
+
+def benchmark_client_reuse(args: argparse.Namespace) -> None:
+    """Time the S3 calls made by `GET /v1/files/{path}` with and without a shared client."""
+
+    def new_client_per_call() -> None:
+        # what the routes used to do: every helper built its own client
+        object_exists_in_s3(BENCHMARK_BUCKET_NAME, SMALL_FILE_KEY)
+        fetch_s3_object(BENCHMARK_BUCKET_NAME, SMALL_FILE_KEY)["Body"].read()
+
+    shared_client = boto3.client("s3")
+
+    def shared_client_for_all_calls() -> None:
+        object_exists_in_s3(BENCHMARK_BUCKET_NAME, SMALL_FILE_KEY, s3_client=shared_client)
+        fetch_s3_object(BENCHMARK_BUCKET_NAME, SMALL_FILE_KEY, s3_client=shared_client)["Body"].read()
+
+    before = report("new client per call (head + get)", args.iterations, new_client_per_call)
+    after = report("shared client (head + get)", args.iterations, shared_client_for_all_calls)
+    print(f"speedup: {after / before:.1f}x")
+
+    app = create_app(settings=Settings(s3_bucket_name=BENCHMARK_BUCKET_NAME))
+    with TestClient(app) as client:
+        report(
+            f"GET /v1/files/{SMALL_FILE_KEY} through the app",
+            args.iterations,
+            lambda: client.get(f"/v1/files/{SMALL_FILE_KEY}").raise_for_status(),
+        )
+
+
+def benchmark_concurrency(args: argparse.Namespace) -> None:
+    """Fire many concurrent `GET /v1/files/{path}` requests at one app instance (i.e. one worker).
+
+    The app is driven in-process through ``httpx.ASGITransport`` so only the app's own
+    event loop is measured. S3 latency only overlaps between requests when the S3 calls
+    leave the event loop, so run this with ``--no-mock`` against the moto server from
+    ``./run.sh run-mock`` (or real S3) to see the difference.
+    """
+    for io_mode in ("blocking", "threadpool"):
+        settings = Settings(
+            s3_bucket_name=BENCHMARK_BUCKET_NAME,
+            s3_io_mode=io_mode,
+            s3_max_concurrency=args.concurrency,
+            s3_max_pool_connections=args.concurrency,
+        )
+        app = create_app(settings=settings)
+        latencies, elapsed = asyncio.run(
+            fire_concurrent_requests(
+                app=app,
+                path=f"/v1/files/{SMALL_FILE_KEY}",
+                total_requests=args.requests,
+                concurrency=args.concurrency,
+            )
+        )
+        latencies.sort()
+        print(
+            f"s3_io_mode={io_mode:<12} {args.requests / elapsed:>8.1f} req/s"
+            f"  p50={1000 * statistics.median(latencies):.1f}ms"
+            f"  p99={1000 * latencies[int(0.99 * (len(latencies) - 1))]:.1f}ms"
+        )
+
+
+def benchmark_download(args: argparse.Namespace) -> None:
+    """Download one large file repeatedly through `GET /v1/files/{path}`, in a single worker.
+
+    As a baseline, the same object is also read by iterating botocore's ``StreamingBody``
+    directly, which is what handing it to ``StreamingResponse`` used to do.
+    """
+    key = "large-file.bin"
+    size = args.size_mb * 1024 * 1024
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=BENCHMARK_BUCKET_NAME, Key=key, Body=os.urandom(size))
+
+    def report_throughput(name: str, download: Callable[[], int]) -> None:
+        download()  # warm up
+        start = time.perf_counter()
+        for _ in range(args.iterations):
+            assert download() == size
+        elapsed = time.perf_counter() - start
+        print(f"{name:<48} {args.iterations * args.size_mb / elapsed:>10.1f} MB/s")
+
+    def iterate_streaming_body() -> int:
+        return sum(len(chunk) for chunk in fetch_s3_object(BENCHMARK_BUCKET_NAME, key, s3_client=s3_client)["Body"])
+
+    report_throughput("StreamingBody default iteration (no app)", iterate_streaming_body)
+
+    for chunk_size_kb in args.chunk_sizes_kb:
+        settings = Settings(s3_bucket_name=BENCHMARK_BUCKET_NAME, download_chunk_size_bytes=chunk_size_kb * 1024)
+        app = create_app(settings=settings)
+        report_throughput(
+            f"GET /v1/files/{key}, {chunk_size_kb} KiB chunks",
+            lambda: asyncio.run(download_through_app(app, f"/v1/files/{key}")),
+        )
+
+
+def benchmark_listing(args: argparse.Namespace) -> None:
+    """Time the first page of a listing, requested over and over, and a client following page tokens."""
+    s3_client = boto3.client("s3")
+    for i in range(args.files):
+        s3_client.put_object(Bucket=BENCHMARK_BUCKET_NAME, Key=f"listing/file-{i:06}.txt", Body=b"x")
+
+    for listing_cache_ttl_seconds in (0.0, 60.0):
+        settings = Settings(s3_bucket_name=BENCHMARK_BUCKET_NAME, listing_cache_ttl_seconds=listing_cache_ttl_seconds)
+        with TestClient(create_app(settings=settings)) as client:
+            label = "listing cache" if listing_cache_ttl_seconds else "no cache"
+            report(
+                f"GET /v1/files?directory=listing/ ({label})",
+                args.iterations,
+                lambda: client.get("/v1/files", params={"directory": "listing/", "page_size": 100}).raise_for_status(),
+            )
+
+            def follow_page_tokens() -> None:
+                response = client.get("/v1/files", params={"directory": "listing/"}).json()
+                for _ in range(10):
+                    response = client.get("/v1/files", params={"page_token": response["next_page_token"]}).json()
+
+            report(
+                f"first 11 pages following page tokens ({label})", max(args.iterations // 10, 1), follow_page_tokens
+            )
+
+
+def benchmark_list_all(args: argparse.Namespace) -> None:
+    """Enumerate every key under one prefix: page by page, then as an NDJSON stream, sequential and sharded.
+
+    Keys are spread over ``--sub-directories`` sub-prefixes, which `GET /v1/listings` lists concurrently.
+    """
+    s3_client = boto3.client("s3")
+    for i in range(args.files):
+        key = f"list-all/dir-{i % args.sub_directories:04}/file-{i:07}.txt"
+        s3_client.put_object(Bucket=BENCHMARK_BUCKET_NAME, Key=key, Body=b"")
+
+    with TestClient(create_app(settings=Settings(s3_bucket_name=BENCHMARK_BUCKET_NAME))) as client:
+        start = time.perf_counter()
+        response = client.get("/v1/files", params={"directory": "list-all/", "page_size": 100}).json()
+        listed, requests = len(response["files"]), 1
+        while response["next_page_token"]:
+            response = client.get("/v1/files", params={"page_token": response["next_page_token"]}).json()
+            listed, requests = listed + len(response["files"]), requests + 1
+        elapsed = time.perf_counter() - start
+        print(
+            f"{'GET /v1/files, following page tokens':<48} {listed:>8} files {requests:>6} requests {elapsed:>8.2f} s"
+        )
+
+    for max_concurrent_shards in (1, args.max_concurrent_shards):
+        settings = Settings(s3_bucket_name=BENCHMARK_BUCKET_NAME, listing_max_concurrent_shards=max_concurrent_shards)
+        with TestClient(create_app(settings=settings)) as client:
+            start = time.perf_counter()
+            with client.stream("GET", "/v1/listings", params={"directory": "list-all/"}) as response:
+                listed = sum(1 for line in response.iter_lines() if line)
+            elapsed = time.perf_counter() - start
+            name = f"GET /v1/listings, {max_concurrent_shards} concurrent shards"
+            print(f"{name:<48} {listed:>8} files {1:>6} requests {elapsed:>8.2f} s")
+
+
+def benchmark_bulk_upload(args: argparse.Namespace) -> None:
+    """Upload ``--files`` small files one request per file, as one multipart form, and as one tar archive."""
+    content = b"x" * (args.file_size_kb * 1024)
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        for i in range(args.files):
+            info = tarfile.TarInfo(f"file-{i:06}.txt")
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    def report_files_per_second(name: str, upload: Callable[[str], None]) -> None:
+        # every variant creates new files
+        start = time.perf_counter()
+        upload(f"bulk-upload/{upload.__name__}/")
+        elapsed = time.perf_counter() - start
+        print(f"{name:<48} {args.files / elapsed:>10.1f} files/s  {elapsed:>8.2f} s")
+
+    settings = Settings(s3_bucket_name=BENCHMARK_BUCKET_NAME, upload_use_conditional_put=True)
+    with TestClient(create_app(settings=settings)) as client:
+
+        def one_put_per_file(directory: str) -> None:
+            for i in range(args.files):
+                client.put(
+                    f"/v1/files/{directory}file-{i:06}.txt", files={"file": ("file.txt", content, "text/plain")}
+                ).raise_for_status()
+
+        def multipart_forms(directory: str) -> None:
+            # a form holds at most 1000 files
+            for start in range(0, args.files, 1000):
+                files = [("files", (f"file-{i:06}.txt", content, "text/plain")) for i in range(start, start + 1000)]
+                client.post(
+                    "/v1/bulk/upload", data={"directory": directory}, files=files[: args.files - start]
+                ).raise_for_status()
+
+        def tar_archive(directory: str) -> None:
+            client.post(
+                "/v1/bulk/upload/tar", params={"directory": directory}, content=archive.getvalue()
+            ).raise_for_status()
+
+        report_files_per_second("PUT /v1/files, one request per file", one_put_per_file)
+        report_files_per_second("POST /v1/bulk/upload, 1000 files per request", multipart_forms)
+        report_files_per_second("POST /v1/bulk/upload/tar, one request", tar_archive)
+
+
+def benchmark_archive(args: argparse.Namespace) -> None:
+    """Download every file of a directory: listing it and getting each file, then as zip and tar archives."""
+    s3_client = boto3.client("s3")
+    content = b"x" * (args.file_size_kb * 1024)
+    for i in range(args.files):
+        s3_client.put_object(Bucket=BENCHMARK_BUCKET_NAME, Key=f"archive/file-{i:06}.txt", Body=content)
+
+    def report_download(name: str, download: Callable[[], tuple[int, int]]) -> None:
+        start = time.perf_counter()
+        received, requests = download()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<48} {received / elapsed / 1e6:>8.1f} MB/s {requests:>6} requests {elapsed:>8.2f} s")
+
+    with TestClient(create_app(settings=Settings(s3_bucket_name=BENCHMARK_BUCKET_NAME))) as client:
+
+        def file_by_file() -> tuple[int, int]:
+            received, requests = 0, 1
+            response = client.get("/v1/files", params={"directory": "archive/", "page_size": 100}).json()
+            while True:
+                for file in response["files"]:
+                    received, requests = (
+                        received + len(client.get(f"/v1/files/{file['file_path']}").content),
+                        requests + 1,
+                    )
+                if not response["next_page_token"]:
+                    return received, requests
+                response = client.get("/v1/files", params={"page_token": response["next_page_token"]}).json()
+                requests += 1
+
+        report_download("GET /v1/files, then each file", file_by_file)
+
+    for max_concurrent_objects in args.max_concurrent_objects:
+        settings = Settings(
+            s3_bucket_name=BENCHMARK_BUCKET_NAME, archive_max_concurrent_objects=max_concurrent_objects
+        )
+        with TestClient(create_app(settings=settings)) as client:
+            for archive_format in ("zip", "tar"):
+
+                def one_archive(archive_format: str = archive_format) -> tuple[int, int]:
+                    response = client.get("/v1/archives/archive/", params={"format": archive_format})
+                    return len(response.content), 1
+
+                report_download(
+                    f"GET /v1/archives ({archive_format}, {max_concurrent_objects} concurrent)", one_archive
+                )
+
+
+def benchmark_middleware(args: argparse.Namespace) -> None:
+    """Time a trivial route and a large streamed body through each way of wrapping requests in middleware.
+
+    The routes are on a bare app, without S3, so that only the middleware is measured:
+    none at all, the exception handler ``create_app`` used to register with ``app.middleware("http")``,
+    which goes through Starlette's ``BaseHTTPMiddleware``, and `RequestLifecycleMiddleware`.
+    ``httpx.ASGITransport`` buffers whole responses, so the time to the first streamed chunk is
+    not measured here; the tests check that chunks are passed through as they are produced.
+    """
+    chunk = b"x" * (1024 * 1024)
+
+    async def handle_broad_exceptions(request: Request, call_next) -> Response:
+        try:
+            return await call_next(request)
+        except Exception:  # pylint: disable=broad-exception-caught
+            return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+
+    def create_bare_app(middleware: str) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/ping")
+        async def ping() -> Response:
+            return Response(b"pong")
+
+        @app.get("/stream")
+        async def stream() -> StreamingResponse:
+            return StreamingResponse(chunk for _ in range(args.stream_size_mb))
+
+        if middleware == "BaseHTTPMiddleware":
+            app.middleware("http")(handle_broad_exceptions)
+        elif middleware == "RequestLifecycleMiddleware":
+            app.add_middleware(RequestLifecycleMiddleware)
+        return app
+
+    for middleware in ("no middleware", "BaseHTTPMiddleware", "RequestLifecycleMiddleware"):
+        app = create_bare_app(middleware)
+        latencies, elapsed = asyncio.run(
+            fire_concurrent_requests(app=app, path="/ping", total_requests=args.requests, concurrency=args.concurrency)
+        )
+        latencies.sort()
+        start = time.perf_counter()
+        asyncio.run(download_through_app(app, "/stream"))
+        stream_seconds = time.perf_counter() - start
+        print(
+            f"{middleware:<28} {args.requests / elapsed:>8.1f} req/s"
+            f"  p50={1000 * statistics.median(latencies):.2f}ms"
+            f"  p99={1000 * latencies[int(0.99 * (len(latencies) - 1))]:.2f}ms"
+            f"  stream={args.stream_size_mb / stream_seconds:.1f} MB/s"
+        )
+
+
+async def download_through_app(app, path: str) -> int:
+    """GET ``path`` from ``app`` in-process and return the number of bytes received."""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        received = 0
+        async with client.stream("GET", path) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_raw():
+                received += len(chunk)
+        return received
+
+
+async def fire_concurrent_requests(app, path: str, total_requests: int, concurrency: int) -> tuple[list[float], float]:
+    """GET ``path`` ``total_requests`` times with at most ``concurrency`` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+
+        async def one_request() -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, elapsed
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Read and write the archive formats used to move many files in one request."""
+
+import mimetypes
+import tarfile
+import zipfile
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import datetime
+from typing import (
+    IO,
+    Iterator,
+    Optional,
+    Protocol,
+)
+
+
+@dataclass(frozen=True)
+class ArchivedFile:
+    """A regular file read from an archive.
+
+    Files too large to be read into memory have no ``content``: they are read from ``stream``
+    instead, which is only valid until the next file of the archive is read.
+    """
+
+    path: str
+    content: Optional[bytes]
+    content_type: Optional[str]
+    stream: Optional[IO[bytes]] = field(default=None, compare=False)
+
+
+def iter_tar_files(fileobj: IO[bytes], max_content_size: Optional[int] = None) -> Iterator[ArchivedFile]:
+    """Read the regular files of a tar archive, one at a time, in the order they are stored.
+
+    All member headers are read before the first file is returned, so an archive with a
+    corrupt header is rejected before any of its files is. gzip, bz2 and xz compressed
+    archives are detected automatically. Directories, links and other special members are
+    skipped. Leading "./" and "/" are removed from the paths, and content types are guessed
+    from the file extensions.
+
+    :param fileobj: The archive, opened in binary mode; it must be seekable.
+    :param max_content_size: Files larger than this many bytes are returned with a ``stream`` to
+        read them from, rather than their ``content``.
+
+    :raises tarfile.TarError: If ``fileobj`` is not a valid tar archive.
+    """
+    with tarfile.open(fileobj=fileobj, mode="r:*") as archive:
+        members = [member for member in archive.getmembers() if member.isfile()]
+        for member in members:
+            path = member.name
+            while path.startswith("./"):
+                path = path[2:]
+            path = path.lstrip("/")
+            stream = archive.extractfile(member)
+            content_type = mimetypes.guess_type(path)[0]
+            if max_content_size is not None and member.size > max_content_size:
+                yield ArchivedFile(path=path, content=None, content_type=content_type, stream=stream)
+            else:
+                content = stream.read()  # type: ignore[union-attr]
+                yield ArchivedFile(path=path, content=content, content_type=content_type)
+
+
+class ArchiveWriter(Protocol):
+    """Writes an archive incrementally, returning the bytes to send after each step.
+
+    Files are added one at a time: `start_file`, any number of `write` calls adding up to
+    exactly ``size`` bytes, then `end_file`. `close` returns the end of the archive.
+    """
+
+    media_type: str
+    extension: str
+
+    def start_file(self, path: str, size: int, last_modified: datetime) -> bytes: ...
+
+    def write(self, data: bytes) -> bytes: ...
+
+    def end_file(self) -> bytes: ...
+
+    def close(self) -> bytes: ...
+
+
+class TarArchiveWriter:
+    """Write an uncompressed POSIX (pax) tar archive."""
+
+    media_type = "application/x-tar"
+    extension = "tar"
+
+    def __init__(self) -> None:
+        self._offset = 0
+        self._padding = b""
+
+    def start_file(self, path: str, size: int, last_modified: datetime) -> bytes:
+        info = tarfile.TarInfo(path)
+        info.size = size
+        info.mtime = int(last_modified.timestamp())
+        info.mode = 0o644
+        # file data is padded to a whole number of blocks
+        self._padding = bytes(-size % tarfile.BLOCKSIZE)
+        return self._track(info.tobuf(format=tarfile.PAX_FORMAT))
+
+    def write(self, data: bytes) -> bytes:
+        return self._track(data)
+
+    def end_file(self) -> bytes:
+        return self._track(self._padding)
+
+    def close(self) -> bytes:
+        # two empty blocks, then padding to a whole record, like `tarfile.TarFile.close`
+        end_of_archive = bytes(2 * tarfile.BLOCKSIZE)
+        end_of_archive += bytes(-(self._offset + len(end_of_archive)) % tarfile.RECORDSIZE)
+        return self._track(end_of_archive)
+
+    def _track(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+
+class ZipArchiveWriter:
+    """Write an uncompressed zip archive, in zip64 format where sizes require it.
+
+    ``zipfile`` writes to an unseekable stream by appending a data descriptor after each file
+    instead of seeking back to fill in its header, which is what lets the archive be streamed.
+    """
+
+    media_type = "application/zip"
+    extension = "zip"
+
+    def __init__(self) -> None:
+        self._output = _OutputBuffer()
+        self._archive = zipfile.ZipFile(self._output, mode="w", compression=zipfile.ZIP_STORED)
+        self._file: Optional[IO[bytes]] = None
+
+    def start_file(self, path: str, size: int, last_modified: datetime) -> bytes:
+        # zip timestamps cannot predate 1980
+        info = zipfile.ZipInfo(path, date_time=max(last_modified.timetuple()[:6], (1980, 1, 1, 0, 0, 0)))
+        info.file_size = size  # decides whether the file needs zip64 extensions
+        info.external_attr = 0o644 << 16
+        self._file = self._archive.open(info, mode="w")
+        return self._output.take()
+
+    def write(self, data: bytes) -> bytes:
+        self._file.write(data)  # type: ignore[union-attr]
+        return self._output.take()
+
+    def end_file(self) -> bytes:
+        self._file.close()  # type: ignore[union-attr]
+        self._file = None
+        return self._output.take()
+
+    def close(self) -> bytes:
+        self._archive.close()
+        return self._output.take()
+
+
+class _OutputBuffer:
+    """A write-only, unseekable file whose contents are taken out as they are written."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
@@ -0,0 +1,111 @@
+"""Parsing and formatting of HTTP byte ranges (RFC 9110, section 14) for `GET /v1/files/{file_path}`."""
+
+import re
+from dataclasses import dataclass
+from typing import (
+    Iterable,
+    Optional,
+)
+
+# S3 only serves one range per get_object call, so every range costs an S3 request; cap them
+MAX_BYTE_RANGES_PER_REQUEST = 16
+
+_RANGE_SPEC_PATTERN = re.compile(r"^(\d*)-(\d*)$")
+_CONTENT_RANGE_PATTERN = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+@dataclass(frozen=True)
+class ByteRange:
+    """One range from a `Range: bytes=...` header.
+
+    ``start=None`` means a suffix range, i.e. the last ``end`` bytes of the file.
+    ``end=None`` means "until the end of the file".
+    """
+
+    start: Optional[int]
+    end: Optional[int]
+
+    def to_s3_range(self) -> str:
+        """Format this range as the value of get_object's `Range` parameter."""
+        start = "" if self.start is None else str(self.start)
+        end = "" if self.end is None else str(self.end)
+        return f"bytes={start}-{end}"
+
+    def resolve(self, size: int) -> Optional[tuple[int, int]]:
+        """Return the inclusive ``(first, last)`` byte positions within a file of ``size`` bytes.
+
+        :return: The positions, or None if the range does not overlap the file.
+        """
+        if self.start is None:
+            if self.end == 0 or size == 0:
+                return None
+            return max(size - self.end, 0), size - 1
+        if self.start >= size:
+            return None
+        last = size - 1 if self.end is None else min(self.end, size - 1)
+        return self.start, last
+
+
+def parse_range_header(range_header: str) -> Optional[list[ByteRange]]:
+    """Parse the value of a `Range` header, e.g. ``bytes=0-99,200-,-500``.
+
+    Per RFC 9110, servers may ignore a `Range` header they cannot or will not honor, so
+    instead of raising, this returns None for malformed headers, units other than
+    ``bytes`` and more than `MAX_BYTE_RANGES_PER_REQUEST` ranges.
+
+    :param range_header: Value of the `Range` request header.
+
+    :return: The requested ranges in the order they were requested, or None.
+    """
+    unit, _, range_set = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not range_set.strip():
+        return None
+
+    byte_ranges = []
+    for range_spec in range_set.split(","):
+        match = _RANGE_SPEC_PATTERN.match(range_spec.strip())
+        if not match or match.group(1) == match.group(2) == "":
+            return None
+        start = int(match.group(1)) if match.group(1) else None
+        end = int(match.group(2)) if match.group(2) else None
+        if start is not None and end is not None and start > end:
+            return None
+        byte_ranges.append(ByteRange(start=start, end=end))
+
+    if len(byte_ranges) > MAX_BYTE_RANGES_PER_REQUEST:
+        return None
+    return byte_ranges
+
+
+def parse_content_range(content_range: str) -> tuple[int, int, int]:
+    """Parse a `Content-Range` value such as ``bytes 0-99/1234`` into ``(first, last, size)``."""
+    match = _CONTENT_RANGE_PATTERN.match(content_range)
+    if not match:
+        raise ValueError(f"unsupported Content-Range: {content_range!r}")
+    first, last, size = (int(group) for group in match.groups())
+    return first, last, size
+
+
+def format_content_range(first: int, last: int, size: int) -> str:
+    """Format a `Content-Range` value, e.g. ``bytes 0-99/1234``."""
+    return f"bytes {first}-{last}/{size}"
+
+
+def multipart_byteranges_part_header(boundary: str, content_type: str, content_range: str) -> bytes:
+    """Delimiter and headers preceding one part of a ``multipart/byteranges`` body."""
+    return f"--{boundary}\r\nContent-Type: {content_type}\r\nContent-Range: {content_range}\r\n\r\n".encode("latin-1")
+
+
+def multipart_byteranges_closing(boundary: str) -> bytes:
+    """Final delimiter of a ``multipart/byteranges`` body."""
+    return f"--{boundary}--\r\n".encode("latin-1")
+
+
+def multipart_byteranges_length(boundary: str, content_type: str, ranges: Iterable[tuple[int, int, int]]) -> int:
+    """Total length of a ``multipart/byteranges`` body made of ``(first, last, size)`` ranges."""
+    length = len(multipart_byteranges_closing(boundary))
+    for first, last, size in ranges:
+        content_range = format_content_range(first, last, size)
+        length += len(multipart_byteranges_part_header(boundary, content_type, content_range))
+        length += last - first + 1 + len(b"\r\n")
+    return length
@@ -0,0 +1,173 @@
+"""Compression of stored files, and negotiation of the `Content-Encoding` (RFC 9110, section 8.4) they are served with."""
+
+import zlib
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Optional,
+    Protocol,
+)
+
+import anyio
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+SUPPORTED_ENCODINGS = ("gzip", "zstd")
+
+# file extensions that mark an archived file as stored in an encoding
+ENCODING_FILE_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+# text formats, which typically shrink 5-10x; media and archives are already compressed
+DEFAULT_COMPRESSIBLE_CONTENT_TYPES = (
+    "text/*",
+    "application/json",
+    "application/x-ndjson",
+    "application/xml",
+    "application/javascript",
+    "application/yaml",
+    "application/x-yaml",
+    "application/sql",
+)
+
+
+class Compressor(Protocol):
+    """Compresses a stream of bytes incrementally, like ``zlib.compressobj``."""
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class Decompressor(Protocol):
+    """Decompresses a stream of bytes incrementally, like ``zlib.decompressobj``."""
+
+    def decompress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+@dataclass(frozen=True)
+class CompressionPolicy:
+    """Which uploaded files are compressed before they are stored, and with which encoding.
+
+    :param encoding: One of `SUPPORTED_ENCODINGS`.
+    :param content_types: Compressed content types; "text/*" matches any text type.
+    :param min_size_bytes: Files known to be smaller than this are stored as-is, since they barely shrink.
+    :param level: Compression level of the encoding, or None for its default.
+
+    :raises ValueError: If ``encoding`` is not supported, or its library is not installed.
+    """
+
+    encoding: str
+    content_types: tuple[str, ...] = DEFAULT_COMPRESSIBLE_CONTENT_TYPES
+    min_size_bytes: int = 1024
+    level: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        _check_encoding(self.encoding)
+
+    def should_compress(self, content_type: Optional[str], size: Optional[int] = None) -> bool:
+        """Whether a file of this content type and size, if known, is compressed."""
+        if size is not None and size < self.min_size_bytes:
+            return False
+        if not content_type:
+            return False
+        media_type = content_type.split(";", 1)[0].strip().lower()
+        return any(
+            media_type == pattern or (pattern.endswith("/*") and media_type.startswith(pattern[:-1]))
+            for pattern in self.content_types
+        )
+
+    def create_compressor(self) -> Compressor:
+        """Create a compressor writing a single frame of the policy's encoding."""
+        if self.encoding == "gzip":
+            level = zlib.Z_DEFAULT_COMPRESSION if self.level is None else self.level
+            return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        level = 3 if self.level is None else self.level
+        return zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a whole file."""
+        compressor = self.create_compressor()
+        return compressor.compress(data) + compressor.flush()
+
+
+async def compress_file_content(
+    policy: Optional[CompressionPolicy], content: bytes, content_type: Optional[str]
+) -> tuple[bytes, Optional[str]]:
+    """Compress a file about to be uploaded, in a worker thread, if ``policy`` says so.
+
+    :return: The bytes to store, and the encoding they are compressed with, or None if they are not.
+    """
+    if policy is None or not policy.should_compress(content_type, len(content)):
+        return content, None
+    return await anyio.to_thread.run_sync(policy.compress, content), policy.encoding
+
+
+async def compress_chunks(compressor: Compressor, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Compress a stream of chunks as they arrive, each in a worker thread.
+
+    Chunks that the compressor only buffers are not yielded, so every yielded chunk is non-empty.
+    """
+    async for chunk in chunks:
+        if compressed := await anyio.to_thread.run_sync(compressor.compress, chunk):
+            yield compressed
+    if compressed := await anyio.to_thread.run_sync(compressor.flush):
+        yield compressed
+
+
+def create_decompressor(encoding: str) -> Decompressor:
+    """Create a decompressor for bytes stored in ``encoding``.
+
+    :raises ValueError: If ``encoding`` is not supported, or its library is not installed.
+    """
+    _check_encoding(encoding)
+    if encoding == "gzip":
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    """Decompress a whole file stored in ``encoding``."""
+    decompressor = create_decompressor(encoding)
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+def accepts_encoding(accept_encoding: Optional[str], encoding: str) -> bool:
+    """Whether an `Accept-Encoding` header allows a response in ``encoding``.
+
+    Unlike RFC 9110 suggests, a request without the header is taken to accept no encoding,
+    since clients that do not send it are rarely prepared to decompress.
+
+    :param accept_encoding: The header's value, e.g. "gzip, br;q=0.8, *;q=0".
+    :param encoding: A content coding, e.g. "gzip".
+    """
+    if not accept_encoding:
+        return False
+    wildcard_quality: Optional[float] = None
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name == encoding or (encoding == "gzip" and name == "x-gzip"):
+            return quality > 0
+        if name == "*":
+            wildcard_quality = quality
+    return wildcard_quality is not None and wildcard_quality > 0
+
+
+def _check_encoding(encoding: str) -> None:
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise ValueError(f"Unsupported encoding {encoding!r}, expected one of {SUPPORTED_ENCODINGS}.")
+    if encoding == "zstd" and zstandard is None:
+        raise ValueError("zstd compression requires the zstandard package: pip install zstandard")
@@ -0,0 +1,53 @@
+"""Conditional request headers (RFC 9110, section 13) and HTTP dates for the files routes."""
+
+from datetime import (
+    datetime,
+    timezone,
+)
+from email.utils import (
+    format_datetime,
+    parsedate_to_datetime,
+)
+from typing import (
+    Mapping,
+    Optional,
+)
+
+from files_api.s3.read_objects import ReadConditions
+
+
+def format_http_date(moment: datetime) -> str:
+    """Format a timezone-aware datetime as an HTTP date, e.g. ``Sun, 06 Nov 1994 08:49:37 GMT``."""
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value: str) -> Optional[datetime]:
+    """Parse an HTTP date; returns None for invalid dates, which RFC 9110 says to ignore."""
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def read_conditions_from_headers(headers: Mapping[str, str]) -> Optional[ReadConditions]:
+    """Collect the conditional headers of a GET or HEAD request.
+
+    :return: The conditions, or None if the request is unconditional.
+    """
+    conditions = ReadConditions(
+        if_match=headers.get("If-Match"),
+        if_none_match=headers.get("If-None-Match"),
+        # RFC 9110: the date conditions are ignored when the matching ETag condition is present
+        if_modified_since=(
+            None
+            if "If-None-Match" in headers or "If-Modified-Since" not in headers
+            else parse_http_date(headers["If-Modified-Since"])
+        ),
+        if_unmodified_since=(
+            None
+            if "If-Match" in headers or "If-Unmodified-Since" not in headers
+            else parse_http_date(headers["If-Unmodified-Since"])
+        ),
+    )
+    return conditions if conditions.to_s3_kwargs() else None
@@ -1,24 +1,129 @@
+from typing import (
+    NoReturn,
+    Optional,
+)
+
 import pydantic
+from botocore.exceptions import ClientError
 from fastapi import (
     Request,
+    Response,
     status,
 )
 from fastapi.responses import JSONResponse
 
 
-# fast api docs on middleware: https://fastapi.tiangolo.com/tutorial/middleware/
-async def handle_broad_exceptions(request: Request, call_next) -> JSONResponse:
-    """Handle any exception that goes unhandled by a more specific exception handler."""
-    try:
-        return await call_next(request)
-    except Exception:
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={"detail": "Internal Server Error"},
-        )
+class ObjectNotFoundError(Exception):
+    """Raised by the `files_api.s3` helpers when the requested S3 object does not exist."""
+
+    def __init__(self, bucket_name: str, object_key: str):
+        super().__init__(f"s3://{bucket_name}/{object_key} does not exist")
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+
+
+class RangeNotSatisfiableError(Exception):
+    """Raised by the `files_api.s3` helpers when a requested byte range lies outside the S3 object."""
+
+    def __init__(self, bucket_name: str, object_key: str, object_size: Optional[int] = None):
+        super().__init__(f"requested range is not satisfiable for s3://{bucket_name}/{object_key}")
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.object_size = object_size
+
+
+class PreconditionFailedError(Exception):
+    """Raised by the `files_api.s3` helpers when S3 rejects a conditional request (HTTP 412)."""
+
+    def __init__(self, bucket_name: str, object_key: str):
+        super().__init__(f"precondition failed for s3://{bucket_name}/{object_key}")
+        self.bucket_name = bucket_name
+        self.object_key = object_key
 
 
+class NotModifiedError(Exception):
+    """Raised by the `files_api.s3` helpers when S3 answers a conditional read with 304 Not Modified."""
+
+    def __init__(self, bucket_name: str, object_key: str, etag: Optional[str], last_modified: Optional[str]):
+        super().__init__(f"s3://{bucket_name}/{object_key} has not been modified")
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class InvalidArchiveError(Exception):
+    """Raised when an uploaded archive cannot be read."""
+
+
+def raise_storage_error(err: ClientError, bucket_name: str, object_key: str) -> NoReturn:
+    """Re-raise a botocore error about an S3 object as the matching storage-level error above.
+
+    Errors without a storage-level equivalent are re-raised unchanged.
+    """
+    error_code = err.response["Error"]["Code"]
+    # head_object responses have no body, so S3 reports bare HTTP status codes for them
+    if error_code in ("404", "NoSuchKey"):
+        raise ObjectNotFoundError(bucket_name, object_key) from err
+    if error_code in ("412", "PreconditionFailed"):
+        raise PreconditionFailedError(bucket_name, object_key) from err
+    if error_code == "304":
+        headers = err.response["ResponseMetadata"].get("HTTPHeaders", {})
+        raise NotModifiedError(
+            bucket_name, object_key, etag=headers.get("etag"), last_modified=headers.get("last-modified")
+        ) from err
+    if error_code == "InvalidRange":
+        object_size = err.response["Error"].get("ActualObjectSize")
+        raise RangeNotSatisfiableError(
+            bucket_name, object_key, object_size=int(object_size) if object_size else None
+        ) from err
+    raise err
+
+
+# fast api docs on middleware: https://fastapi.tiangolo.com/tutorial/middleware/
 # fast api docs on error handlers: https://fastapi.tiangolo.com/tutorial/handling-errors/
+async def handle_object_not_found(request: Request, exc: ObjectNotFoundError) -> JSONResponse:
+    """Translate a missing S3 object into the API's 404 response."""
+    return JSONResponse(
+        status_code=status.HTTP_404_NOT_FOUND,
+        content={"detail": "File not found"},
+    )
+
+
+async def handle_range_not_satisfiable(request: Request, exc: RangeNotSatisfiableError) -> JSONResponse:
+    """Respond with 416, including the file size in `Content-Range` when it is known."""
+    headers = {"Content-Range": f"bytes */{exc.object_size}"} if exc.object_size is not None else None
+    return JSONResponse(
+        status_code=status.HTTP_416_RANGE_NOT_SATISFIABLE,
+        content={"detail": "Requested range not satisfiable"},
+        headers=headers,
+    )
+
+
+async def handle_not_modified(request: Request, exc: NotModifiedError) -> Response:
+    """Respond with a bodiless 304 carrying the validators the client can cache."""
+    headers = {}
+    if exc.etag:
+        headers["ETag"] = exc.etag
+    if exc.last_modified:
+        headers["Last-Modified"] = exc.last_modified
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+
+async def handle_precondition_failed(request: Request, exc: PreconditionFailedError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        content={"detail": "Precondition Failed"},
+    )
+
+
+async def handle_invalid_archive(request: Request, exc: InvalidArchiveError) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"detail": f"Invalid archive: {exc}"},
+    )
+
+
 async def handle_pydantic_validation_errors(request: Request, exc: pydantic.ValidationError) -> JSONResponse:
     errors = exc.errors()
     return JSONResponse(
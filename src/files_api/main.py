@@ -1,17 +1,48 @@
+from contextlib import asynccontextmanager
 from textwrap import dedent
+from typing import AsyncIterator
 
 import pydantic
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 
+from files_api.compression import CompressionPolicy
 from files_api.errors import (
-    handle_broad_exceptions,
+    InvalidArchiveError,
+    NotModifiedError,
+    ObjectNotFoundError,
+    PreconditionFailedError,
+    RangeNotSatisfiableError,
+    handle_invalid_archive,
+    handle_not_modified,
+    handle_object_not_found,
+    handle_precondition_failed,
     handle_pydantic_validation_errors,
+    handle_range_not_satisfiable,
 )
+from files_api.metrics import (
+    AppMetrics,
+    MetricsMiddleware,
+)
+from files_api.middleware import RequestLifecycleMiddleware
 from files_api.routes import ROUTER
+from files_api.s3.client import create_s3_client
+from files_api.s3.coalescing import ReadCoalescer
+from files_api.s3.disk_cache import DiskCache
+from files_api.s3.executor import S3Executor
+from files_api.s3.listing_cache import ListingCache
+from files_api.s3.object_cache import ObjectCache
 from files_api.settings import Settings
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Clean up after the app's components when the worker shuts down."""
+    yield
+    if app.state.disk_cache is not None:
+        app.state.disk_cache.close()
+
+
 def create_app(settings: Settings | None = None) -> FastAPI:
     """Create a FastAPI app with the given S3 bucket name."""
     # s3_bucket_name = s3_bucket_name or os.getenv("S3_BUCKET_NAME")
@@ -38,15 +69,104 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         ),
         docs_url="/",  # its easier to find the docs when they live on the base url
         generate_unique_id_function=custom_generate_unique_id,
+        lifespan=lifespan,
     )
     app.state.settings = settings
+    app.state.s3_client = create_s3_client(
+        max_pool_connections=settings.s3_max_pool_connections,
+        tcp_keepalive=settings.s3_tcp_keepalive,
+        max_retry_attempts=settings.s3_max_retry_attempts,
+        retry_mode=settings.s3_retry_mode,
+    )
+    app.state.s3_executor = S3Executor(
+        s3_client=app.state.s3_client,
+        io_mode=settings.s3_io_mode,
+        max_concurrency=settings.s3_max_concurrency,
+    )
+    app.state.read_coalescer = (
+        ReadCoalescer(max_shared_body_size_bytes=settings.read_coalescing_max_shared_body_size_bytes)
+        if settings.read_coalescing
+        else None
+    )
+    app.state.object_cache = (
+        ObjectCache(
+            max_size_bytes=settings.object_cache_max_size_bytes,
+            max_object_size_bytes=settings.object_cache_max_object_size_bytes,
+            ttl_seconds=settings.object_cache_ttl_seconds,
+            coalescer=app.state.read_coalescer,
+        )
+        if settings.object_cache_max_size_bytes
+        else None
+    )
+    app.state.disk_cache = (
+        DiskCache(
+            directory=settings.disk_cache_directory,
+            max_size_bytes=settings.disk_cache_max_size_bytes,
+            max_object_size_bytes=settings.disk_cache_max_object_size_bytes,
+            ttl_seconds=settings.disk_cache_ttl_seconds,
+            coalescer=app.state.read_coalescer,
+        )
+        if settings.disk_cache_directory
+        else None
+    )
+    app.state.listing_cache = (
+        ListingCache(
+            ttl_seconds=settings.listing_cache_ttl_seconds,
+            max_entries=settings.listing_cache_max_entries,
+            coalescer=app.state.read_coalescer,
+        )
+        if settings.listing_cache_ttl_seconds
+        else None
+    )
+
+    app.state.compression_policy = (
+        CompressionPolicy(
+            encoding=settings.upload_compression,
+            content_types=tuple(settings.upload_compression_content_types),
+            min_size_bytes=settings.upload_compression_min_size_bytes,
+            level=settings.upload_compression_level,
+        )
+        if settings.upload_compression
+        else None
+    )
+
+    app.state.metrics = AppMetrics() if settings.metrics_enabled else None
+    if app.state.metrics is not None:
+        app.state.metrics.instrument_s3_client(app.state.s3_client)
+        app.state.metrics.export_stats("object_cache", app.state.object_cache)
+        app.state.metrics.export_stats("disk_cache", app.state.disk_cache)
+        app.state.metrics.export_stats("listing_cache", app.state.listing_cache)
+        app.state.metrics.export_stats("read_coalescer", app.state.read_coalescer)
 
     app.include_router(ROUTER)
     app.add_exception_handler(
         exc_class_or_status_code=pydantic.ValidationError,
         handler=handle_pydantic_validation_errors,
     )
-    app.middleware("http")(handle_broad_exceptions)
+    app.add_exception_handler(
+        exc_class_or_status_code=ObjectNotFoundError,
+        handler=handle_object_not_found,
+    )
+    app.add_exception_handler(
+        exc_class_or_status_code=RangeNotSatisfiableError,
+        handler=handle_range_not_satisfiable,
+    )
+    app.add_exception_handler(
+        exc_class_or_status_code=NotModifiedError,
+        handler=handle_not_modified,
+    )
+    app.add_exception_handler(
+        exc_class_or_status_code=PreconditionFailedError,
+        handler=handle_precondition_failed,
+    )
+    app.add_exception_handler(
+        exc_class_or_status_code=InvalidArchiveError,
+        handler=handle_invalid_archive,
+    )
+    app.add_middleware(RequestLifecycleMiddleware, metrics=app.state.metrics)
+    if app.state.metrics is not None:
+        # added last, so it is outside the middleware above and sees the 500s it responds with
+        app.add_middleware(MetricsMiddleware, metrics=app.state.metrics)
 
     return app
 
@@ -0,0 +1,383 @@
+"""Request and S3 metrics, exposed in the Prometheus text format at `GET /metrics`."""
+
+import bisect
+import dataclasses
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+)
+
+from botocore.utils import determine_content_length
+from starlette.types import (
+    ASGIApp,
+    Message,
+    Receive,
+    Scope,
+    Send,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+except ImportError:
+    ...
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# from a cached read on a warm connection to a large transfer
+DEFAULT_LATENCY_BUCKETS_SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# the route label of requests that match no route, e.g. 404s
+UNMATCHED_ROUTE = "unmatched"
+
+# S3 operations whose bodies are counted as uploaded bytes
+_UPLOAD_OPERATIONS = {"PutObject", "UploadPart"}
+
+
+@dataclass(frozen=True)
+class Sample:
+    """One value of a metric: ``name`` is the metric's name plus an optional suffix, e.g. "_bucket"."""
+
+    name: str
+    labels: tuple[tuple[str, str], ...]
+    value: float
+
+
+@dataclass(frozen=True)
+class MetricFamily:
+    """All the samples of one metric, as they are exposed."""
+
+    name: str
+    type: str
+    documentation: str
+    samples: list[Sample]
+
+
+class Counter:
+    """A value per combination of labels that only goes up."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], float] = {}
+        # updated from the worker threads that make S3 calls
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            values = list(self._values.items())
+        samples = [Sample(self.name, tuple(zip(self.label_names, labels)), value) for labels, value in values]
+        return MetricFamily(self.name, self.type, self.documentation, samples)
+
+
+class Histogram:
+    """Counts of observed values per bucket of upper bounds, per combination of labels."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS_SECONDS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        # per combination of labels: the count of each bucket (not cumulative) and of +Inf, then the sum
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = self._values[label_values] = [0.0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, *label_values: str) -> int:
+        counts = self._values.get(label_values)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def collect(self) -> MetricFamily:
+        with self._lock:
+            values = [(labels, list(counts)) for labels, counts in self._values.items()]
+        samples = []
+        for label_values, counts in values:
+            labels = tuple(zip(self.label_names, label_values))
+            cumulative = 0.0
+            for upper_bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                samples.append(
+                    Sample(f"{self.name}_bucket", (*labels, ("le", _format_value(upper_bound))), cumulative)
+                )
+            samples.append(Sample(f"{self.name}_sum", labels, counts[-1]))
+            samples.append(Sample(f"{self.name}_count", labels, cumulative))
+        return MetricFamily(self.name, self.type, self.documentation, samples)
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class MetricsRegistry:
+    """The metrics of one app, rendered together in the Prometheus text format.
+
+    Besides metrics updated as things happen, collectors compute metrics from other state,
+    e.g. cache counters, each time the metrics are rendered.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: list[Any] = []
+        self._collectors: list[Collector] = []
+
+    def counter(self, name: str, documentation: str, label_names: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS_SECONDS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def collect(self) -> list[MetricFamily]:
+        families = [metric.collect() for metric in self._metrics]
+        for collector in self._collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format, version 0.0.4."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape_help(family.documentation)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for sample in family.samples:
+                labels = ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in sample.labels)
+                name = f"{sample.name}{{{labels}}}" if labels else sample.name
+                lines.append(f"{name} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+class AppMetrics:
+    """The metrics the files API records: HTTP requests per route, and S3 calls per operation.
+
+    Requests are measured by `MetricsMiddleware`, and S3 calls by the botocore event hooks that
+    `instrument_s3_client` registers, so neither route handlers nor ``files_api.s3`` helpers
+    need to know about metrics.
+    """
+
+    def __init__(self, latency_buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS_SECONDS):
+        self.registry = MetricsRegistry()
+        self.http_requests = self.registry.counter(
+            "files_api_http_requests_total",
+            "HTTP requests handled, by method, route and status code.",
+            ("method", "route", "status"),
+        )
+        self.http_request_duration = self.registry.histogram(
+            "files_api_http_request_duration_seconds",
+            "Time from receiving a request to sending the last byte of its response.",
+            ("method", "route"),
+            latency_buckets,
+        )
+        self.http_unhandled_exceptions = self.registry.counter(
+            "files_api_http_unhandled_exceptions_total",
+            "Exceptions no handler turned into a response, answered with a 500, by route and exception type.",
+            ("route", "exception"),
+        )
+        self.s3_requests = self.registry.counter(
+            "files_api_s3_requests_total",
+            "S3 API calls made, by operation, counting retries of a call as one.",
+            ("operation",),
+        )
+        self.s3_request_duration = self.registry.histogram(
+            "files_api_s3_request_duration_seconds",
+            "Duration of S3 API calls, including retries, by operation.",
+            ("operation",),
+            latency_buckets,
+        )
+        self.s3_errors = self.registry.counter(
+            "files_api_s3_errors_total",
+            "S3 API calls that failed, by operation and S3 error code or exception type.",
+            ("operation", "code"),
+        )
+        self.s3_body_bytes = self.registry.counter(
+            "files_api_s3_body_bytes_total",
+            "Bytes of object bodies sent to S3 (upload) or announced by S3 in get_object responses (download).",
+            ("operation", "direction"),
+        )
+        # requests being handled, by the id of their scope
+        self._in_flight: dict[int, Scope] = {}
+        self.registry.add_collector(self._collect_in_flight)
+
+    def instrument_s3_client(self, s3_client: "S3Client") -> None:
+        """Register botocore event hooks that record every call made through ``s3_client``."""
+        events = s3_client.meta.events
+        events.register("before-call.s3", self._on_s3_call_started)
+        events.register("after-call.s3", self._on_s3_call_finished)
+        events.register("after-call-error.s3", self._on_s3_call_failed)
+
+    def export_stats(self, name: str, component: Any) -> None:
+        """Export the counters of a component with a ``stats`` dataclass, e.g. a cache, when it is enabled.
+
+        Each field of ``component.stats`` becomes a counter named after ``name``, e.g.
+        "files_api_object_cache_hits_total". The component's length and ``size_bytes``, if it has
+        them, become "files_api_<name>_entries" and "files_api_<name>_size_bytes" gauges.
+
+        :param name: Name of the component in the metric names, e.g. "object_cache".
+        :param component: The component, or None if it is disabled, in which case nothing is exported.
+        """
+        if component is None:
+            return
+
+        def collect() -> Iterable[MetricFamily]:
+            for field in dataclasses.fields(component.stats):
+                metric_name = f"files_api_{name}_{field.name}_total"
+                value = getattr(component.stats, field.name)
+                documentation = f"Counter {field.name!r} of the {name.replace('_', ' ')}."
+                yield MetricFamily(metric_name, "counter", documentation, [Sample(metric_name, (), value)])
+            if hasattr(component, "__len__"):
+                metric_name = f"files_api_{name}_entries"
+                documentation = f"Entries in the {name.replace('_', ' ')}."
+                yield MetricFamily(metric_name, "gauge", documentation, [Sample(metric_name, (), len(component))])
+            if hasattr(component, "size_bytes"):
+                metric_name = f"files_api_{name}_size_bytes"
+                documentation = f"Total size of the entries in the {name.replace('_', ' ')}."
+                yield MetricFamily(
+                    metric_name, "gauge", documentation, [Sample(metric_name, (), component.size_bytes)]
+                )
+
+        self.registry.add_collector(collect)
+
+    def request_started(self, scope: Scope) -> None:
+        self._in_flight[id(scope)] = scope
+
+    def request_finished(self, scope: Scope, status_code: int, duration_seconds: float) -> None:
+        del self._in_flight[id(scope)]
+        route = route_of(scope)
+        self.http_requests.inc(scope["method"], route, str(status_code))
+        self.http_request_duration.observe(duration_seconds, scope["method"], route)
+
+    def record_unhandled_exception(self, scope: Scope, exc: Exception) -> None:
+        self.http_unhandled_exceptions.inc(route_of(scope), type(exc).__name__)
+
+    def _collect_in_flight(self) -> Iterable[MetricFamily]:
+        counts: dict[tuple[str, str], int] = {}
+        for scope in list(self._in_flight.values()):
+            labels = (scope["method"], route_of(scope))
+            counts[labels] = counts.get(labels, 0) + 1
+        name = "files_api_http_requests_in_flight"
+        samples = [
+            Sample(name, (("method", method), ("route", route)), count) for (method, route), count in counts.items()
+        ]
+        yield MetricFamily(name, "gauge", "HTTP requests being handled, by method and route.", samples)
+
+    def _on_s3_call_started(self, model: Any, params: dict, context: dict, **kwargs: Any) -> None:
+        context["metrics_started_at"] = time.perf_counter()
+        if model.name in _UPLOAD_OPERATIONS:
+            size = determine_content_length(params.get("body"))
+            if size:
+                self.s3_body_bytes.inc(model.name, "upload", amount=size)
+
+    def _on_s3_call_finished(self, http_response: Any, parsed: dict, model: Any, context: dict, **kwargs: Any) -> None:
+        self._record_s3_call(model.name, context)
+        if http_response.status_code >= 300:
+            self.s3_errors.inc(model.name, parsed.get("Error", {}).get("Code") or str(http_response.status_code))
+        elif model.name == "GetObject":
+            self.s3_body_bytes.inc(model.name, "download", amount=parsed.get("ContentLength") or 0)
+
+    def _on_s3_call_failed(self, event_name: str, exception: Exception, context: dict, **kwargs: Any) -> None:
+        operation = event_name.rsplit(".", 1)[-1]
+        self._record_s3_call(operation, context)
+        self.s3_errors.inc(operation, type(exception).__name__)
+
+    def _record_s3_call(self, operation: str, context: dict) -> None:
+        self.s3_requests.inc(operation)
+        started_at = context.pop("metrics_started_at", None)
+        if started_at is not None:
+            self.s3_request_duration.observe(time.perf_counter() - started_at, operation)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the count, duration and status of every HTTP request.
+
+    Requests are labeled with the path template of the route that handled them, e.g.
+    "/v1/files/{file_path:path}", which the router stores in the request's scope. Requests
+    whose response never started, because of an exception, are recorded with status 500.
+
+    :param app: The ASGI app to measure.
+    :param metrics: Where to record the measurements.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: AppMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        status_code = 500
+
+        async def send_and_record_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.metrics.request_started(scope)
+        try:
+            await self.app(scope, receive, send_and_record_status)
+        finally:
+            self.metrics.request_finished(scope, status_code, time.perf_counter() - started_at)
+
+
+def route_of(scope: Scope) -> str:
+    """Path template of the route handling a request, or `UNMATCHED_ROUTE` if it matched none (yet)."""
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,127 @@
+"""Pure ASGI middleware wrapping every request: request ids, timing, access logs and the catch-all 500."""
+
+import logging
+import re
+import time
+import uuid
+from typing import Optional
+
+from starlette.datastructures import (
+    Headers,
+    MutableHeaders,
+)
+from starlette.responses import JSONResponse
+from starlette.types import (
+    ASGIApp,
+    Message,
+    Receive,
+    Scope,
+    Send,
+)
+
+from files_api.metrics import AppMetrics
+
+LOGGER = logging.getLogger(__name__)
+ACCESS_LOGGER = logging.getLogger("files_api.access")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# request ids sent by clients are only propagated if they cannot break headers or log lines
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestLifecycleMiddleware:
+    """ASGI middleware giving every HTTP request an id, timing headers, an access log line and a 500 on errors.
+
+    - The request id is taken from the client's ``X-Request-ID`` header if it is well-formed, or
+      generated otherwise. It is stored in ``request.state.request_id`` and returned in the
+      response's ``X-Request-ID`` header.
+    - ``Server-Timing: app;dur=<ms>`` reports how long the app took to start the response.
+    - Each finished request is logged to the ``files_api.access`` logger at INFO level.
+    - An exception that goes unhandled by a more specific exception handler is logged with its
+      traceback, counted in ``metrics``, and answered with a 500. If the response had already
+      started, e.g. while streaming a file, it is too late for a 500, so the exception is re-raised
+      for the server to abort the response.
+
+    Unlike ``app.middleware("http")``, which goes through Starlette's ``BaseHTTPMiddleware``, this
+    only wraps ``send``: it spawns no task and passes every message through unbuffered, so it adds
+    next to nothing to each request and leaves streamed responses streaming.
+
+    :param app: The ASGI app to wrap.
+    :param metrics: Where to count unhandled exceptions, if metrics are enabled.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Optional[AppMetrics] = None):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        request_id = _request_id(scope)
+        scope.setdefault("state", {})["request_id"] = request_id
+        response_started = False
+        status_code = 500
+        content_length = 0
+        response_bytes = 0
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal response_started, status_code, content_length, response_bytes
+            if message["type"] == "http.response.start":
+                response_started = True
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(REQUEST_ID_HEADER, request_id)
+                headers.append("Server-Timing", f"app;dur={1000 * (time.perf_counter() - started_at):.1f}")
+                content_length = int(headers.get("content-length", 0))
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            elif message["type"] == "http.response.pathsend":
+                # the server sends the file itself, as announced by the content-length
+                response_bytes = content_length
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            LOGGER.exception(
+                "Unhandled exception during %s %s (request id %s)", scope["method"], scope["path"], request_id
+            )
+            if self.metrics is not None:
+                self.metrics.record_unhandled_exception(scope, err)
+            if response_started:
+                raise
+            response = JSONResponse(
+                status_code=500,
+                content={"detail": "Internal Server Error"},
+            )
+            await response(scope, receive, send_with_headers)
+        finally:
+            if ACCESS_LOGGER.isEnabledFor(logging.INFO):
+                _log_access(scope, request_id, status_code, response_bytes, time.perf_counter() - started_at)
+
+
+def _request_id(scope: Scope) -> str:
+    request_id = Headers(scope=scope).get(REQUEST_ID_HEADER)
+    if request_id is not None and _VALID_REQUEST_ID.fullmatch(request_id):
+        return request_id
+    return uuid.uuid4().hex
+
+
+def _log_access(scope: Scope, request_id: str, status_code: int, response_bytes: int, duration_seconds: float) -> None:
+    client = scope.get("client")
+    path = scope["path"] + (f"?{scope['query_string'].decode('latin-1')}" if scope.get("query_string") else "")
+    ACCESS_LOGGER.info(
+        '%s - "%s %s HTTP/%s" %d %d %.1fms request_id=%s',
+        f"{client[0]}:{client[1]}" if client else "-",
+        scope["method"],
+        path,
+        scope.get("http_version", "1.1"),
+        status_code,
+        response_bytes,
+        1000 * duration_seconds,
+        request_id,
+    )
@@ -0,0 +1,60 @@
+"""The `page_token`s handed out by `GET /v1/files`."""
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+# S3 continuation tokens are base64, which has no ".", so this cannot clash with one
+_DIRECTORY_PAGE_TOKEN_PREFIX = "dir."
+
+
+@dataclass(frozen=True)
+class PageToken:
+    """Where a listing left off.
+
+    Recursive listings of default-sized pages hand out S3's continuation token as is. S3 evaluates
+    a delimited listing relative to its prefix, so continuing one needs the prefix and delimiter
+    again, and requests that follow a token cannot set `page_size`; those are packed into the token,
+    so clients only ever pass `page_token` back.
+    """
+
+    s3_continuation_token: str
+    prefix: str = ""
+    delimiter: Optional[str] = None
+    # None for the default page size
+    page_size: Optional[int] = None
+
+    def encode(self) -> str:
+        """The token to return as `next_page_token`."""
+        if self.delimiter is None and self.page_size is None:
+            return self.s3_continuation_token
+        payload = json.dumps(
+            {
+                "token": self.s3_continuation_token,
+                "prefix": self.prefix,
+                "delimiter": self.delimiter,
+                "page_size": self.page_size,
+            }
+        )
+        return _DIRECTORY_PAGE_TOKEN_PREFIX + base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, page_token: str) -> "PageToken":
+        """Parse a `page_token` sent by a client.
+
+        :raises ValueError: If the token claims to continue a directory listing but is malformed.
+        """
+        if not page_token.startswith(_DIRECTORY_PAGE_TOKEN_PREFIX):
+            return cls(s3_continuation_token=page_token)
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(page_token[len(_DIRECTORY_PAGE_TOKEN_PREFIX) :]))
+            return cls(
+                s3_continuation_token=payload["token"],
+                prefix=payload["prefix"],
+                delimiter=payload["delimiter"],
+                page_size=payload.get("page_size"),
+            )
+        except (binascii.Error, ValueError, KeyError, TypeError) as err:
+            raise ValueError("invalid page_token") from err
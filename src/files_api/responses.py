@@ -0,0 +1,147 @@
+"""Response classes for streaming bodies produced by S3 calls, or cached from them."""
+
+import functools
+from typing import (
+    Awaitable,
+    Callable,
+    Mapping,
+    Optional,
+)
+
+import anyio
+from anyio.streams.memory import MemoryObjectSendStream
+from fastapi.responses import (
+    FileResponse,
+    StreamingResponse,
+)
+from starlette.types import (
+    Receive,
+    Scope,
+    Send,
+)
+
+from files_api.compression import Decompressor
+from files_api.s3.disk_cache import (
+    DiskCache,
+    DiskCacheEntry,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.streaming import (
+    DEFAULT_DOWNLOAD_CHUNK_SIZE_BYTES,
+    ChunkSink,
+    ReadableBody,
+    read_s3_object_body,
+)
+
+Producer = Callable[[MemoryObjectSendStream[bytes]], Awaitable[None]]
+
+
+class ProducerStreamingResponse(StreamingResponse):
+    """Stream the chunks a background task sends, while the task keeps producing the next ones.
+
+    ``producer`` runs in a task group for as long as the response is being sent. It must close
+    the stream it is given once it is done. The stream is unbuffered, so the producer waits
+    whenever it is one chunk ahead of the client. If sending fails, e.g. because the client
+    disconnected, the producer is cancelled.
+
+    :param producer: Async function that sends the body's chunks to the stream it is given.
+    """
+
+    def __init__(
+        self,
+        producer: Producer,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+    ) -> None:
+        self._chunks_to_send, chunks = anyio.create_memory_object_stream[bytes](max_buffer_size=0)
+        super().__init__(chunks, status_code=status_code, headers=headers, media_type=media_type)
+        self.producer = producer
+
+    async def stream_response(self, send: Send) -> None:
+        send_error: Optional[Exception] = None
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(self.producer, self._chunks_to_send)
+            try:
+                await super().stream_response(send)
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # e.g. OSError when the client disconnected
+                send_error = err
+                task_group.cancel_scope.cancel()
+        # re-raised outside the task group so it is not wrapped in an ExceptionGroup
+        if send_error is not None:
+            raise send_error
+
+
+class S3ObjectStreamingResponse(ProducerStreamingResponse):
+    """Stream the body of a `get_object` response to the client.
+
+    Iterating botocore's ``StreamingBody`` directly reads it 1 KiB at a time, each read a blocking
+    call on the event loop. This reads ``chunk_size`` bytes at a time off the event loop instead,
+    with the next chunk read from S3 while the previous one is sent to the client.
+    If the client disconnects, reading stops and the S3 body is closed.
+
+    :param s3: Executor used to read the body.
+    :param body: The ``Body`` of the `get_object` response.
+    :param content_length: Number of bytes sent, i.e. the response's ``ContentLength``, or None if
+        it is not known up front, in which case the response is sent with chunked encoding.
+    :param chunk_size: Maximum number of bytes read from S3 at a time.
+    :param decompressor: Optional decompressor for a compressed body, to send it decompressed.
+    :param sink: Optional sink to copy the body into as it is read, e.g. a `DiskCacheFill`.
+    """
+
+    def __init__(
+        self,
+        s3: S3Executor,
+        body: ReadableBody,
+        content_length: Optional[int],
+        chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE_BYTES,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        decompressor: Optional[Decompressor] = None,
+        sink: Optional[ChunkSink] = None,
+    ) -> None:
+        headers = dict(headers or {})
+        if content_length is not None:
+            headers["Content-Length"] = str(content_length)
+        super().__init__(
+            functools.partial(
+                read_s3_object_body, s3, body, chunk_size=chunk_size, decompressor=decompressor, sink=sink
+            ),
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+        )
+
+
+class DiskCachedFileResponse(FileResponse):
+    """Send a file of a `DiskCache`, and release it once it has been sent.
+
+    Starlette's ``FileResponse`` answers single and multiple `Range` requests from the file itself.
+    On servers that support the ASGI ``http.response.pathsend`` extension, whole files are handed
+    to the server by path, to send with ``sendfile(2)`` without copying them through Python;
+    otherwise they are read ``chunk_size`` bytes at a time in worker threads.
+
+    :param disk_cache: The cache the entry was looked up in.
+    :param entry: An entry returned by `DiskCache.lookup`, released when the response is done.
+    :param chunk_size: Maximum number of bytes read from the file at a time.
+    """
+
+    def __init__(
+        self,
+        disk_cache: DiskCache,
+        entry: DiskCacheEntry,
+        chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE_BYTES,
+        headers: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        super().__init__(entry.path, headers=headers, media_type=entry.content_type)
+        self.chunk_size = chunk_size
+        self.disk_cache = disk_cache
+        self.entry = entry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.disk_cache.release(self.entry)
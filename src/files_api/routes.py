@@ -1,32 +1,195 @@
+import functools
+import os
+import secrets
+import tarfile
+import tempfile
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from typing import (
+    AsyncIterator,
+    List,
+    Literal,
+    Optional,
+)
+
+import anyio
+from anyio.streams.memory import MemoryObjectSendStream
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+)
 from fastapi import (
     APIRouter,
+    BackgroundTasks,
     Depends,
+    Form,
     HTTPException,
+    Query,
     Request,
     Response,
     UploadFile,
     status,
 )
-from fastapi.responses import StreamingResponse
+from fastapi.responses import (
+    PlainTextResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 
+from files_api.archives import (
+    ArchivedFile,
+    ArchiveWriter,
+    TarArchiveWriter,
+    ZipArchiveWriter,
+    iter_tar_files,
+)
+from files_api.byte_ranges import (
+    ByteRange,
+    format_content_range,
+    multipart_byteranges_closing,
+    multipart_byteranges_length,
+    multipart_byteranges_part_header,
+    parse_content_range,
+    parse_range_header,
+)
+from files_api.compression import (
+    CompressionPolicy,
+    accepts_encoding,
+    compress_file_content,
+    create_decompressor,
+    decompress,
+)
+from files_api.conditional_requests import (
+    format_http_date,
+    read_conditions_from_headers,
+)
+from files_api.errors import (
+    InvalidArchiveError,
+    ObjectNotFoundError,
+    PreconditionFailedError,
+    RangeNotSatisfiableError,
+)
+from files_api.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    AppMetrics,
+)
+from files_api.page_tokens import PageToken
+from files_api.responses import (
+    DiskCachedFileResponse,
+    ProducerStreamingResponse,
+    S3ObjectStreamingResponse,
+)
+from files_api.s3.bulk import (
+    CopyBatchResult,
+    DeleteBatchResult,
+    ObjectToUpload,
+    copy_s3_object_of_any_size,
+    copy_s3_objects_in_batches,
+    delete_s3_objects_in_batches,
+    fetch_s3_objects_metadata_concurrently,
+    iter_in_batches,
+    iter_s3_keys_in_batches,
+    upload_s3_object_and_check_existence,
+    upload_s3_objects_concurrently,
+    upload_streamed_s3_object_and_check_existence,
+)
+from files_api.s3.coalescing import (
+    ReadCoalescer,
+    run_coalesced,
+)
+from files_api.s3.dedup import (
+    delete_deduplicated_s3_object,
+    delete_deduplicated_s3_objects_in_batches,
+    fetch_blob_keys,
+    release_blob_references,
+    resolve_listed_pointers,
+    transfer_blob_references,
+    upload_deduplicated_s3_object,
+)
 from files_api.s3.delete_objects import delete_s3_object
+from files_api.s3.disk_cache import (
+    DiskCache,
+    DiskCacheFill,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.listing_cache import ListingCache
+from files_api.s3.object_cache import (
+    CachedObject,
+    ObjectCache,
+)
+from files_api.s3.presigned_urls import (
+    generate_presigned_download_url,
+    generate_presigned_upload_part_urls,
+    generate_presigned_upload_url,
+)
 from files_api.s3.read_objects import (
+    ReadConditions,
     fetch_s3_object,
-    fetch_s3_objects_metadata,
-    fetch_s3_objects_using_page_token,
+    fetch_s3_object_metadata,
+    fetch_s3_objects_page,
+    iter_s3_object_pages,
     object_exists_in_s3,
 )
-from files_api.s3.write_objects import upload_s3_object
+from files_api.s3.streaming import (
+    list_s3_objects_sharded,
+    read_s3_object_body,
+    upload_s3_object_from_stream,
+    write_s3_objects_archive,
+)
+from files_api.s3.write_objects import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    upload_s3_object,
+)
 from files_api.schemas import (
+    DEFAULT_GET_FILES_DIRECTORY,
+    DEFAULT_GET_FILES_PAGE_SIZE,
+    CompleteMultipartUploadRequest,
+    CopiedFile,
+    CopyFileRequest,
+    CopyFilesProgress,
+    CopyFilesRequest,
+    CreatePresignedDownloadUrlRequest,
+    CreatePresignedMultipartUploadRequest,
+    CreatePresignedUploadUrlRequest,
+    DeleteFilesProgress,
+    DeleteFilesRequest,
+    DiskCacheStatsResponse,
+    FileError,
     FileMetadata,
+    FileMetadataResult,
+    GetFilesMetadataRequest,
+    GetFilesMetadataResponse,
     GetFilesQueryParams,
     GetFilesResponse,
+    ObjectCacheStatsResponse,
+    PresignedMultipartUploadResponse,
+    PresignedUploadPart,
+    PresignedUrlResponse,
     PutFileResponse,
+    ReadCoalescingStatsResponse,
+    UploadFileResult,
+    UploadFilesResponse,
 )
 from files_api.settings import Settings
 
+try:
+    from mypy_boto3_s3.type_defs import GetObjectOutputTypeDef
+except ImportError:
+    ...
+
 ROUTER = APIRouter(tags=["Files"])
 
+# the most keys S3 returns per list_objects_v2 call
+STREAM_FILES_PAGE_SIZE = 1000
+# larger tar uploads are spooled to disk
+TAR_UPLOAD_MAX_SPOOLED_IN_MEMORY_BYTES = 16 * 1024 * 1024
+TAR_UPLOAD_READ_CHUNK_SIZE_BYTES = 1024 * 1024
+
 
 @ROUTER.put(
     "/v1/files/{file_path:path}",
@@ -38,10 +201,49 @@ ROUTER = APIRouter(tags=["Files"])
 async def upload_file(request: Request, file_path: str, file: UploadFile, response: Response) -> PutFileResponse:
     """Upload a file."""
     settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+    compression: Optional[CompressionPolicy] = request.app.state.compression_policy
+
+    if_match = request.headers.get("If-Match")
+    if settings.upload_deduplication:
+        object_already_exists = await upload_deduplicated_s3_object(
+            s3=s3,
+            bucket_name=settings.s3_bucket_name,
+            object_key=file_path,
+            # hashed from the spooled upload, so content that is already stored is never read into memory
+            file_content=file.file,
+            content_type=file.content_type,
+            blob_prefix=settings.deduplication_blob_prefix,
+            compression=compression,
+            if_match=if_match,
+        )
+    elif if_match:
+        # optimistic concurrency: only overwrite the version the client last saw, which implies the file exists
+        file_contents, content_encoding = await compress_file_content(
+            compression, await file.read(), file.content_type
+        )
+        await s3.run(
+            upload_s3_object,
+            bucket_name=settings.s3_bucket_name,
+            object_key=file_path,
+            file_content=file_contents,
+            content_type=file.content_type,
+            if_match=if_match,
+            content_encoding=content_encoding,
+        )
+        object_already_exists = True
+    else:
+        object_already_exists = await upload_s3_object_and_check_existence(
+            s3=s3,
+            bucket_name=settings.s3_bucket_name,
+            object_key=file_path,
+            file_content=await file.read(),
+            content_type=file.content_type,
+            use_conditional_put=settings.upload_use_conditional_put,
+            compression=compression,
+        )
+    _invalidate_cached_file(request, file_path)
 
-    file_contents: bytes = await file.read()
-    object_already_exists = object_exists_in_s3(settings.s3_bucket_name, object_key=file_path)
-    print("Inside the upload file function")
     if object_already_exists:
         response_message = f"Existing file updated at path: /{file_path}"
         response.status_code = status.HTTP_200_OK
@@ -49,12 +251,61 @@ async def upload_file(request: Request, file_path: str, file: UploadFile, respon
         response_message = f"New file uploaded at path : /{file_path}"
         response.status_code = status.HTTP_201_CREATED
 
-    upload_s3_object(
+    return PutFileResponse(
+        file_path=file_path,
+        message=response_message,
+    )
+
+
+@ROUTER.put(
+    "/v1/uploads/{file_path:path}",
+    responses={
+        status.HTTP_200_OK: {"model": PutFileResponse},
+        status.HTTP_201_CREATED: {"model": PutFileResponse},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def upload_file_stream(request: Request, file_path: str, response: Response) -> PutFileResponse:
+    """Upload a file by streaming the raw request body to S3.
+
+    Unlike `PUT /v1/files/{file_path}`, the body is not a multipart form: it is the file itself,
+    and the `Content-Type` header is stored as the file's content type. Parts are sent to S3
+    while the body is still arriving, so the file is never held in memory or on disk in full.
+    The uploaded file is available under `/v1/files/{file_path}`.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    overwritten_blob_keys = await _fetch_overwritten_blob_keys(request, [file_path])
+    object_already_exists = await s3.run(
+        object_exists_in_s3,
         bucket_name=settings.s3_bucket_name,
         object_key=file_path,
-        file_content=file_contents,
-        content_type=file.content_type,
     )
+    if object_already_exists:
+        response_message = f"Existing file updated at path: /{file_path}"
+        response.status_code = status.HTTP_200_OK
+    else:
+        response_message = f"New file uploaded at path : /{file_path}"
+        response.status_code = status.HTTP_201_CREATED
+
+    await upload_s3_object_from_stream(
+        s3=s3,
+        chunks=request.stream(),
+        bucket_name=settings.s3_bucket_name,
+        object_key=file_path,
+        content_type=request.headers.get("Content-Type"),
+        part_size=settings.upload_part_size_bytes,
+        max_concurrent_parts=settings.upload_max_concurrent_parts,
+        compression=request.app.state.compression_policy,
+    )
+    await _release_overwritten_blobs(request, overwritten_blob_keys)
+    _invalidate_cached_file(request, file_path)
 
     return PutFileResponse(
         file_path=file_path,
@@ -62,25 +313,179 @@ async def upload_file(request: Request, file_path: str, file: UploadFile, respon
     )
 
 
+@ROUTER.post("/v1/bulk/upload")
+async def upload_files(
+    request: Request,
+    files: List[UploadFile],
+    directory: str = Form(default="", description="Prefix prepended to the filenames, e.g. `path/to/`."),
+) -> UploadFilesResponse:
+    """Upload many files in one request.
+
+    Each file of the multipart form's `files` field is stored at `directory` followed by the file's
+    filename, which may contain `/`. The files are sent to S3 concurrently. Files that cannot be
+    uploaded do not stop the others; the outcome of each file is in the response.
+    A form can hold at most 1000 files; use `POST /v1/bulk/upload/tar` for more.
+    """
+
+    async def objects_to_upload() -> AsyncIterator[ObjectToUpload]:
+        for file in files:
+            yield ObjectToUpload(
+                object_key=directory + (file.filename or ""),
+                content=await file.read(),
+                content_type=file.content_type,
+            )
+
+    return await _upload_files(request, objects_to_upload())
+
+
+@ROUTER.post(
+    "/v1/bulk/upload/tar",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/x-tar": {"schema": {"type": "string", "format": "binary"}}},
+        }
+    },
+)
+async def upload_tar(
+    request: Request,
+    directory: str = Query(default="", description="Prefix prepended to the paths in the archive, e.g. `path/to/`."),
+) -> UploadFilesResponse:
+    """Upload every file of a tar archive, sent as the raw request body.
+
+    Each regular file of the archive is stored at `directory` followed by its path within the archive.
+    The archive may be gzip, bz2 or xz compressed. It is spooled to a temporary file (in memory while
+    it is small), then its files are sent to S3 concurrently while the next ones are read from it.
+    Files larger than an upload part are streamed to S3 as they are read, one at a time, rather than
+    read into memory. Files that cannot be uploaded do not stop the others; the outcome of each file
+    is in the response.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    with tempfile.SpooledTemporaryFile(max_size=TAR_UPLOAD_MAX_SPOOLED_IN_MEMORY_BYTES) as archive:
+        async for chunk in request.stream():
+            await s3.run_sync(archive.write, chunk)
+        archive.seek(0)
+
+        archived_files = iter_tar_files(archive, max_content_size=settings.upload_part_size_bytes)
+
+        def read_next_files() -> list[ArchivedFile]:
+            # one worker thread round-trip per upload slot's worth of files, rather than per file; a file
+            # to stream ends the batch, since it must be read in full before the next file is read
+            next_files = []
+            for archived_file in archived_files:
+                next_files.append(archived_file)
+                if archived_file.stream is not None or len(next_files) == settings.bulk_upload_max_concurrent_uploads:
+                    break
+            return next_files
+
+        try:
+            # reads every header, so invalid archives are rejected before any file is uploaded
+            next_files = await s3.run_sync(read_next_files)
+        except tarfile.TarError as err:
+            raise InvalidArchiveError(str(err)) from err
+
+        async def objects_to_upload() -> AsyncIterator[ObjectToUpload]:
+            nonlocal next_files
+            while next_files:
+                for archived_file in next_files:
+                    if archived_file.stream is None:
+                        yield ObjectToUpload(
+                            object_key=directory + archived_file.path,
+                            content=archived_file.content or b"",
+                            content_type=archived_file.content_type,
+                        )
+                        continue
+                    send_chunks, receive_chunks = anyio.create_memory_object_stream[bytes]()
+                    yield ObjectToUpload(
+                        object_key=directory + archived_file.path,
+                        content=b"",
+                        content_type=archived_file.content_type,
+                        chunks=receive_chunks,
+                    )
+                    # read here rather than by the upload, so the archive is only ever read by one thread
+                    with send_chunks:
+                        try:
+                            while chunk := await s3.run_sync(
+                                archived_file.stream.read, TAR_UPLOAD_READ_CHUNK_SIZE_BYTES
+                            ):
+                                await send_chunks.send(chunk)
+                        except anyio.BrokenResourceError:
+                            # the upload failed, and its error is reported in its result
+                            pass
+                next_files = await s3.run_sync(read_next_files)
+
+        try:
+            return await _upload_files(request, objects_to_upload())
+        finally:
+            archived_files.close()
+
+
 @ROUTER.get("/v1/files")
 async def list_files(
     request: Request,
+    background_tasks: BackgroundTasks,
     query_params: GetFilesQueryParams = Depends(),
 ) -> GetFilesResponse:
     """List files with pagination."""
     settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+    listing_cache: Optional[ListingCache] = request.app.state.listing_cache
     if query_params.page_token:
-        files, next_page_token = fetch_s3_objects_using_page_token(
+        page_token = PageToken.decode(query_params.page_token)
+        s3_continuation_token, prefix, delimiter = (
+            page_token.s3_continuation_token,
+            page_token.prefix,
+            page_token.delimiter,
+        )
+        page_size = page_token.page_size or DEFAULT_GET_FILES_PAGE_SIZE
+    else:
+        s3_continuation_token = None
+        prefix = query_params.directory or DEFAULT_GET_FILES_DIRECTORY
+        delimiter = "/" if query_params.recursive is False else None
+        page_size = query_params.page_size or DEFAULT_GET_FILES_PAGE_SIZE
+    if listing_cache is None:
+        files, directories, next_continuation_token = await run_coalesced(
+            request.app.state.read_coalescer,
+            s3,
+            fetch_s3_objects_page,
             bucket_name=settings.s3_bucket_name,
-            continuation_token=query_params.page_token,
-            max_keys=query_params.page_size,
+            prefix=prefix,
+            page_token=s3_continuation_token,
+            max_keys=page_size,
+            delimiter=delimiter,
         )
     else:
-        files, next_page_token = fetch_s3_objects_metadata(
+        files, directories, next_continuation_token = await listing_cache.fetch(
+            s3=s3,
+            bucket_name=settings.s3_bucket_name,
+            prefix=prefix,
+            page_token=s3_continuation_token,
+            page_size=page_size,
+            delimiter=delimiter,
+        )
+        if next_continuation_token and settings.listing_prefetch_next_page:
+            # the page_token handed out carries page_size, so the next request asks for the same page
+            background_tasks.add_task(
+                listing_cache.prefetch,
+                s3=s3,
+                bucket_name=settings.s3_bucket_name,
+                prefix=prefix,
+                page_token=next_continuation_token,
+                page_size=page_size,
+                delimiter=delimiter,
+            )
+
+    if settings.upload_deduplication:
+        files = await resolve_listed_pointers(
+            s3=s3,
             bucket_name=settings.s3_bucket_name,
-            prefix=query_params.directory,
-            max_keys=query_params.page_size,
+            files=files,
+            blob_prefix=settings.deduplication_blob_prefix,
+            max_concurrent_lookups=settings.bulk_metadata_max_concurrent_lookups,
         )
+        directories = [directory for directory in directories if directory != settings.deduplication_blob_prefix]
 
     # Convert the S3 object metadata to a list of FileMetadata objects
     file_metadata_list = [
@@ -91,7 +496,110 @@ async def list_files(
         )
         for file in files
     ]
-    return GetFilesResponse(files=file_metadata_list, next_page_token=next_page_token if next_page_token else None)
+    next_page_token = (
+        PageToken(
+            s3_continuation_token=next_continuation_token,
+            prefix=prefix,
+            delimiter=delimiter,
+            page_size=page_size if page_size != DEFAULT_GET_FILES_PAGE_SIZE else None,
+        ).encode()
+        if next_continuation_token
+        else None
+    )
+    return GetFilesResponse(files=file_metadata_list, directories=directories, next_page_token=next_page_token)
+
+
+@ROUTER.get(
+    "/v1/listings",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "One JSON-encoded `FileMetadata` per line.",
+            "content": {"application/x-ndjson": {"schema": FileMetadata.model_json_schema()}},
+        }
+    },
+)
+async def stream_files(
+    request: Request,
+    directory: str = Query(DEFAULT_GET_FILES_DIRECTORY, description="The directory to list files from."),
+) -> StreamingResponse:
+    """List every file in a directory as newline-delimited JSON.
+
+    Unlike `GET /v1/files`, there are no pages to follow: the files are listed from S3
+    1000 at a time and each batch is streamed to the client once the previous one was sent.
+    Sub-directories are listed concurrently, each at most a page ahead, but files are always
+    returned in key order. Listing stops as soon as the client disconnects.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+    # the first page is fetched before the response starts, so that S3 errors still get a proper status code
+    if settings.listing_max_concurrent_shards > 1:
+        first_page = await s3.run(
+            fetch_s3_objects_page,
+            bucket_name=settings.s3_bucket_name,
+            prefix=directory,
+            max_keys=STREAM_FILES_PAGE_SIZE,
+            delimiter="/",
+        )
+        list_pages = functools.partial(
+            list_s3_objects_sharded,
+            s3,
+            settings.s3_bucket_name,
+            directory,
+            max_concurrent_shards=settings.listing_max_concurrent_shards,
+            page_size=STREAM_FILES_PAGE_SIZE,
+            first_page=first_page,
+        )
+    else:
+        pages = iter_s3_object_pages(
+            bucket_name=settings.s3_bucket_name,
+            prefix=directory,
+            page_size=STREAM_FILES_PAGE_SIZE,
+            s3_client=s3.s3_client,
+        )
+        first_sequential_page = await s3.run_sync(next, pages, [])
+
+        async def list_pages(pages_to_send: MemoryObjectSendStream[list]) -> None:
+            try:
+                async with pages_to_send:
+                    page: Optional[list] = first_sequential_page
+                    while page is not None:
+                        await pages_to_send.send(page)
+                        page = await s3.run_sync(next, pages, None)
+            finally:
+                pages.close()
+
+    async def send_ndjson_lines(chunks: MemoryObjectSendStream[bytes]) -> None:
+        # unbuffered, so listing stays no more than a page or so ahead of the client, keeping memory constant
+        pages_to_send, pages_listed = anyio.create_memory_object_stream[list](max_buffer_size=0)
+        async with chunks, anyio.create_task_group() as task_group:
+            task_group.start_soon(list_pages, pages_to_send)
+            async with pages_listed:
+                async for page in pages_listed:
+                    if page and settings.upload_deduplication:
+                        page = await resolve_listed_pointers(
+                            s3=s3,
+                            bucket_name=settings.s3_bucket_name,
+                            files=page,
+                            blob_prefix=settings.deduplication_blob_prefix,
+                            max_concurrent_lookups=settings.bulk_metadata_max_concurrent_lookups,
+                        )
+                    if page:
+                        await chunks.send(
+                            b"".join(
+                                FileMetadata(
+                                    file_path=file["Key"],
+                                    last_modified=file["LastModified"],
+                                    size_bytes=file["Size"],
+                                )
+                                .model_dump_json()
+                                .encode()
+                                + b"\n"
+                                for file in page
+                            )
+                        )
+
+    return ProducerStreamingResponse(send_ndjson_lines, media_type="application/x-ndjson")
 
 
 @ROUTER.head("/v1/files/{file_path:path}")
@@ -101,28 +609,140 @@ async def get_file_metadata(request: Request, file_path: str, response: Response
     Note: by convention, HEAD requests MUST NOT return a body in the response.
     """
     settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
 
-    object_exists = object_exists_in_s3(bucket_name=settings.s3_bucket_name, object_key=file_path)
-    if not object_exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found",
-        )
-    get_oject_response = fetch_s3_object(
+    object_metadata = await run_coalesced(
+        request.app.state.read_coalescer,
+        s3,
+        fetch_s3_object_metadata,
         bucket_name=settings.s3_bucket_name,
         object_key=file_path,
+        conditions=read_conditions_from_headers(request.headers),
     )
-    response.headers["Content-Type"] = get_oject_response["ContentType"]
-    response.headers["Last-Modified"] = get_oject_response["LastModified"].isoformat()
-    response.headers["Content-Length"] = str(get_oject_response["ContentLength"])
+    response.headers["Content-Type"] = object_metadata.content_type
+    response.headers["Last-Modified"] = format_http_date(object_metadata.last_modified)
+    response.headers["ETag"] = object_metadata.etag
+    if not object_metadata.content_encoding:
+        response.headers["Content-Length"] = str(object_metadata.content_length)
+    else:
+        response.headers["Vary"] = "Accept-Encoding"
+        # the size of a file stored compressed is only known in its stored encoding
+        if accepts_encoding(request.headers.get("Accept-Encoding"), object_metadata.content_encoding):
+            response.headers["Content-Encoding"] = object_metadata.content_encoding
+            response.headers["Content-Length"] = str(object_metadata.content_length)
+    response.headers["Accept-Ranges"] = "bytes"
+    if object_metadata.cache_control:
+        response.headers["Cache-Control"] = object_metadata.cache_control
+    for key, value in object_metadata.metadata.items():
+        response.headers[f"x-amz-meta-{key}"] = value
     response.status_code = status.HTTP_200_OK
     return response
 
 
+@ROUTER.get(
+    "/v1/archives/{directory:path}",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The archive.",
+            "content": {
+                "application/zip": {"schema": {"type": "string", "format": "binary"}},
+                "application/x-tar": {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def download_archive(
+    request: Request,
+    directory: str,
+    archive_format: Literal["zip", "tar"] = Query(default="zip", alias="format", description="The archive format."),
+) -> StreamingResponse:
+    """Download every file in a directory, including its sub-directories, as one zip or tar archive.
+
+    The archive is streamed while it is being built: files are fetched from S3 several at a
+    time ahead of the one being added, and paths in the archive are relative to `directory`.
+    Files are stored uncompressed. An empty directory results in an empty archive.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    prefix = directory if not directory or directory.endswith("/") else f"{directory}/"
+    archive: ArchiveWriter = ZipArchiveWriter() if archive_format == "zip" else TarArchiveWriter()
+    filename = f"{prefix.rstrip('/').rsplit('/', 1)[-1] or 'files'}.{archive.extension}"
+
+    return ProducerStreamingResponse(
+        functools.partial(
+            write_s3_objects_archive,
+            s3,
+            settings.s3_bucket_name,
+            prefix,
+            archive,
+            max_concurrent_objects=settings.archive_max_concurrent_objects,
+            prefetch_max_object_size=settings.archive_prefetch_max_object_size_bytes,
+            chunk_size=settings.download_chunk_size_bytes,
+            exclude_prefix=settings.deduplication_blob_prefix if settings.upload_deduplication else None,
+        ),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        media_type=archive.media_type,
+    )
+
+
+@ROUTER.post("/v1/bulk/metadata")
+async def get_files_metadata(request: Request, metadata_request: GetFilesMetadataRequest) -> GetFilesMetadataResponse:
+    """Look up whether many files exist, and their size, last modified date and ETag.
+
+    Files are looked up in this worker's listing cache first, if it is enabled; the others
+    are looked up in S3 concurrently, with one `HEAD`-equivalent call each.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+    listing_cache: Optional[ListingCache] = request.app.state.listing_cache
+
+    results: dict[str, FileMetadataResult] = {}
+    # listings report the size of pointers rather than of the files they point to
+    if listing_cache is not None and not settings.upload_deduplication:
+        for file_path in metadata_request.file_paths:
+            known, obj = listing_cache.lookup(settings.s3_bucket_name, file_path)
+            if known:
+                results[file_path] = FileMetadataResult(
+                    file_path=file_path,
+                    exists=obj is not None,
+                    size_bytes=obj["Size"] if obj else None,
+                    last_modified=obj["LastModified"] if obj else None,
+                    etag=obj["ETag"] if obj else None,
+                )
+
+    # each file is only looked up once, even if it is requested several times
+    unknown_file_paths = list(dict.fromkeys(path for path in metadata_request.file_paths if path not in results))
+    object_metadata = await fetch_s3_objects_metadata_concurrently(
+        s3=s3,
+        bucket_name=settings.s3_bucket_name,
+        object_keys=unknown_file_paths,
+        max_concurrent_lookups=settings.bulk_metadata_max_concurrent_lookups,
+    )
+    for file_path, metadata in zip(unknown_file_paths, object_metadata):
+        results[file_path] = FileMetadataResult(
+            file_path=file_path,
+            exists=metadata is not None,
+            size_bytes=metadata.content_length if metadata else None,
+            last_modified=metadata.last_modified if metadata else None,
+            etag=metadata.etag if metadata else None,
+        )
+
+    return GetFilesMetadataResponse(files=[results[file_path] for file_path in metadata_request.file_paths])
+
+
 @ROUTER.get("/v1/files/{file_path:path}")
 async def get_file(
     request: Request,
     file_path: str,
+    redirect: bool = Query(
+        default=False,
+        description=(
+            "Respond with a 307 redirect to a presigned S3 URL of the file instead of the file itself, "
+            "so its bytes do not go through this API."
+        ),
+    ),
 ) -> StreamingResponse:
     """Retrieve a file."""
     # Category 1- Business logic: Errors that users can fix
@@ -133,22 +753,539 @@ async def get_file(
     # Error case: not authenticates/authorized to make calls to AWS
     # Error case: the bucket does not exist
     settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
 
-    object_exists = object_exists_in_s3(bucket_name=settings.s3_bucket_name, object_key=file_path)
-    if not object_exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found",
+    if redirect:
+        object_key, content_type = await _presigned_download_object(request, file_path)
+        url = await s3.run(
+            generate_presigned_download_url,
+            bucket_name=settings.s3_bucket_name,
+            object_key=object_key,
+            expires_in=settings.presigned_url_expiry_seconds,
+            content_type=content_type,
         )
-    get_object_response = fetch_s3_object(
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    byte_ranges = parse_range_header(request.headers["Range"]) if "Range" in request.headers else None
+    conditions = read_conditions_from_headers(request.headers)
+    disk_cache: Optional[DiskCache] = request.app.state.disk_cache
+    if disk_cache is not None and conditions is None:
+        entry = await disk_cache.lookup(s3=s3, bucket_name=settings.s3_bucket_name, object_key=file_path)
+        if entry is not None:
+            headers = {
+                "ETag": entry.etag,
+                "Last-Modified": format_http_date(entry.last_modified),
+            }
+            is_servable = True
+            # files stored compressed are on disk as stored; clients that do not accept their encoding,
+            # and multiple ranges of them, are served from S3 as below
+            if entry.content_encoding:
+                headers["Vary"] = "Accept-Encoding"
+                headers["Content-Encoding"] = entry.content_encoding
+                is_servable = accepts_encoding(
+                    request.headers.get("Accept-Encoding"), entry.content_encoding
+                ) and not (byte_ranges and len(byte_ranges) > 1)
+            if is_servable:
+                return DiskCachedFileResponse(
+                    disk_cache=disk_cache,
+                    entry=entry,
+                    chunk_size=settings.download_chunk_size_bytes,
+                    headers=headers,
+                )
+            disk_cache.release(entry)
+
+    object_cache: Optional[ObjectCache] = request.app.state.object_cache
+    if object_cache is not None and not byte_ranges and conditions is None:
+        cached_object_or_response = await object_cache.fetch(
+            s3=s3,
+            bucket_name=settings.s3_bucket_name,
+            object_key=file_path,
+        )
+        if isinstance(cached_object_or_response, CachedObject):
+            cached_object = cached_object_or_response
+            body = cached_object.body
+            headers = {
+                "Accept-Ranges": "bytes",
+                "ETag": cached_object.etag,
+                "Last-Modified": format_http_date(cached_object.last_modified),
+            }
+            if cached_object.content_encoding:
+                headers["Vary"] = "Accept-Encoding"
+                if accepts_encoding(request.headers.get("Accept-Encoding"), cached_object.content_encoding):
+                    headers["Content-Encoding"] = cached_object.content_encoding
+                else:
+                    body = await anyio.to_thread.run_sync(decompress, body, cached_object.content_encoding)
+            return Response(body, media_type=cached_object.content_type, headers=headers)
+        get_object_response = cached_object_or_response
+    else:
+        try:
+            get_object_response = await run_coalesced(
+                request.app.state.read_coalescer,
+                s3,
+                fetch_s3_object,
+                bucket_name=settings.s3_bucket_name,
+                object_key=file_path,
+                byte_range=byte_ranges[0].to_s3_range() if byte_ranges else None,
+                conditions=conditions,
+            )
+        except RangeNotSatisfiableError as err:
+            # only the first range was sent to S3; RFC 9110 only allows a 416 if none of them is satisfiable
+            if len(byte_ranges) == 1:
+                raise
+            byte_ranges = await _satisfiable_byte_ranges(
+                s3=s3, settings=settings, file_path=file_path, byte_ranges=byte_ranges, error=err
+            )
+            get_object_response = await run_coalesced(
+                request.app.state.read_coalescer,
+                s3,
+                fetch_s3_object,
+                bucket_name=settings.s3_bucket_name,
+                object_key=file_path,
+                byte_range=byte_ranges[0].to_s3_range(),
+                conditions=conditions,
+            )
+    content_type = get_object_response["ContentType"]
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": get_object_response["ETag"],
+        "Last-Modified": format_http_date(get_object_response["LastModified"]),
+    }
+    content_encoding = get_object_response.get("ContentEncoding")
+    if content_encoding:
+        headers["Vary"] = "Accept-Encoding"
+        encoding_is_accepted = accepts_encoding(request.headers.get("Accept-Encoding"), content_encoding)
+        # ranges of a file stored compressed are ranges of its compressed bytes, which a
+        # multipart/byteranges body, itself unencoded, cannot carry
+        if not encoding_is_accepted or (byte_ranges and len(byte_ranges) > 1):
+            return await _whole_compressed_file_response(
+                s3=s3,
+                settings=settings,
+                file_path=file_path,
+                get_object_response=get_object_response,
+                headers=headers,
+                decompressed=not encoding_is_accepted,
+                disk_cache=disk_cache,
+            )
+        headers["Content-Encoding"] = content_encoding
+
+    # S3 answers without a Content-Range when the range covers the whole file
+    if not byte_ranges or "ContentRange" not in get_object_response:
+        return S3ObjectStreamingResponse(
+            s3=s3,
+            body=get_object_response["Body"],
+            content_length=get_object_response["ContentLength"],
+            chunk_size=settings.download_chunk_size_bytes,
+            media_type=content_type,
+            headers=headers,
+            sink=_start_disk_cache_fill(disk_cache, settings, file_path, get_object_response),
+        )
+    if len(byte_ranges) == 1:
+        return S3ObjectStreamingResponse(
+            s3=s3,
+            body=get_object_response["Body"],
+            content_length=get_object_response["ContentLength"],
+            chunk_size=settings.download_chunk_size_bytes,
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
+            media_type=content_type,
+            headers={
+                **headers,
+                "Content-Range": get_object_response["ContentRange"],
+            },
+        )
+    return _multipart_byteranges_response(
+        s3=s3,
         bucket_name=settings.s3_bucket_name,
         object_key=file_path,
+        first_range_response=get_object_response,
+        byte_ranges=byte_ranges,
+        headers=headers,
+        chunk_size=settings.download_chunk_size_bytes,
     )
-    file_stream = get_object_response["Body"]
-    content_type = get_object_response["ContentType"]
-    return StreamingResponse(
-        file_stream,
-        media_type=content_type,
+
+
+async def _satisfiable_byte_ranges(
+    s3: S3Executor,
+    settings: Settings,
+    file_path: str,
+    byte_ranges: list[ByteRange],
+    error: RangeNotSatisfiableError,
+) -> list[ByteRange]:
+    """Drop the ranges that lie outside the file, after S3 found the first of them unsatisfiable.
+
+    The file's size comes from S3's error if it reported it, or from a head_object call otherwise.
+
+    :raises RangeNotSatisfiableError: If none of the ranges is satisfiable.
+    """
+    object_size = error.object_size
+    if object_size is None:
+        object_metadata = await s3.run(
+            fetch_s3_object_metadata, bucket_name=settings.s3_bucket_name, object_key=file_path
+        )
+        object_size = error.object_size = object_metadata.content_length
+    satisfiable_ranges = [byte_range for byte_range in byte_ranges if byte_range.resolve(object_size) is not None]
+    if not satisfiable_ranges:
+        raise error
+    return satisfiable_ranges
+
+
+async def _whole_compressed_file_response(
+    s3: S3Executor,
+    settings: Settings,
+    file_path: str,
+    get_object_response: "GetObjectOutputTypeDef",
+    headers: dict[str, str],
+    decompressed: bool,
+    disk_cache: Optional[DiskCache] = None,
+) -> StreamingResponse:
+    """Stream the whole of a file stored compressed, optionally decompressing it on the fly.
+
+    Used where the requested ranges cannot be served, e.g. ranges of the decompressed file, which
+    cannot be fetched from S3. RFC 9110 allows answering a range request with the whole file;
+    if ``get_object_response`` only holds a range, the file is fetched again without it.
+    The file is copied into ``disk_cache``, if given, as it is stored.
+    """
+    if "ContentRange" in get_object_response:
+        get_object_response["Body"].close()
+        get_object_response = await s3.run(
+            fetch_s3_object,
+            bucket_name=settings.s3_bucket_name,
+            object_key=file_path,
+        )
+        headers = {
+            **headers,
+            "ETag": get_object_response["ETag"],
+            "Last-Modified": format_http_date(get_object_response["LastModified"]),
+        }
+    content_encoding = get_object_response["ContentEncoding"]
+    sink = _start_disk_cache_fill(disk_cache, settings, file_path, get_object_response)
+    if not decompressed:
+        return S3ObjectStreamingResponse(
+            s3=s3,
+            body=get_object_response["Body"],
+            content_length=get_object_response["ContentLength"],
+            chunk_size=settings.download_chunk_size_bytes,
+            media_type=get_object_response["ContentType"],
+            headers={**headers, "Content-Encoding": content_encoding},
+            sink=sink,
+        )
+    return S3ObjectStreamingResponse(
+        s3=s3,
+        body=get_object_response["Body"],
+        content_length=None,
+        chunk_size=settings.download_chunk_size_bytes,
+        media_type=get_object_response["ContentType"],
+        headers={**headers, "Accept-Ranges": "none"},
+        decompressor=create_decompressor(content_encoding),
+        sink=sink,
+    )
+
+
+def _start_disk_cache_fill(
+    disk_cache: Optional[DiskCache],
+    settings: Settings,
+    file_path: str,
+    get_object_response: "GetObjectOutputTypeDef",
+) -> Optional[DiskCacheFill]:
+    """Start copying a file into the disk cache while it is streamed, if the response holds all of it."""
+    if disk_cache is None or "ContentRange" in get_object_response:
+        return None
+    return disk_cache.start_fill(settings.s3_bucket_name, file_path, get_object_response)
+
+
+def _invalidate_cached_file(request: Request, file_path: str) -> None:
+    """Drop a file that was just written or deleted from this worker's object, disk and listing caches."""
+    bucket_name = request.app.state.settings.s3_bucket_name
+    object_cache: Optional[ObjectCache] = request.app.state.object_cache
+    if object_cache is not None:
+        object_cache.invalidate(bucket_name, file_path)
+    disk_cache: Optional[DiskCache] = request.app.state.disk_cache
+    if disk_cache is not None:
+        disk_cache.invalidate(bucket_name, file_path)
+    listing_cache: Optional[ListingCache] = request.app.state.listing_cache
+    if listing_cache is not None:
+        listing_cache.invalidate(bucket_name, file_path)
+
+
+async def _upload_files(request: Request, objects: AsyncIterator[ObjectToUpload]) -> UploadFilesResponse:
+    """Upload the files of a batch upload concurrently and report the outcome of each."""
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    async def upload_deduplicated(obj: ObjectToUpload) -> bool:
+        if obj.chunks is not None:
+            # too large to hash before it is stored, so it is stored as is, like streamed uploads
+            overwritten_blob_keys = await _fetch_overwritten_blob_keys(request, [obj.object_key])
+            object_already_exists = await upload_streamed_s3_object_and_check_existence(
+                s3=s3,
+                bucket_name=settings.s3_bucket_name,
+                object_key=obj.object_key,
+                chunks=obj.chunks,
+                content_type=obj.content_type,
+                part_size=settings.upload_part_size_bytes,
+                max_concurrent_parts=settings.upload_max_concurrent_parts,
+                compression=request.app.state.compression_policy,
+            )
+            await _release_overwritten_blobs(request, overwritten_blob_keys)
+            return object_already_exists
+        return await upload_deduplicated_s3_object(
+            s3=s3,
+            bucket_name=settings.s3_bucket_name,
+            object_key=obj.object_key,
+            file_content=obj.content,
+            content_type=obj.content_type,
+            blob_prefix=settings.deduplication_blob_prefix,
+            compression=request.app.state.compression_policy,
+        )
+
+    results = await upload_s3_objects_concurrently(
+        s3=s3,
+        bucket_name=settings.s3_bucket_name,
+        objects=objects,
+        max_concurrent_uploads=settings.bulk_upload_max_concurrent_uploads,
+        use_conditional_put=settings.upload_use_conditional_put,
+        compression=request.app.state.compression_policy,
+        upload_object=upload_deduplicated if settings.upload_deduplication else None,
+        part_size=settings.upload_part_size_bytes,
+        max_concurrent_parts=settings.upload_max_concurrent_parts,
+    )
+    _invalidate_cached_files(request, [result.object_key for result in results if result.error is None])
+
+    files = []
+    for result in results:
+        if isinstance(result.error, BotoCoreError):
+            # e.g. an empty path, rejected by botocore before it reached S3
+            status_code, message = status.HTTP_400_BAD_REQUEST, f"Invalid file path: {result.error}"
+        elif result.error is not None:
+            status_code, message = status.HTTP_502_BAD_GATEWAY, f"Upload failed: {result.error}"
+        elif result.already_existed:
+            status_code, message = status.HTTP_200_OK, f"Existing file updated at path: /{result.object_key}"
+        else:
+            status_code, message = status.HTTP_201_CREATED, f"New file uploaded at path : /{result.object_key}"
+        files.append(UploadFileResult(file_path=result.object_key, message=message, status_code=status_code))
+    total_errors = sum(result.error is not None for result in results)
+    return UploadFilesResponse(files=files, total_uploaded=len(results) - total_errors, total_errors=total_errors)
+
+
+async def _fetch_overwritten_blob_keys(request: Request, file_paths: list[str]) -> dict[str, str]:
+    """With deduplication, find the pointers among the files an upload is about to overwrite.
+
+    Uploads that are not deduplicated replace pointers with plain files, so the blobs of the
+    pointers have to be released once the upload is done, with `_release_overwritten_blobs`.
+    """
+    settings: Settings = request.app.state.settings
+    if not settings.upload_deduplication:
+        return {}
+    return await fetch_blob_keys(
+        s3=request.app.state.s3_executor, bucket_name=settings.s3_bucket_name, object_keys=file_paths
+    )
+
+
+async def _release_overwritten_blobs(request: Request, blob_keys: dict[str, str]) -> None:
+    settings: Settings = request.app.state.settings
+    await release_blob_references(
+        s3=request.app.state.s3_executor, bucket_name=settings.s3_bucket_name, blob_keys=blob_keys
+    )
+
+
+async def _copy_file(request: Request, source: str, destination: str) -> None:
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    if source == destination:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="The destination must differ from the file's path.",
+        )
+    overwritten_blob_keys = await _fetch_overwritten_blob_keys(request, [destination])
+    await copy_s3_object_of_any_size(
+        s3=s3,
+        bucket_name=settings.s3_bucket_name,
+        source_key=source,
+        destination_key=destination,
+        max_concurrent_parts=settings.bulk_copy_max_concurrent_parts,
+    )
+    if settings.upload_deduplication:
+        await transfer_blob_references(
+            s3=s3,
+            bucket_name=settings.s3_bucket_name,
+            copied=[(source, destination)],
+            release_sources=False,
+            overwritten_blob_keys=overwritten_blob_keys,
+        )
+    _invalidate_cached_file(request, destination)
+
+
+def _copy_files(request: Request, copy_request: CopyFilesRequest, delete_sources: bool) -> StreamingResponse:
+    """Copy or move a directory, streaming a `CopyFilesProgress` line per batch."""
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    async def copy_and_report_progress(chunks: MemoryObjectSendStream[bytes]) -> None:
+        total_copied = total_errors = 0
+        # of the batch being copied: batches are copied one after the other
+        overwritten_blob_keys: dict[str, str] = {}
+
+        async def look_up_overwritten_files(destinations: list[str]) -> None:
+            nonlocal overwritten_blob_keys
+            overwritten_blob_keys = await fetch_blob_keys(
+                s3=s3,
+                bucket_name=settings.s3_bucket_name,
+                object_keys=destinations,
+                max_concurrent_lookups=settings.bulk_metadata_max_concurrent_lookups,
+            )
+
+        async def report_progress(result: CopyBatchResult) -> None:
+            nonlocal total_copied, total_errors
+            if settings.upload_deduplication:
+                await transfer_blob_references(
+                    s3=s3,
+                    bucket_name=settings.s3_bucket_name,
+                    copied=result.copied,
+                    release_sources=delete_sources,
+                    max_concurrent_lookups=settings.bulk_metadata_max_concurrent_lookups,
+                    overwritten_blob_keys=overwritten_blob_keys,
+                )
+            _invalidate_cached_files(request, [destination for _, destination in result.copied])
+            if delete_sources:
+                _invalidate_cached_files(request, [source for source, _ in result.copied])
+            total_copied += len(result.copied)
+            total_errors += len(result.errors)
+            progress = CopyFilesProgress(
+                copied=[
+                    CopiedFile(source=source, destination=destination) for source, destination in sorted(result.copied)
+                ],
+                errors=[
+                    FileError(file_path=error["Key"], code=error["Code"], message=error["Message"])
+                    for error in result.errors
+                ],
+                total_copied=total_copied,
+                total_errors=total_errors,
+            )
+            await chunks.send(progress.model_dump_json().encode() + b"\n")
+
+        async with chunks:
+            await copy_s3_objects_in_batches(
+                s3=s3,
+                bucket_name=settings.s3_bucket_name,
+                source_prefix=copy_request.source_directory,
+                destination_prefix=copy_request.destination_directory,
+                on_batch_copied=report_progress,
+                delete_sources=delete_sources,
+                max_concurrent_copies=settings.bulk_copy_max_concurrent_copies,
+                on_batch_listed=look_up_overwritten_files if settings.upload_deduplication else None,
+            )
+
+    return ProducerStreamingResponse(copy_and_report_progress, media_type="application/x-ndjson")
+
+
+async def _presigned_download_object(request: Request, file_path: str) -> tuple[str, Optional[str]]:
+    """The key of the object a presigned download URL of a file is signed for, and the content type to serve.
+
+    With deduplication, the file's path holds a pointer, so the URL is for its blob instead,
+    with the file's content type.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    if settings.upload_deduplication:
+        object_metadata = await s3.run(
+            fetch_s3_object_metadata, bucket_name=settings.s3_bucket_name, object_key=file_path
+        )
+        if object_metadata.blob_key:
+            return object_metadata.blob_key, object_metadata.content_type
+    return file_path, None
+
+
+def _presigned_url_expiry(settings: Settings, expires_in_seconds: Optional[int]) -> int:
+    if expires_in_seconds is None:
+        return settings.presigned_url_expiry_seconds
+    if expires_in_seconds > settings.presigned_url_max_expiry_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"expires_in_seconds must be at most {settings.presigned_url_max_expiry_seconds}.",
+        )
+    return expires_in_seconds
+
+
+def _expires_at(expires_in_seconds: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=expires_in_seconds)
+
+
+def _invalidate_cached_files(request: Request, file_paths: list[str]) -> None:
+    """Like `_invalidate_cached_file`, for many files at once."""
+    if not file_paths:
+        return
+    bucket_name = request.app.state.settings.s3_bucket_name
+    object_cache: Optional[ObjectCache] = request.app.state.object_cache
+    if object_cache is not None:
+        for file_path in file_paths:
+            object_cache.invalidate(bucket_name, file_path)
+    disk_cache: Optional[DiskCache] = request.app.state.disk_cache
+    if disk_cache is not None:
+        for file_path in file_paths:
+            disk_cache.invalidate(bucket_name, file_path)
+    listing_cache: Optional[ListingCache] = request.app.state.listing_cache
+    if listing_cache is not None:
+        listing_cache.invalidate_prefix(bucket_name, os.path.commonprefix(file_paths))
+
+
+def _multipart_byteranges_response(
+    s3: S3Executor,
+    bucket_name: str,
+    object_key: str,
+    first_range_response: "GetObjectOutputTypeDef",
+    byte_ranges: list[ByteRange],
+    headers: dict[str, str],
+    chunk_size: int,
+) -> StreamingResponse:
+    """Respond to a multi-range request with a `multipart/byteranges` body.
+
+    S3 serves a single range per get_object call. The first range has already been fetched;
+    the others are fetched one at a time while the response is being streamed, conditioned
+    on the file's ETag so that all ranges come from the same version of the file. Every
+    call and read goes through ``s3``, like those of a single range.
+    """
+    content_type = first_range_response["ContentType"]
+    first, last, size = parse_content_range(first_range_response["ContentRange"])
+    resolved_ranges = [(first, last)] + [
+        resolved for resolved in (byte_range.resolve(size) for byte_range in byte_ranges[1:]) if resolved is not None
+    ]
+    boundary = secrets.token_hex(16)
+
+    async def send_parts(chunks: MemoryObjectSendStream[bytes]) -> None:
+        range_response = first_range_response
+        try:
+            async with chunks:
+                for index, (range_first, range_last) in enumerate(resolved_ranges):
+                    if index > 0:
+                        range_response = await s3.run(
+                            fetch_s3_object,
+                            bucket_name=bucket_name,
+                            object_key=object_key,
+                            byte_range=f"bytes={range_first}-{range_last}",
+                            conditions=ReadConditions(if_match=first_range_response["ETag"]),
+                        )
+                    content_range = format_content_range(range_first, range_last, size)
+                    await chunks.send(multipart_byteranges_part_header(boundary, content_type, content_range))
+                    # closes its clone of the stream, and the body, once the range was sent
+                    await read_s3_object_body(s3, range_response["Body"], chunks.clone(), chunk_size=chunk_size)
+                    await chunks.send(b"\r\n")
+                await chunks.send(multipart_byteranges_closing(boundary))
+        finally:
+            # if the response is cancelled before the first range was read
+            first_range_response["Body"].close()
+
+    content_length = multipart_byteranges_length(
+        boundary, content_type, ((range_first, range_last, size) for range_first, range_last in resolved_ranges)
+    )
+    return ProducerStreamingResponse(
+        send_parts,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={
+            **headers,
+            "Content-Length": str(content_length),
+        },
     )
 
 
@@ -162,18 +1299,387 @@ async def delete_file(
 
     NOTE: DELETE requests MUST NOT return a body in the response.
     """
-    settings = request.app.state.settings
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
 
-    object_exists = object_exists_in_s3(bucket_name=settings.s3_bucket_name, object_key=file_path)
-    if not object_exists:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="File not found",
+    if_match = request.headers.get("If-Match")
+    if settings.upload_deduplication:
+        try:
+            await delete_deduplicated_s3_object(
+                s3=s3,
+                bucket_name=settings.s3_bucket_name,
+                object_key=file_path,
+                if_match=if_match,
+            )
+        except ObjectNotFoundError as err:
+            if if_match:
+                raise PreconditionFailedError(settings.s3_bucket_name, file_path) from err
+            if settings.delete_missing_file_returns_404:
+                raise
+        _invalidate_cached_file(request, file_path)
+        response.status_code = status.HTTP_204_NO_CONTENT
+        return response
+
+    if settings.delete_missing_file_returns_404 and not if_match:
+        # S3 deletes are idempotent and succeed for missing keys, so finding out
+        # whether the file existed costs an extra call
+        await s3.run(
+            fetch_s3_object_metadata,
+            bucket_name=settings.s3_bucket_name,
+            object_key=file_path,
         )
     # Delete the object from S3
-    delete_s3_object(
+    await s3.run(
+        delete_s3_object,
         bucket_name=settings.s3_bucket_name,
         object_key=file_path,
+        if_match=if_match,
     )
+    _invalidate_cached_file(request, file_path)
     response.status_code = status.HTTP_204_NO_CONTENT
     return response
+
+
+@ROUTER.post(
+    "/v1/bulk/delete",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "One JSON-encoded `DeleteFilesProgress` per line, sent as each batch of files is deleted.",
+            "content": {"application/x-ndjson": {"schema": DeleteFilesProgress.model_json_schema()}},
+        }
+    },
+)
+async def delete_files(request: Request, delete_request: DeleteFilesRequest) -> StreamingResponse:
+    """Delete many files at once: either the given paths, or every file in a directory.
+
+    Files are deleted in batches of up to 1000, several batches at a time. Progress is streamed
+    as newline-delimited JSON, one line per batch, listing the files it deleted and the ones
+    it could not delete; the last line's totals are the outcome of the whole operation.
+    Paths of files that do not exist are reported as deleted.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+    # deduplicated files are pointers, whose blobs are released along with them
+    delete_in_batches = (
+        delete_deduplicated_s3_objects_in_batches if settings.upload_deduplication else delete_s3_objects_in_batches
+    )
+
+    if delete_request.file_paths is not None:
+        batches = iter_in_batches(delete_request.file_paths)
+    else:
+        batches = iter_s3_keys_in_batches(s3=s3, bucket_name=settings.s3_bucket_name, prefix=delete_request.directory)
+
+    async def delete_and_report_progress(chunks: MemoryObjectSendStream[bytes]) -> None:
+        total_deleted = total_errors = 0
+
+        async def report_progress(result: DeleteBatchResult) -> None:
+            nonlocal total_deleted, total_errors
+            _invalidate_cached_files(request, result.deleted)
+            total_deleted += len(result.deleted)
+            total_errors += len(result.errors)
+            progress = DeleteFilesProgress(
+                deleted=result.deleted,
+                errors=[
+                    FileError(file_path=error["Key"], code=error["Code"], message=error["Message"])
+                    for error in result.errors
+                ],
+                total_deleted=total_deleted,
+                total_errors=total_errors,
+            )
+            await chunks.send(progress.model_dump_json().encode() + b"\n")
+
+        async with chunks:
+            await delete_in_batches(
+                s3=s3,
+                bucket_name=settings.s3_bucket_name,
+                batches=batches,
+                on_batch_deleted=report_progress,
+                max_concurrent_batches=settings.bulk_delete_max_concurrent_batches,
+            )
+
+    return ProducerStreamingResponse(delete_and_report_progress, media_type="application/x-ndjson")
+
+
+@ROUTER.post("/v1/files/{file_path:path}/copy")
+async def copy_file(request: Request, file_path: str, copy_request: CopyFileRequest) -> PutFileResponse:
+    """Copy a file to another path, without downloading and uploading it again.
+
+    The copy keeps the file's content type. Files larger than 5 GB are copied in parts.
+    """
+    await _copy_file(request, file_path, copy_request.destination)
+    return PutFileResponse(
+        file_path=copy_request.destination,
+        message=f"File copied from /{file_path} to /{copy_request.destination}",
+    )
+
+
+@ROUTER.post("/v1/files/{file_path:path}/move")
+async def move_file(request: Request, file_path: str, copy_request: CopyFileRequest) -> PutFileResponse:
+    """Move (rename) a file: copy it to another path, then delete it.
+
+    The file is never downloaded or uploaded again, and keeps its content type.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    await _copy_file(request, file_path, copy_request.destination)
+    if settings.upload_deduplication:
+        # releases the file's reference to its blob, which the copy still holds one to
+        await delete_deduplicated_s3_object(s3=s3, bucket_name=settings.s3_bucket_name, object_key=file_path)
+    else:
+        await s3.run(delete_s3_object, bucket_name=settings.s3_bucket_name, object_key=file_path)
+    _invalidate_cached_file(request, file_path)
+    return PutFileResponse(
+        file_path=copy_request.destination,
+        message=f"File moved from /{file_path} to /{copy_request.destination}",
+    )
+
+
+@ROUTER.post(
+    "/v1/bulk/copy",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "One JSON-encoded `CopyFilesProgress` per line, sent as each batch of files is copied.",
+            "content": {"application/x-ndjson": {"schema": CopyFilesProgress.model_json_schema()}},
+        }
+    },
+)
+async def copy_files(request: Request, copy_request: CopyFilesRequest) -> StreamingResponse:
+    """Copy every file in a directory, including its sub-directories, to another directory.
+
+    Files are copied within S3, several at a time, in batches of up to 1000. Progress is streamed
+    as newline-delimited JSON, one line per batch; the last line's totals are the outcome of the
+    whole operation.
+    """
+    return _copy_files(request, copy_request, delete_sources=False)
+
+
+@ROUTER.post(
+    "/v1/bulk/move",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "One JSON-encoded `CopyFilesProgress` per line, sent as each batch of files is moved.",
+            "content": {"application/x-ndjson": {"schema": CopyFilesProgress.model_json_schema()}},
+        }
+    },
+)
+async def move_files(request: Request, copy_request: CopyFilesRequest) -> StreamingResponse:
+    """Move every file in a directory, including its sub-directories, to another directory.
+
+    Like `POST /v1/bulk/copy`, with each batch's files deleted from the source directory once copied.
+    Files that could not be copied are left in place.
+    """
+    return _copy_files(request, copy_request, delete_sources=True)
+
+
+@ROUTER.post("/v1/presigned-urls/download")
+async def create_presigned_download_url(
+    request: Request, url_request: CreatePresignedDownloadUrlRequest
+) -> PresignedUrlResponse:
+    """Create a URL to download a file from S3 directly, e.g. for files too large to go through this API.
+
+    The file is not checked to exist, unless upload deduplication is enabled; downloading a file
+    that does not exist fails with S3's 404.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    expires_in = _presigned_url_expiry(settings, url_request.expires_in_seconds)
+    object_key, content_type = await _presigned_download_object(request, url_request.file_path)
+    url = await s3.run(
+        generate_presigned_download_url,
+        bucket_name=settings.s3_bucket_name,
+        object_key=object_key,
+        expires_in=expires_in,
+        content_type=content_type,
+    )
+    return PresignedUrlResponse(url=url, method="GET", expires_at=_expires_at(expires_in))
+
+
+@ROUTER.post("/v1/presigned-urls/upload")
+async def create_presigned_upload_url(
+    request: Request, url_request: CreatePresignedUploadUrlRequest
+) -> PresignedUrlResponse:
+    """Create a URL to upload a file of up to 5 GB to S3 directly, with a single PUT request.
+
+    Files uploaded through the URL bypass this API, so this worker's caches only pick them up
+    once their entries expire. Use `POST /v1/presigned-urls/multipart-upload` for larger files.
+    Unavailable with upload deduplication, which cannot release the blob of a file overwritten this way.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    if settings.upload_deduplication:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Presigned upload URLs are disabled while upload deduplication is enabled.",
+        )
+
+    expires_in = _presigned_url_expiry(settings, url_request.expires_in_seconds)
+    url = await s3.run(
+        generate_presigned_upload_url,
+        bucket_name=settings.s3_bucket_name,
+        object_key=url_request.file_path,
+        expires_in=expires_in,
+        content_type=url_request.content_type,
+        content_length=url_request.content_length,
+    )
+    headers = {}
+    if url_request.content_type:
+        headers["Content-Type"] = url_request.content_type
+    if url_request.content_length is not None:
+        headers["Content-Length"] = str(url_request.content_length)
+    return PresignedUrlResponse(url=url, method="PUT", headers=headers, expires_at=_expires_at(expires_in))
+
+
+@ROUTER.post("/v1/presigned-urls/multipart-upload")
+async def create_presigned_multipart_upload(
+    request: Request, upload_request: CreatePresignedMultipartUploadRequest
+) -> PresignedMultipartUploadResponse:
+    """Start a multipart upload and create a URL to upload each of its parts to S3 directly.
+
+    Parts can be uploaded in parallel, and a failed part retried on its own.
+    """
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    expires_in = _presigned_url_expiry(settings, upload_request.expires_in_seconds)
+    upload_id = await s3.run(
+        create_multipart_upload,
+        bucket_name=settings.s3_bucket_name,
+        object_key=upload_request.file_path,
+        content_type=upload_request.content_type,
+    )
+    urls = await s3.run(
+        generate_presigned_upload_part_urls,
+        bucket_name=settings.s3_bucket_name,
+        object_key=upload_request.file_path,
+        upload_id=upload_id,
+        part_count=upload_request.part_count,
+        expires_in=expires_in,
+    )
+    return PresignedMultipartUploadResponse(
+        upload_id=upload_id,
+        file_path=upload_request.file_path,
+        parts=[PresignedUploadPart(part_number=number, url=url) for number, url in enumerate(urls, start=1)],
+        expires_at=_expires_at(expires_in),
+    )
+
+
+@ROUTER.post("/v1/multipart-uploads/{upload_id}/complete")
+async def complete_presigned_multipart_upload(
+    request: Request, upload_id: str, complete_request: CompleteMultipartUploadRequest
+) -> PutFileResponse:
+    """Assemble the parts uploaded to the URLs of `POST /v1/presigned-urls/multipart-upload` into the file."""
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    overwritten_blob_keys = await _fetch_overwritten_blob_keys(request, [complete_request.file_path])
+    try:
+        await s3.run(
+            complete_multipart_upload,
+            bucket_name=settings.s3_bucket_name,
+            object_key=complete_request.file_path,
+            upload_id=upload_id,
+            parts=[{"PartNumber": part.part_number, "ETag": part.etag} for part in complete_request.parts],
+        )
+    except ClientError as err:
+        # e.g. NoSuchUpload, InvalidPart or EntityTooSmall
+        if err.response["ResponseMetadata"]["HTTPStatusCode"] in (
+            status.HTTP_400_BAD_REQUEST,
+            status.HTTP_404_NOT_FOUND,
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=err.response["Error"]["Message"]
+            ) from err
+        raise
+    await _release_overwritten_blobs(request, overwritten_blob_keys)
+    _invalidate_cached_file(request, complete_request.file_path)
+    return PutFileResponse(
+        file_path=complete_request.file_path,
+        message=f"Multipart upload completed at path: /{complete_request.file_path}",
+    )
+
+
+@ROUTER.delete("/v1/multipart-uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_presigned_multipart_upload(
+    request: Request,
+    upload_id: str,
+    file_path: str = Query(description="The path the file was being uploaded to."),
+) -> None:
+    """Abort a multipart upload, so that S3 discards the parts uploaded so far."""
+    settings: Settings = request.app.state.settings
+    s3: S3Executor = request.app.state.s3_executor
+
+    await s3.run(
+        abort_multipart_upload,
+        bucket_name=settings.s3_bucket_name,
+        object_key=file_path,
+        upload_id=upload_id,
+    )
+
+
+@ROUTER.get("/v1/object-cache/stats")
+async def get_object_cache_stats(request: Request) -> ObjectCacheStatsResponse:
+    """Counters of this worker's in-memory object cache, for sizing it."""
+    object_cache: Optional[ObjectCache] = request.app.state.object_cache
+    if object_cache is None:
+        return ObjectCacheStatsResponse(enabled=False)
+    return ObjectCacheStatsResponse(
+        enabled=True,
+        hits=object_cache.stats.hits,
+        misses=object_cache.stats.misses,
+        revalidations=object_cache.stats.revalidations,
+        evictions=object_cache.stats.evictions,
+        invalidations=object_cache.stats.invalidations,
+        entries=len(object_cache),
+        size_bytes=object_cache.size_bytes,
+        max_size_bytes=object_cache.max_size_bytes,
+    )
+
+
+@ROUTER.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(request: Request) -> PlainTextResponse:
+    """This worker's request, S3 and cache metrics, in the Prometheus text format."""
+    metrics: Optional[AppMetrics] = request.app.state.metrics
+    if metrics is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled.")
+    return PlainTextResponse(metrics.registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@ROUTER.get("/v1/read-coalescing/stats")
+async def get_read_coalescing_stats(request: Request) -> ReadCoalescingStatsResponse:
+    """Counters of this worker's coalescing of concurrent, identical reads."""
+    read_coalescer: Optional[ReadCoalescer] = request.app.state.read_coalescer
+    if read_coalescer is None:
+        return ReadCoalescingStatsResponse(enabled=False)
+    return ReadCoalescingStatsResponse(
+        enabled=True,
+        calls=read_coalescer.stats.calls,
+        coalesced=read_coalescer.stats.coalesced,
+        unshared_bodies=read_coalescer.stats.unshared_bodies,
+    )
+
+
+@ROUTER.get("/v1/disk-cache/stats")
+async def get_disk_cache_stats(request: Request) -> DiskCacheStatsResponse:
+    """Counters of this worker's disk cache, for sizing it."""
+    disk_cache: Optional[DiskCache] = request.app.state.disk_cache
+    if disk_cache is None:
+        return DiskCacheStatsResponse(enabled=False)
+    return DiskCacheStatsResponse(
+        enabled=True,
+        hits=disk_cache.stats.hits,
+        misses=disk_cache.stats.misses,
+        revalidations=disk_cache.stats.revalidations,
+        fills=disk_cache.stats.fills,
+        abandoned_fills=disk_cache.stats.abandoned_fills,
+        evictions=disk_cache.stats.evictions,
+        invalidations=disk_cache.stats.invalidations,
+        entries=len(disk_cache),
+        size_bytes=disk_cache.size_bytes,
+        max_size_bytes=disk_cache.max_size_bytes,
+    )
@@ -0,0 +1,530 @@
+"""Async helpers that apply one operation to many S3 objects with bounded concurrency."""
+
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Optional,
+)
+
+import anyio
+from anyio.streams.memory import MemoryObjectReceiveStream
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+)
+
+from files_api.compression import (
+    CompressionPolicy,
+    compress_file_content,
+)
+from files_api.errors import (
+    ObjectNotFoundError,
+    PreconditionFailedError,
+)
+from files_api.s3.delete_objects import (
+    MAX_KEYS_PER_DELETE_OBJECTS,
+    delete_s3_objects,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import (
+    ObjectMetadata,
+    fetch_s3_object_metadata,
+    iter_s3_object_pages,
+    object_exists_in_s3,
+)
+from files_api.s3.streaming import (
+    DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    upload_s3_object_from_stream,
+)
+from files_api.s3.write_objects import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    copy_s3_object,
+    create_multipart_upload,
+    upload_part_copy,
+    upload_s3_object,
+)
+
+# the largest object a single copy_object call can copy
+MAX_COPY_OBJECT_SIZE_BYTES = 5 * 1024**3
+DEFAULT_COPY_PART_SIZE_BYTES = 512 * 1024**2
+
+try:
+    from mypy_boto3_s3.type_defs import (
+        CompletedPartTypeDef,
+        ErrorTypeDef,
+        ObjectTypeDef,
+    )
+except ImportError:
+    ...
+
+
+@dataclass(frozen=True)
+class DeleteBatchResult:
+    """Outcome of deleting one batch of keys."""
+
+    deleted: list[str]
+    errors: list["ErrorTypeDef"]
+
+
+@dataclass(frozen=True)
+class CopyBatchResult:
+    """Outcome of copying, or moving, one batch of objects.
+
+    ``copied`` holds (source key, destination key) pairs. ``errors`` are keyed by source key.
+    """
+
+    copied: list[tuple[str, str]]
+    errors: list["ErrorTypeDef"]
+
+
+@dataclass(frozen=True)
+class ObjectToUpload:
+    """One object of a batch upload.
+
+    Objects too large to hold in memory come with ``chunks`` instead of ``content``: their bytes
+    are sent to it while they are being uploaded, and it is closed once the upload is over.
+    """
+
+    object_key: str
+    content: bytes
+    content_type: Optional[str] = None
+    chunks: Optional[MemoryObjectReceiveStream[bytes]] = None
+
+
+@dataclass(frozen=True)
+class UploadResult:
+    """Outcome of uploading one object of a batch.
+
+    ``error`` is the exception the upload failed with, if it failed.
+    """
+
+    object_key: str
+    already_existed: bool = False
+    error: Optional[Exception] = None
+
+
+async def iter_in_batches(
+    object_keys: list[str], batch_size: int = MAX_KEYS_PER_DELETE_OBJECTS
+) -> AsyncIterator[list[str]]:
+    """Split ``object_keys`` into batches of at most ``batch_size`` keys."""
+    for start in range(0, len(object_keys), batch_size):
+        yield object_keys[start : start + batch_size]
+
+
+async def iter_s3_objects_in_batches(
+    s3: S3Executor,
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    batch_size: int = MAX_KEYS_PER_DELETE_OBJECTS,
+) -> AsyncIterator[list["ObjectTypeDef"]]:
+    """List the objects under a prefix, one S3 page of at most ``batch_size`` objects per batch.
+
+    Each page is only listed once the previous batch has been consumed.
+    """
+    pages = iter_s3_object_pages(bucket_name, prefix=prefix, page_size=batch_size, s3_client=s3.s3_client)
+    try:
+        while (page := await s3.run_sync(next, pages, None)) is not None:
+            if page:
+                yield page
+    finally:
+        pages.close()
+
+
+async def iter_s3_keys_in_batches(
+    s3: S3Executor,
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    batch_size: int = MAX_KEYS_PER_DELETE_OBJECTS,
+) -> AsyncIterator[list[str]]:
+    """Like `iter_s3_objects_in_batches`, but only the keys."""
+    async with aclosing(iter_s3_objects_in_batches(s3, bucket_name, prefix, batch_size)) as batches:
+        async for batch in batches:
+            yield [obj["Key"] for obj in batch]
+
+
+async def delete_s3_objects_in_batches(
+    s3: S3Executor,
+    bucket_name: str,
+    batches: AsyncIterable[list[str]],
+    on_batch_deleted: Callable[[DeleteBatchResult], Awaitable[None]],
+    max_concurrent_batches: int = 4,
+) -> None:
+    """Delete batches of up to 1000 keys with one delete_objects call each, several batches at a time.
+
+    Reading from ``batches`` pauses while ``max_concurrent_batches`` deletions are in flight, so
+    a prefix can be listed and deleted at the same time without holding all of its keys in memory.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param batches: The keys to delete, e.g. from `iter_in_batches` or `iter_s3_keys_in_batches`.
+    :param on_batch_deleted: Called with the outcome of each batch, in the order the batches finish.
+    :param max_concurrent_batches: Maximum number of delete_objects calls in flight.
+    """
+    batch_slots = anyio.Semaphore(max_concurrent_batches)
+
+    async def delete_batch(object_keys: list[str]) -> None:
+        try:
+            errors = await s3.run(delete_s3_objects, bucket_name=bucket_name, object_keys=object_keys)
+            failed_keys = {error["Key"] for error in errors}
+            deleted = [object_key for object_key in object_keys if object_key not in failed_keys]
+            await on_batch_deleted(DeleteBatchResult(deleted=deleted, errors=errors))
+        finally:
+            batch_slots.release()
+
+    async with anyio.create_task_group() as task_group:
+        async for object_keys in batches:
+            # back-pressure: stop reading batches until a deletion slot is free
+            await batch_slots.acquire()
+            task_group.start_soon(delete_batch, object_keys)
+
+
+async def upload_s3_object_and_check_existence(
+    s3: S3Executor,
+    bucket_name: str,
+    object_key: str,
+    file_content: bytes,
+    content_type: Optional[str] = None,
+    use_conditional_put: bool = False,
+    compression: Optional[CompressionPolicy] = None,
+) -> bool:
+    """Upload an object, and report whether it overwrote an existing one.
+
+    With ``use_conditional_put``, new objects are written with a single put_object conditioned on
+    If-None-Match: *; only overwrites of existing objects need a second, unconditional put_object.
+    Otherwise a head_object call checks for an existing object before it is written.
+
+    With ``compression``, objects it applies to are compressed before they are stored, and
+    their encoding is stored as their `Content-Encoding`.
+
+    :return: Whether an object already existed at ``object_key``.
+    """
+    file_content, content_encoding = await compress_file_content(compression, file_content, content_type)
+
+    async def put_object(**conditions) -> None:
+        await s3.run(
+            upload_s3_object,
+            bucket_name=bucket_name,
+            object_key=object_key,
+            file_content=file_content,
+            content_type=content_type,
+            content_encoding=content_encoding,
+            **conditions,
+        )
+
+    if use_conditional_put:
+        try:
+            await put_object(if_none_match="*")
+            return False
+        except PreconditionFailedError:
+            await put_object()
+            return True
+
+    object_already_exists = await s3.run(object_exists_in_s3, bucket_name=bucket_name, object_key=object_key)
+    await put_object()
+    return object_already_exists
+
+
+async def upload_streamed_s3_object_and_check_existence(  # pylint: disable=too-many-arguments
+    s3: S3Executor,
+    bucket_name: str,
+    object_key: str,
+    chunks: AsyncIterator[bytes],
+    content_type: Optional[str] = None,
+    part_size: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    max_concurrent_parts: int = 4,
+    compression: Optional[CompressionPolicy] = None,
+) -> bool:
+    """Upload an object with `upload_s3_object_from_stream`, and report whether it overwrote an existing one.
+
+    :return: Whether an object already existed at ``object_key``.
+    """
+    object_already_exists = await s3.run(object_exists_in_s3, bucket_name=bucket_name, object_key=object_key)
+    await upload_s3_object_from_stream(
+        s3=s3,
+        chunks=chunks,
+        bucket_name=bucket_name,
+        object_key=object_key,
+        content_type=content_type,
+        part_size=part_size,
+        max_concurrent_parts=max_concurrent_parts,
+        compression=compression,
+    )
+    return object_already_exists
+
+
+async def upload_s3_objects_concurrently(  # pylint: disable=too-many-arguments
+    s3: S3Executor,
+    bucket_name: str,
+    objects: AsyncIterable[ObjectToUpload],
+    max_concurrent_uploads: int = 16,
+    use_conditional_put: bool = False,
+    compression: Optional[CompressionPolicy] = None,
+    upload_object: Optional[Callable[[ObjectToUpload], Awaitable[bool]]] = None,
+    part_size: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    max_concurrent_parts: int = 4,
+) -> list[UploadResult]:
+    """Upload many objects, several at a time, each with `upload_s3_object_and_check_existence`.
+
+    Objects that come with ``chunks`` are streamed with `upload_streamed_s3_object_and_check_existence`.
+
+    Reading from ``objects`` pauses while ``max_concurrent_uploads`` uploads are in flight,
+    so objects can be produced while earlier ones are being uploaded. An object that fails
+    to upload does not stop the others; its error is returned in its result instead.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param objects: The objects to upload.
+    :param max_concurrent_uploads: Maximum number of objects uploaded at once.
+    :param use_conditional_put: See `upload_s3_object_and_check_existence`.
+    :param compression: See `upload_s3_object_and_check_existence`.
+    :param upload_object: Uploads one object instead, and returns whether it already existed.
+        ``use_conditional_put``, ``compression`` and the part settings are then left to it.
+    :param part_size: See `upload_s3_object_from_stream`.
+    :param max_concurrent_parts: See `upload_s3_object_from_stream`.
+
+    :return: The outcome of each upload, in the order of ``objects``.
+    """
+    results: list[UploadResult] = []
+    upload_slots = anyio.Semaphore(max_concurrent_uploads)
+
+    async def upload(index: int, obj: ObjectToUpload) -> None:
+        try:
+            if upload_object is not None:
+                already_existed = await upload_object(obj)
+            elif obj.chunks is not None:
+                already_existed = await upload_streamed_s3_object_and_check_existence(
+                    s3=s3,
+                    bucket_name=bucket_name,
+                    object_key=obj.object_key,
+                    chunks=obj.chunks,
+                    content_type=obj.content_type,
+                    part_size=part_size,
+                    max_concurrent_parts=max_concurrent_parts,
+                    compression=compression,
+                )
+            else:
+                already_existed = await upload_s3_object_and_check_existence(
+                    s3=s3,
+                    bucket_name=bucket_name,
+                    object_key=obj.object_key,
+                    file_content=obj.content,
+                    content_type=obj.content_type,
+                    use_conditional_put=use_conditional_put,
+                    compression=compression,
+                )
+            results[index] = UploadResult(object_key=obj.object_key, already_existed=already_existed)
+        except (ClientError, BotoCoreError) as err:
+            results[index] = UploadResult(object_key=obj.object_key, error=err)
+        finally:
+            if obj.chunks is not None:
+                # stops the sender of the chunks if the upload ended before reading them all
+                obj.chunks.close()
+            upload_slots.release()
+
+    async with anyio.create_task_group() as task_group:
+        async for obj in objects:
+            # back-pressure: stop reading objects until an upload slot is free
+            await upload_slots.acquire()
+            results.append(UploadResult(object_key=obj.object_key))
+            task_group.start_soon(upload, len(results) - 1, obj)
+    return results
+
+
+async def fetch_s3_objects_metadata_concurrently(
+    s3: S3Executor,
+    bucket_name: str,
+    object_keys: list[str],
+    max_concurrent_lookups: int = 32,
+) -> list[Optional[ObjectMetadata]]:
+    """Fetch the metadata of many objects with one head_object call each, several at a time.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param object_keys: Keys of the objects to look up.
+    :param max_concurrent_lookups: Maximum number of head_object calls in flight.
+
+    :return: The metadata of each object, or None for objects that do not exist, in the order of ``object_keys``.
+    """
+    results: list[Optional[ObjectMetadata]] = [None] * len(object_keys)
+    lookup_slots = anyio.Semaphore(max_concurrent_lookups)
+
+    async def lookup(index: int, object_key: str) -> None:
+        async with lookup_slots:
+            try:
+                results[index] = await s3.run(fetch_s3_object_metadata, bucket_name=bucket_name, object_key=object_key)
+            except ObjectNotFoundError:
+                pass
+
+    async with anyio.create_task_group() as task_group:
+        for index, object_key in enumerate(object_keys):
+            task_group.start_soon(lookup, index, object_key)
+    return results
+
+
+async def copy_s3_object_of_any_size(  # pylint: disable=too-many-arguments
+    s3: S3Executor,
+    bucket_name: str,
+    source_key: str,
+    destination_key: str,
+    size: Optional[int] = None,
+    multipart_threshold: int = MAX_COPY_OBJECT_SIZE_BYTES,
+    part_size: int = DEFAULT_COPY_PART_SIZE_BYTES,
+    max_concurrent_parts: int = 4,
+) -> None:
+    """Copy an object within the bucket, without its bytes leaving S3.
+
+    Objects of up to ``multipart_threshold`` bytes are copied with a single copy_object call.
+    Larger ones, which copy_object rejects beyond 5 GiB, are copied as a multipart upload whose
+    parts are copied from byte ranges of the source with upload_part_copy, ``max_concurrent_parts``
+    at a time. The copy keeps the source's content type, cache control and metadata either way.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param source_key: Key of the object to copy.
+    :param destination_key: Key to copy the object to; an existing object there is overwritten.
+    :param size: Size of the source object, if known from a listing; otherwise it is looked up.
+    :param multipart_threshold: Objects larger than this are copied in parts; at most 5 GiB.
+    :param part_size: Size in bytes of each copied part; at least 5 MiB.
+    :param max_concurrent_parts: Maximum number of parts copied concurrently.
+
+    :raises ObjectNotFoundError: If the source object does not exist.
+    """
+    metadata: Optional[ObjectMetadata] = None
+    if size is None:
+        metadata = await s3.run(fetch_s3_object_metadata, bucket_name=bucket_name, object_key=source_key)
+        # a pointer object is copied, not the blob its content_length is the size of
+        size = 0 if metadata.blob_key else metadata.content_length
+    if size <= multipart_threshold:
+        await s3.run(copy_s3_object, bucket_name=bucket_name, source_key=source_key, destination_key=destination_key)
+        return
+
+    # unlike copy_object, a multipart upload does not take the source's metadata along
+    metadata = metadata or await s3.run(fetch_s3_object_metadata, bucket_name=bucket_name, object_key=source_key)
+    upload_id = await s3.run(
+        create_multipart_upload,
+        bucket_name=bucket_name,
+        object_key=destination_key,
+        content_type=metadata.content_type,
+        cache_control=metadata.cache_control,
+        metadata=metadata.metadata,
+        content_encoding=metadata.content_encoding,
+    )
+    completed_parts: list["CompletedPartTypeDef"] = []
+    part_slots = anyio.Semaphore(max_concurrent_parts)
+
+    async def copy_part(part_number: int, first_byte: int) -> None:
+        async with part_slots:
+            last_byte = min(first_byte + part_size, size) - 1
+            completed_parts.append(
+                await s3.run(
+                    upload_part_copy,
+                    bucket_name=bucket_name,
+                    object_key=destination_key,
+                    upload_id=upload_id,
+                    part_number=part_number,
+                    source_key=source_key,
+                    byte_range=f"bytes={first_byte}-{last_byte}",
+                )
+            )
+
+    try:
+        async with anyio.create_task_group() as task_group:
+            for part_number, first_byte in enumerate(range(0, size, part_size), start=1):
+                task_group.start_soon(copy_part, part_number, first_byte)
+        await s3.run(
+            complete_multipart_upload,
+            bucket_name=bucket_name,
+            object_key=destination_key,
+            upload_id=upload_id,
+            parts=completed_parts,
+        )
+    except BaseException:
+        # shielded so the abort still happens when the request task is being cancelled
+        with anyio.CancelScope(shield=True):
+            await s3.run(
+                abort_multipart_upload,
+                bucket_name=bucket_name,
+                object_key=destination_key,
+                upload_id=upload_id,
+            )
+        raise
+
+
+async def copy_s3_objects_in_batches(  # pylint: disable=too-many-arguments
+    s3: S3Executor,
+    bucket_name: str,
+    source_prefix: str,
+    destination_prefix: str,
+    on_batch_copied: Callable[[CopyBatchResult], Awaitable[None]],
+    delete_sources: bool = False,
+    max_concurrent_copies: int = 16,
+    multipart_threshold: int = MAX_COPY_OBJECT_SIZE_BYTES,
+    on_batch_listed: Optional[Callable[[list[str]], Awaitable[None]]] = None,
+) -> None:
+    """Copy, or move, every object under ``source_prefix`` to the same path under ``destination_prefix``.
+
+    The prefix is listed one page of up to 1000 objects at a time, and the objects of each page are
+    copied ``max_concurrent_copies`` at a time with `copy_s3_object_of_any_size`. When moving, the
+    sources copied successfully are then deleted with one delete_objects call per page. An object
+    that fails to copy or delete does not stop the others; its error is reported instead.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param source_prefix: Prefix of the objects to copy, e.g. "path/to/".
+    :param destination_prefix: Prefix replacing ``source_prefix`` in the copies' keys. It must not
+        start with ``source_prefix``, or the copies would be listed and copied again.
+    :param on_batch_copied: Called with the outcome of each page, in order.
+    :param delete_sources: Whether to delete the sources once copied, i.e. move them.
+    :param max_concurrent_copies: Maximum number of objects copied concurrently.
+    :param multipart_threshold: See `copy_s3_object_of_any_size`.
+    :param on_batch_listed: Called with the destination keys of each page before it is copied,
+        e.g. to look up the objects the copies will overwrite.
+    """
+    copy_slots = anyio.Semaphore(max_concurrent_copies)
+
+    async def copy(obj: "ObjectTypeDef", copied: list[tuple[str, str]], errors: list["ErrorTypeDef"]) -> None:
+        source_key = obj["Key"]
+        destination_key = destination_prefix + source_key[len(source_prefix) :]
+        async with copy_slots:
+            try:
+                await copy_s3_object_of_any_size(
+                    s3=s3,
+                    bucket_name=bucket_name,
+                    source_key=source_key,
+                    destination_key=destination_key,
+                    size=obj["Size"],
+                    multipart_threshold=multipart_threshold,
+                )
+                copied.append((source_key, destination_key))
+            except ObjectNotFoundError:
+                # deleted after it was listed
+                errors.append({"Key": source_key, "Code": "NoSuchKey", "Message": "The file no longer exists."})
+            except ClientError as err:
+                errors.append(
+                    {"Key": source_key, "Code": err.response["Error"]["Code"], "Message": str(err)},
+                )
+
+    async with aclosing(iter_s3_objects_in_batches(s3, bucket_name, source_prefix)) as batches:
+        async for batch in batches:
+            if on_batch_listed is not None:
+                await on_batch_listed([destination_prefix + obj["Key"][len(source_prefix) :] for obj in batch])
+            copied: list[tuple[str, str]] = []
+            errors: list["ErrorTypeDef"] = []
+            async with anyio.create_task_group() as task_group:
+                for obj in batch:
+                    task_group.start_soon(copy, obj, copied, errors)
+            if delete_sources and copied:
+                delete_errors = await s3.run(
+                    delete_s3_objects,
+                    bucket_name=bucket_name,
+                    object_keys=[source_key for source_key, _ in copied],
+                )
+                failed_keys = {error["Key"] for error in delete_errors}
+                copied = [(source_key, dest) for source_key, dest in copied if source_key not in failed_keys]
+                errors.extend(delete_errors)
+            await on_batch_copied(CopyBatchResult(copied=copied, errors=errors))
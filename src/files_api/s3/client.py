@@ -0,0 +1,46 @@
+"""Construction of the S3 client that is shared across all requests handled by the app."""
+
+from typing import Literal
+
+import boto3
+from botocore.config import Config
+
+try:
+    from mypy_boto3_s3 import S3Client
+except ImportError:
+    ...
+
+RetryMode = Literal["legacy", "standard", "adaptive"]
+
+
+def create_s3_client(
+    max_pool_connections: int = 10,
+    tcp_keepalive: bool = False,
+    max_retry_attempts: int = 3,
+    retry_mode: RetryMode = "standard",
+) -> "S3Client":
+    """Create an S3 client meant to be created once and reused for the lifetime of the app.
+
+    boto3 clients are thread safe. Building one is expensive (credential resolution,
+    loading endpoint/service models) and each client owns its own HTTP connection pool,
+    so reusing a single client lets connections be kept alive across requests.
+
+    :param max_pool_connections: Maximum number of connections kept in the client's connection pool.
+    :param tcp_keepalive: Whether to enable TCP keep-alive on pooled connections.
+    :param max_retry_attempts: Maximum number of attempts made for a single S3 call, including the first one.
+    :param retry_mode: botocore retry mode, see https://boto3.amazonaws.com/v1/documentation/api/latest/guide/retries.html
+
+    :return: A configured S3 client.
+    """
+    config = Config(
+        # SigV4 also for presigned URLs, which otherwise fall back to SigV2 in some regions
+        signature_version="s3v4",
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=tcp_keepalive,
+        retries={
+            "total_max_attempts": max_retry_attempts,
+            "mode": retry_mode,
+        },
+    )
+    session = boto3.session.Session()
+    return session.client("s3", config=config)
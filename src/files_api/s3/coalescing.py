@@ -0,0 +1,135 @@
+"""Single-flight coalescing of concurrent, identical S3 reads."""
+
+import io
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Hashable,
+    Optional,
+    TypeVar,
+)
+
+import anyio
+
+from files_api.s3.executor import S3Executor
+
+T = TypeVar("T")
+
+
+@dataclass
+class ReadCoalescerStats:
+    """Counters for judging how much a `ReadCoalescer` saves.
+
+    ``calls`` counts S3 calls made, and ``coalesced`` the reads that were answered by another
+    read's call instead of making their own. ``unshared_bodies`` counts reads that waited for
+    another read's get_object call but had to make their own, because the body was too large to share.
+    """
+
+    calls: int = 0
+    coalesced: int = 0
+    unshared_bodies: int = 0
+
+
+@dataclass
+class _Flight:
+    done: anyio.Event
+    result: Any = None
+    error: Optional[Exception] = None
+    # the call was interrupted, e.g. because the request that made it was cancelled
+    interrupted: bool = False
+
+
+class ReadCoalescer:
+    """Share one in-flight S3 call among concurrent reads of the same thing ("single-flight").
+
+    The first read of a key makes the S3 call; reads of the same key that arrive while it is in
+    flight wait for it and get its result, or its exception, instead of making their own. Once the
+    call returns, the next read makes a new one, so nothing is served staler than an uncoalesced read.
+    If the call is interrupted because its own request was cancelled, one of the waiting reads
+    makes it again.
+
+    get_object bodies are streams that only one reader can consume, so `run` reads
+    bodies of up to ``max_shared_body_size_bytes`` into a buffer that every waiting read gets
+    a view of. Larger bodies are left to the read that made the call.
+
+    Like the caches, this is per worker and only used from the event loop.
+
+    :param max_shared_body_size_bytes: Largest get_object body buffered to share among reads.
+    """
+
+    def __init__(self, max_shared_body_size_bytes: int):
+        self.max_shared_body_size_bytes = max_shared_body_size_bytes
+        self.stats = ReadCoalescerStats()
+        self._flights: dict[Hashable, _Flight] = {}
+
+    async def run(self, s3: S3Executor, func: Callable[..., T], /, **kwargs: Any) -> T:
+        """Like ``s3.run(func, **kwargs)``, sharing the call with concurrent identical ones.
+
+        ``func`` must only read from S3, and its result must not be modified by its callers.
+        If it is a get_object response, e.g. from `fetch_s3_object`, each caller gets a body of its own:
+        a view of the shared buffer, unless the body was too large to share, in which case the
+        read that made the call gets the S3 stream and the others make calls of their own.
+        """
+
+        async def call() -> tuple[T, Optional[bytes]]:
+            result = await s3.run(func, **kwargs)
+            if not _is_get_object_response(result) or result["ContentLength"] > self.max_shared_body_size_bytes:
+                return result, None
+            try:
+                body = await s3.run_sync(result["Body"].read)
+            finally:
+                result["Body"].close()
+            return result, body
+
+        (result, body), made_call = await self._share((func, *sorted(kwargs.items())), call)
+        if body is not None:
+            return {**result, "Body": io.BytesIO(body)}  # type: ignore[return-value]
+        if made_call or not _is_get_object_response(result):
+            return result
+        self.stats.unshared_bodies += 1
+        self.stats.calls += 1
+        return await s3.run(func, **kwargs)
+
+    async def _share(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        """Await ``call()``, or the call already in flight for ``key``.
+
+        :return: The result, and whether this made the call.
+        """
+        while (flight := self._flights.get(key)) is not None:
+            await flight.done.wait()
+            if not flight.interrupted:
+                self.stats.coalesced += 1
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result, False
+
+        flight = _Flight(done=anyio.Event())
+        self._flights[key] = flight
+        self.stats.calls += 1
+        try:
+            flight.result = await call()
+        except Exception as err:
+            flight.error = err
+            raise
+        except BaseException:
+            flight.interrupted = True
+            raise
+        finally:
+            del self._flights[key]
+            flight.done.set()
+        return flight.result, True
+
+
+async def run_coalesced(
+    coalescer: Optional[ReadCoalescer], s3: S3Executor, func: Callable[..., T], /, **kwargs: Any
+) -> T:
+    """Call ``func`` through ``coalescer`` if there is one, or through ``s3`` alone otherwise."""
+    if coalescer is None:
+        return await s3.run(func, **kwargs)
+    return await coalescer.run(s3, func, **kwargs)
+
+
+def _is_get_object_response(result: Any) -> bool:
+    return isinstance(result, dict) and "Body" in result and "ContentLength" in result
@@ -0,0 +1,359 @@
+"""Content-addressed storage, so that a file uploaded to many paths has its content stored once.
+
+A deduplicated file is a pointer object at its path, whose body is the key of a blob object named
+after the SHA-256 hash of the file's content. `read_objects.fetch_s3_object` follows pointers, so
+reads need no changes. Each pointer to a blob is counted by an empty reference object under the
+blob's key; the blob is deleted along with the last one.
+
+S3 has no transactions: if the last pointer to a blob is deleted while a new one to it is being
+written, the blob can be deleted under the new pointer. Writing the reference before checking
+whether the blob exists keeps that window to the duration of one head_object call.
+"""
+
+import hashlib
+from typing import (
+    AsyncIterable,
+    Awaitable,
+    BinaryIO,
+    Callable,
+    Optional,
+    Union,
+)
+
+import anyio
+
+from files_api.compression import (
+    CompressionPolicy,
+    compress_file_content,
+)
+from files_api.errors import ObjectNotFoundError
+from files_api.s3.bulk import (
+    DeleteBatchResult,
+    delete_s3_objects_in_batches,
+    fetch_s3_objects_metadata_concurrently,
+)
+from files_api.s3.delete_objects import delete_s3_object
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import (
+    POINTER_BLOB_KEY_METADATA_KEY,
+    POINTER_BLOB_SIZE_METADATA_KEY,
+    fetch_s3_object_metadata,
+    fetch_s3_objects_page,
+)
+from files_api.s3.write_objects import upload_s3_object
+
+try:
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+except ImportError:
+    ...
+
+DEFAULT_BLOB_PREFIX = ".blobs/"
+# files are hashed this many bytes at a time, rather than read into memory in full
+HASH_CHUNK_SIZE_BYTES = 1024 * 1024
+
+
+def blob_key_of(content_hash: str, blob_prefix: str = DEFAULT_BLOB_PREFIX) -> str:
+    """Key of the blob holding the content with this hex SHA-256 hash."""
+    return f"{blob_prefix}sha256/{content_hash}"
+
+
+def pointer_size(blob_prefix: str = DEFAULT_BLOB_PREFIX) -> int:
+    """Size in bytes of every pointer object to a blob under ``blob_prefix``."""
+    return len(blob_key_of("0" * 64, blob_prefix).encode())
+
+
+async def upload_deduplicated_s3_object(  # pylint: disable=too-many-arguments
+    s3: S3Executor,
+    bucket_name: str,
+    object_key: str,
+    file_content: Union[bytes, BinaryIO],
+    content_type: Optional[str] = None,
+    blob_prefix: str = DEFAULT_BLOB_PREFIX,
+    compression: Optional[CompressionPolicy] = None,
+    if_match: Optional[str] = None,
+) -> bool:
+    """Store a file as a pointer to the blob of its content, uploading the blob only if it is new.
+
+    Uploading content that is already stored, under any path, sends no bytes of it to S3: only
+    the pointer, the size of a key, and an empty reference object are written. With
+    ``compression``, new blobs it applies to are compressed before they are stored.
+    A pointer that pointed to other content before is released from its previous blob.
+
+    A file object given as ``file_content`` is hashed a chunk at a time, and only read
+    into memory in full if its content is new.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Path of the file.
+    :param file_content: The content of the file, or a binary file object positioned at its start.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param blob_prefix: Prefix under which blobs and their references are stored.
+    :param compression: Optional policy of which blobs to compress, and how.
+    :param if_match: Only overwrite the file if its current ETag is this one.
+
+    :raises PreconditionFailedError: If ``if_match`` does not hold.
+
+    :return: Whether a file already existed at ``object_key``.
+    """
+    if isinstance(file_content, bytes):
+        content_hash = await anyio.to_thread.run_sync(lambda: hashlib.sha256(file_content).hexdigest())
+    else:
+        content_hash = await anyio.to_thread.run_sync(_hash_file, file_content)
+    blob_key = blob_key_of(content_hash, blob_prefix)
+    try:
+        previous = await s3.run(fetch_s3_object_metadata, bucket_name=bucket_name, object_key=object_key)
+    except ObjectNotFoundError:
+        previous = None
+
+    await add_blob_reference(s3, bucket_name, blob_key, object_key)
+    try:
+        try:
+            blob = await s3.run(fetch_s3_object_metadata, bucket_name=bucket_name, object_key=blob_key)
+            blob_size, blob_encoding = blob.content_length, blob.content_encoding
+        except ObjectNotFoundError:
+            if not isinstance(file_content, bytes):
+                file_content = await anyio.to_thread.run_sync(_read_file, file_content)
+            blob_content, blob_encoding = await compress_file_content(compression, file_content, content_type)
+            await s3.run(
+                upload_s3_object,
+                bucket_name=bucket_name,
+                object_key=blob_key,
+                file_content=blob_content,
+                content_type=content_type,
+                content_encoding=blob_encoding,
+            )
+            blob_size = len(blob_content)
+        await s3.run(
+            upload_s3_object,
+            bucket_name=bucket_name,
+            object_key=object_key,
+            file_content=blob_key.encode(),
+            content_type=content_type,
+            if_match=if_match,
+            # the pointer describes its blob, so that head_object tells the file's encoding
+            content_encoding=blob_encoding,
+            metadata={POINTER_BLOB_KEY_METADATA_KEY: blob_key, POINTER_BLOB_SIZE_METADATA_KEY: str(blob_size)},
+        )
+    except BaseException:
+        if previous is None or previous.blob_key != blob_key:
+            # shielded so the reference is still released when the request task is being cancelled
+            with anyio.CancelScope(shield=True):
+                await release_blob_reference(s3, bucket_name, blob_key, object_key)
+        raise
+
+    if previous is not None and previous.blob_key and previous.blob_key != blob_key:
+        await release_blob_reference(s3, bucket_name, previous.blob_key, object_key)
+    return previous is not None
+
+
+async def delete_deduplicated_s3_object(
+    s3: S3Executor,
+    bucket_name: str,
+    object_key: str,
+    if_match: Optional[str] = None,
+) -> None:
+    """Delete a file, and the blob of its content if no other file points to it.
+
+    Files that are not pointers are deleted like any other object.
+
+    :raises ObjectNotFoundError: If the file does not exist.
+    :raises PreconditionFailedError: If ``if_match`` does not hold.
+    """
+    metadata = await s3.run(fetch_s3_object_metadata, bucket_name=bucket_name, object_key=object_key)
+    await s3.run(delete_s3_object, bucket_name=bucket_name, object_key=object_key, if_match=if_match)
+    if metadata.blob_key:
+        await release_blob_reference(s3, bucket_name, metadata.blob_key, object_key)
+
+
+async def delete_deduplicated_s3_objects_in_batches(
+    s3: S3Executor,
+    bucket_name: str,
+    batches: AsyncIterable[list[str]],
+    on_batch_deleted: Callable[[DeleteBatchResult], Awaitable[None]],
+    max_concurrent_batches: int = 4,
+) -> None:
+    """Like `delete_s3_objects_in_batches`, but also release the blobs of the deleted pointers.
+
+    Deleted pointers no longer count as references, so each blob is deleted with the last of them.
+    Finding the pointers takes a head_object call per key, before its batch is deleted.
+    """
+    blob_keys: dict[str, str] = {}
+
+    async def batches_with_blob_keys() -> AsyncIterable[list[str]]:
+        async for object_keys in batches:
+            blob_keys.update(await fetch_blob_keys(s3, bucket_name, object_keys))
+            yield object_keys
+
+    async def release_and_report(result: DeleteBatchResult) -> None:
+        released = {object_key: blob_keys.pop(object_key) for object_key in result.deleted if object_key in blob_keys}
+        for error in result.errors:
+            blob_keys.pop(error["Key"], None)
+        await release_blob_references(s3, bucket_name, released)
+        await on_batch_deleted(result)
+
+    await delete_s3_objects_in_batches(
+        s3=s3,
+        bucket_name=bucket_name,
+        batches=batches_with_blob_keys(),
+        on_batch_deleted=release_and_report,
+        max_concurrent_batches=max_concurrent_batches,
+    )
+
+
+async def fetch_blob_keys(
+    s3: S3Executor,
+    bucket_name: str,
+    object_keys: list[str],
+    max_concurrent_lookups: int = 32,
+) -> dict[str, str]:
+    """Find the pointers among ``object_keys``, with a head_object call each.
+
+    :return: The key of the blob of each pointer, by key of the pointer.
+    """
+    objects_metadata = await fetch_s3_objects_metadata_concurrently(
+        s3=s3,
+        bucket_name=bucket_name,
+        object_keys=object_keys,
+        max_concurrent_lookups=max_concurrent_lookups,
+    )
+    return {
+        object_key: metadata.blob_key
+        for object_key, metadata in zip(object_keys, objects_metadata)
+        if metadata is not None and metadata.blob_key
+    }
+
+
+async def add_blob_reference(s3: S3Executor, bucket_name: str, blob_key: str, object_key: str) -> None:
+    """Count the pointer at ``object_key`` as a reference to the blob at ``blob_key``."""
+    await s3.run(
+        upload_s3_object,
+        bucket_name=bucket_name,
+        object_key=_reference_key(blob_key, object_key),
+        file_content=b"",
+    )
+
+
+async def release_blob_reference(s3: S3Executor, bucket_name: str, blob_key: str, object_key: str) -> None:
+    """Stop counting the pointer at ``object_key`` as a reference, and delete the blob if it was the last one."""
+    await s3.run(delete_s3_object, bucket_name=bucket_name, object_key=_reference_key(blob_key, object_key))
+    references, _, _ = await s3.run(
+        fetch_s3_objects_page,
+        bucket_name=bucket_name,
+        prefix=_reference_key(blob_key, ""),
+        max_keys=1,
+    )
+    if not references:
+        await s3.run(delete_s3_object, bucket_name=bucket_name, object_key=blob_key)
+
+
+async def release_blob_references(
+    s3: S3Executor,
+    bucket_name: str,
+    blob_keys: dict[str, str],
+    max_concurrent_releases: int = 32,
+) -> None:
+    """Call `release_blob_reference` for each pointer, several at a time.
+
+    :param blob_keys: The key of the blob of each pointer, by key of the pointer, as from `fetch_blob_keys`.
+    """
+    release_slots = anyio.Semaphore(max_concurrent_releases)
+
+    async def release(object_key: str, blob_key: str) -> None:
+        async with release_slots:
+            await release_blob_reference(s3, bucket_name, blob_key, object_key)
+
+    async with anyio.create_task_group() as task_group:
+        for object_key, blob_key in blob_keys.items():
+            task_group.start_soon(release, object_key, blob_key)
+
+
+async def transfer_blob_references(
+    s3: S3Executor,
+    bucket_name: str,
+    copied: list[tuple[str, str]],
+    release_sources: bool,
+    max_concurrent_lookups: int = 32,
+    overwritten_blob_keys: Optional[dict[str, str]] = None,
+) -> None:
+    """Count the pointers among copied files as references to their blobs.
+
+    copy_object copies a pointer, not its blob, but does not add a reference for the copy.
+    Pointers the copies replaced are released from their blobs, unless a copy points to the same one.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param copied: The ``(source, destination)`` keys of the copied files.
+    :param release_sources: Whether the sources were deleted, i.e. moved, so their references are released.
+    :param max_concurrent_lookups: Maximum number of head_object calls in flight.
+    :param overwritten_blob_keys: The key of the blob of each pointer the copies replaced, by key of
+        the destination, as from `fetch_blob_keys` before copying.
+    """
+    overwritten_blob_keys = overwritten_blob_keys or {}
+    destinations_metadata = await fetch_s3_objects_metadata_concurrently(
+        s3=s3,
+        bucket_name=bucket_name,
+        object_keys=[destination for _, destination in copied],
+        max_concurrent_lookups=max_concurrent_lookups,
+    )
+    reference_slots = anyio.Semaphore(max_concurrent_lookups)
+
+    async def transfer(source: str, destination: str, blob_key: Optional[str]) -> None:
+        async with reference_slots:
+            if blob_key:
+                await add_blob_reference(s3, bucket_name, blob_key, destination)
+                if release_sources:
+                    await release_blob_reference(s3, bucket_name, blob_key, source)
+            overwritten_blob_key = overwritten_blob_keys.get(destination)
+            # the reference to the same blob was just written again, so it must be kept
+            if overwritten_blob_key and overwritten_blob_key != blob_key:
+                await release_blob_reference(s3, bucket_name, overwritten_blob_key, destination)
+
+    async with anyio.create_task_group() as task_group:
+        for (source, destination), metadata in zip(copied, destinations_metadata):
+            blob_key = metadata.blob_key if metadata is not None else None
+            if blob_key or destination in overwritten_blob_keys:
+                task_group.start_soon(transfer, source, destination, blob_key)
+
+
+async def resolve_listed_pointers(
+    s3: S3Executor,
+    bucket_name: str,
+    files: list["ObjectTypeDef"],
+    blob_prefix: str = DEFAULT_BLOB_PREFIX,
+    max_concurrent_lookups: int = 32,
+) -> list["ObjectTypeDef"]:
+    """Leave blobs out of a listing page, and give the pointers in it the size of their blobs.
+
+    Listings only report the size of the pointers themselves. Those are all `pointer_size` bytes,
+    so only the files of that size are looked up, with a head_object call each.
+    """
+    files = [file for file in files if not file["Key"].startswith(blob_prefix)]
+    candidates = [file["Key"] for file in files if file["Size"] == pointer_size(blob_prefix)]
+    candidates_metadata = await fetch_s3_objects_metadata_concurrently(
+        s3=s3,
+        bucket_name=bucket_name,
+        object_keys=candidates,
+        max_concurrent_lookups=max_concurrent_lookups,
+    )
+    sizes = {
+        object_key: metadata.content_length
+        for object_key, metadata in zip(candidates, candidates_metadata)
+        if metadata is not None and metadata.blob_key
+    }
+    return [{**file, "Size": sizes[file["Key"]]} if file["Key"] in sizes else file for file in files]
+
+
+def _hash_file(file: BinaryIO) -> str:
+    content_hash = hashlib.sha256()
+    while chunk := file.read(HASH_CHUNK_SIZE_BYTES):
+        content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def _read_file(file: BinaryIO) -> bytes:
+    file.seek(0)
+    return file.read()
+
+
+def _reference_key(blob_key: str, object_key: str) -> str:
+    return f"{blob_key}.refs/{object_key}"
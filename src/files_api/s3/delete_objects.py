@@ -4,18 +4,74 @@ from typing import Optional
 
 import boto3
 
+from files_api.errors import (
+    PreconditionFailedError,
+    raise_storage_error,
+)
+
 try:
     from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import ErrorTypeDef
 except ImportError:
     ...
 
+# the most keys S3 deletes in one delete_objects call
+MAX_KEYS_PER_DELETE_OBJECTS = 1000
+
 
-def delete_s3_object(bucket_name: str, object_key: str, s3_client: Optional["S3Client"] = None) -> None:
+def delete_s3_object(
+    bucket_name: str,
+    object_key: str,
+    if_match: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
     """Delete an object from the S3 bucket.
 
     :param bucket_name: Name of the S3 bucket.
     :param object_key: Key of the object to delete.
+    :param if_match: Only delete the object if its current ETag is this one.
     :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+
+    :raises PreconditionFailedError: If `if_match` is set and does not match the object's ETag,
+        or the object does not exist.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    conditions = {"IfMatch": if_match} if if_match else {}
+    try:
+        s3_client.delete_object(Bucket=bucket_name, Key=object_key, **conditions)
+    except s3_client.exceptions.ClientError as err:
+        # an If-Match condition cannot hold for an object that does not exist
+        if if_match and err.response["Error"]["Code"] == "NoSuchKey":
+            raise PreconditionFailedError(bucket_name, object_key) from err
+        raise_storage_error(err, bucket_name, object_key)
+
+
+def delete_s3_objects(
+    bucket_name: str,
+    object_keys: list[str],
+    s3_client: Optional["S3Client"] = None,
+) -> list["ErrorTypeDef"]:
+    """Delete up to 1000 objects from the S3 bucket with a single delete_objects call.
+
+    Like `delete_s3_object`, deleting a key that does not exist succeeds.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_keys: Keys of the objects to delete.
+    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+
+    :raises ValueError: If more than `MAX_KEYS_PER_DELETE_OBJECTS` keys are given.
+
+    :return: The keys S3 failed to delete, with an error ``Code`` and ``Message`` each;
+        every other key was deleted.
     """
+    if len(object_keys) > MAX_KEYS_PER_DELETE_OBJECTS:
+        raise ValueError(f"at most {MAX_KEYS_PER_DELETE_OBJECTS} keys can be deleted at once, got {len(object_keys)}")
+    if not object_keys:
+        return []
     s3_client = s3_client or boto3.client("s3")
-    s3_client.delete_object(Bucket=bucket_name, Key=object_key)
+    response = s3_client.delete_objects(
+        Bucket=bucket_name,
+        # quiet mode only reports failures, which keeps responses small
+        Delete={"Objects": [{"Key": object_key} for object_key in object_keys], "Quiet": True},
+    )
+    return response.get("Errors", [])
@@ -0,0 +1,305 @@
+"""A per-worker cache of S3 objects in files on local disk, for files too large to keep in memory."""
+
+import os
+import shutil
+import tempfile
+import time
+from collections import (
+    Counter,
+    OrderedDict,
+)
+from dataclasses import (
+    dataclass,
+    replace,
+)
+from datetime import datetime
+from typing import (
+    BinaryIO,
+    Callable,
+    Optional,
+)
+
+import anyio
+
+from files_api.errors import (
+    NotModifiedError,
+    ObjectNotFoundError,
+)
+from files_api.s3.coalescing import (
+    ReadCoalescer,
+    run_coalesced,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import (
+    ReadConditions,
+    fetch_s3_object_metadata,
+)
+
+try:
+    from mypy_boto3_s3.type_defs import GetObjectOutputTypeDef
+except ImportError:
+    ...
+
+
+@dataclass(frozen=True)
+class DiskCacheEntry:
+    """An S3 object whose body is in a file of the cache's directory."""
+
+    path: str
+    size: int
+    content_type: str
+    etag: str
+    last_modified: datetime
+    fetched_at: float = 0.0
+    # the encoding the file is compressed with, as stored
+    content_encoding: Optional[str] = None
+
+
+@dataclass
+class DiskCacheStats:
+    """Counters for sizing a `DiskCache`.
+
+    ``hits`` counts reads served from disk, including ones that were revalidated with S3 (also
+    counted in ``revalidations``). ``misses`` counts reads that had to download the object.
+    ``fills`` counts objects written to disk while they were streamed to a client, and
+    ``abandoned_fills`` those whose download did not complete, e.g. because the client disconnected.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    revalidations: int = 0
+    fills: int = 0
+    abandoned_fills: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class DiskCache:
+    """LRU cache of S3 objects in files on local disk, bounded by their total size in bytes.
+
+    The cache is filled as a side effect of downloads: `start_fill` returns a sink that the
+    chunks of a ``get_object`` body are copied into while they are streamed to the client, and
+    the file only enters the cache once the whole body was written. Entries younger than
+    ``ttl_seconds`` are served without contacting S3; older ones are revalidated with a
+    conditional head_object on their ETag, so an unchanged file costs a round-trip but no transfer.
+
+    Each worker keeps its files in a subdirectory of its own under ``directory``, which `close`
+    removes; the index of the files is only in memory and is only used from the event loop.
+    Files handed out by `lookup` are not deleted until they are `release`-d, so evicting or
+    invalidating an entry never pulls a file from under a response that is still sending it.
+
+    :param directory: Directory to create the worker's cache directory in.
+    :param max_size_bytes: Maximum total size of the cached files.
+    :param max_object_size_bytes: Objects larger than this are never cached.
+    :param ttl_seconds: How long an entry is served before it is revalidated.
+    :param clock: Source of monotonic time in seconds, replaceable in tests.
+    :param coalescer: Optional coalescer to share the revalidation calls of concurrent reads.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size_bytes: int,
+        max_object_size_bytes: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        coalescer: Optional[ReadCoalescer] = None,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="worker-", dir=directory)
+        self.max_size_bytes = max_size_bytes
+        self.max_object_size_bytes = max_object_size_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.coalescer = coalescer
+        self.stats = DiskCacheStats()
+        self.size_bytes = 0
+        self._entries: OrderedDict[tuple[str, str], DiskCacheEntry] = OrderedDict()
+        self._filling: set[tuple[str, str]] = set()
+        # files handed out by `lookup` and not released yet, and which of them to delete once they are
+        self._readers: Counter[str] = Counter()
+        self._unlink_when_released: set[str] = set()
+        # bumped on every invalidation, so fills that raced with a write are not cached
+        self._invalidation_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def lookup(self, s3: S3Executor, bucket_name: str, object_key: str) -> Optional[DiskCacheEntry]:
+        """Look a whole object up in the cache, revalidating it with S3 if it is not fresh.
+
+        Every entry returned must be passed to `release` once its file is no longer read.
+
+        :param s3: Executor used to make the S3 calls.
+        :param bucket_name: Name of the S3 bucket.
+        :param object_key: Key of the object to look up.
+
+        :raises ObjectNotFoundError: If a cached object was deleted through another worker.
+
+        :return: The cached object, or None if it is not cached or changed since it was cached.
+        """
+        cache_key = (bucket_name, object_key)
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(cache_key)
+        if self.clock() - entry.fetched_at < self.ttl_seconds:
+            self.stats.hits += 1
+            return self._acquire(entry)
+
+        try:
+            await run_coalesced(
+                self.coalescer,
+                s3,
+                fetch_s3_object_metadata,
+                bucket_name=bucket_name,
+                object_key=object_key,
+                conditions=ReadConditions(if_none_match=entry.etag),
+            )
+        except NotModifiedError:
+            # the entry may have been evicted or invalidated while S3 was answering
+            if self._entries.get(cache_key) is entry:
+                self.stats.hits += 1
+                self.stats.revalidations += 1
+                entry = replace(entry, fetched_at=self.clock())
+                self._entries[cache_key] = entry
+                return self._acquire(entry)
+        except ObjectNotFoundError:
+            self._remove(cache_key)
+            raise
+        else:
+            self._remove(cache_key)
+        self.stats.misses += 1
+        return None
+
+    def release(self, entry: DiskCacheEntry) -> None:
+        """Mark a file returned by `lookup` as no longer read."""
+        self._readers[entry.path] -= 1
+        if self._readers[entry.path] <= 0:
+            del self._readers[entry.path]
+            if entry.path in self._unlink_when_released:
+                self._unlink_when_released.discard(entry.path)
+                _unlink(entry.path)
+
+    def start_fill(
+        self, bucket_name: str, object_key: str, response: "GetObjectOutputTypeDef"
+    ) -> Optional["DiskCacheFill"]:
+        """Start writing the body of a whole-object ``get_object`` response to the cache.
+
+        :return: The sink to copy the body's bytes into as they are read, or None if the object is too
+            large to cache, is already cached, or is already being written by another download.
+        """
+        cache_key = (bucket_name, object_key)
+        if response["ContentLength"] > min(self.max_object_size_bytes, self.max_size_bytes):
+            return None
+        cached = self._entries.get(cache_key)
+        if cache_key in self._filling or (cached is not None and cached.etag == response["ETag"]):
+            return None
+        self._filling.add(cache_key)
+        fd, path = tempfile.mkstemp(dir=self.directory)
+        entry = DiskCacheEntry(
+            path=path,
+            size=response["ContentLength"],
+            content_type=response["ContentType"],
+            etag=response["ETag"],
+            last_modified=response["LastModified"],
+            content_encoding=response.get("ContentEncoding"),
+        )
+        return DiskCacheFill(self, cache_key, entry, os.fdopen(fd, "wb"), self._invalidation_count)
+
+    def invalidate(self, bucket_name: str, object_key: str) -> None:
+        """Drop an object that was just written or deleted."""
+        self._invalidation_count += 1
+        self._remove((bucket_name, object_key))
+        self.stats.invalidations += 1
+
+    def close(self) -> None:
+        """Delete the worker's cache directory, and every file in it."""
+        self._entries.clear()
+        self.size_bytes = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _acquire(self, entry: DiskCacheEntry) -> DiskCacheEntry:
+        self._readers[entry.path] += 1
+        return entry
+
+    def _add(self, fill: "DiskCacheFill") -> None:
+        self._filling.discard(fill.cache_key)
+        if fill.invalidation_count != self._invalidation_count:
+            _unlink(fill.entry.path)
+            return
+        self._remove(fill.cache_key)
+        self._entries[fill.cache_key] = replace(fill.entry, fetched_at=self.clock())
+        self.size_bytes += fill.entry.size
+        self.stats.fills += 1
+        while self.size_bytes > self.max_size_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def _abandon(self, fill: "DiskCacheFill") -> None:
+        self._filling.discard(fill.cache_key)
+        _unlink(fill.entry.path)
+        self.stats.abandoned_fills += 1
+
+    def _remove(self, cache_key: tuple[str, str]) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return
+        self.size_bytes -= entry.size
+        if self._readers[entry.path] > 0:
+            self._unlink_when_released.add(entry.path)
+        else:
+            _unlink(entry.path)
+
+
+class DiskCacheFill:
+    """A file of a `DiskCache` being written while its object is streamed from S3.
+
+    `write` is called from worker threads, in the order of the body's bytes; `commit` adds the
+    file to the cache if it received the whole body, and `discard` deletes it otherwise.
+    """
+
+    def __init__(
+        self,
+        cache: DiskCache,
+        cache_key: tuple[str, str],
+        entry: DiskCacheEntry,
+        file: BinaryIO,
+        invalidation_count: int,
+    ):
+        self.cache_key = cache_key
+        self.entry = entry
+        self.invalidation_count = invalidation_count
+        self._cache = cache
+        self._file = file
+        self._bytes_written = 0
+        self._done = False
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._bytes_written += len(data)
+
+    async def commit(self) -> None:
+        if self._done:
+            return
+        await anyio.to_thread.run_sync(self._file.close)
+        if self._bytes_written != self.entry.size:
+            self.discard()
+            return
+        self._done = True
+        self._cache._add(self)  # pylint: disable=protected-access
+
+    def discard(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        self._cache._abandon(self)  # pylint: disable=protected-access
+
+
+def _unlink(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
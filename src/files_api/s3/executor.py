@@ -0,0 +1,77 @@
+"""Run the blocking ``files_api.s3`` helpers from async route handlers without blocking the event loop."""
+
+import functools
+from typing import (
+    Any,
+    Callable,
+    Literal,
+    Optional,
+    TypeVar,
+)
+
+import anyio
+import anyio.to_thread
+
+try:
+    from mypy_boto3_s3 import S3Client
+except ImportError:
+    ...
+
+T = TypeVar("T")
+
+IoMode = Literal["threadpool", "blocking"]
+
+
+class S3Executor:
+    """Call ``files_api.s3`` functions with the app's shared S3 client.
+
+    boto3 is synchronous, so calling it directly from an ``async def`` route freezes the
+    event loop for the whole S3 round-trip. In ``"threadpool"`` mode calls are offloaded to
+    worker threads, with at most ``max_concurrency`` S3 calls in flight at once. ``"blocking"``
+    mode calls the function inline, which is only sensible for debugging.
+
+    :param s3_client: The S3 client passed to every call that does not provide its own.
+    :param io_mode: Either ``"threadpool"`` or ``"blocking"``.
+    :param max_concurrency: Maximum number of S3 calls running in worker threads at once.
+        This should not exceed the S3 client's connection pool size, otherwise
+        threads will wait on each other for a free connection.
+    """
+
+    def __init__(self, s3_client: "S3Client", io_mode: IoMode = "threadpool", max_concurrency: int = 100):
+        self.s3_client = s3_client
+        self.io_mode = io_mode
+        self.max_concurrency = max_concurrency
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+
+    @property
+    def limiter(self) -> anyio.CapacityLimiter:
+        """Capacity limiter bounding the number of worker threads used for S3 calls."""
+        # created lazily because anyio primitives must be created while an event loop is running
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_concurrency)
+        return self._limiter
+
+    async def run(self, func: Callable[..., T], /, **kwargs: Any) -> T:
+        """Call ``func(**kwargs, s3_client=<shared client>)`` and return its result.
+
+        :param func: A function from ``files_api.s3`` accepting an ``s3_client`` keyword argument.
+        :param kwargs: Keyword arguments for ``func``.
+
+        :return: Whatever ``func`` returns.
+        """
+        kwargs.setdefault("s3_client", self.s3_client)
+        return await self.run_sync(functools.partial(func, **kwargs))
+
+    async def run_sync(self, func: Callable[..., T], /, *args: Any) -> T:
+        """Call a blocking function that does not take an S3 client, e.g. reading an S3 response body.
+
+        Runs under the same ``io_mode`` and concurrency limit as `run`.
+
+        :param func: The blocking function.
+        :param args: Positional arguments for ``func``.
+
+        :return: Whatever ``func`` returns.
+        """
+        if self.io_mode == "blocking":
+            return func(*args)
+        return await anyio.to_thread.run_sync(func, *args, limiter=self.limiter)
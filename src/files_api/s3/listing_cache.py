@@ -0,0 +1,234 @@
+"""An in-process cache of `GET /v1/files` listing pages."""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import (
+    Callable,
+    Optional,
+)
+
+from files_api.s3.coalescing import (
+    ReadCoalescer,
+    run_coalesced,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import fetch_s3_objects_page
+
+try:
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+except ImportError:
+    ...
+
+# (bucket_name, prefix, page_token, page_size, delimiter)
+ListingKey = tuple[str, str, Optional[str], int, Optional[str]]
+
+
+@dataclass(frozen=True)
+class CachedListing:
+    """One page of a listing, and the prefix of the listing it belongs to."""
+
+    files: list["ObjectTypeDef"]
+    directories: list[str]
+    next_page_token: Optional[str]
+    prefix: str
+    fetched_at: float
+
+
+@dataclass
+class ListingCacheStats:
+    """Counters for sizing a `ListingCache`."""
+
+    hits: int = 0
+    misses: int = 0
+    prefetches: int = 0
+    lookups: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class ListingCache:
+    """LRU cache of listing pages, each served for at most ``ttl_seconds``.
+
+    UIs page through a listing by following ``next_page_token``. `prefetch` fetches the page a
+    token points to before it is asked for, so following it is served from memory.
+
+    Writing or deleting a file drops every cached page of listings whose prefix contains it,
+    since the file may move the boundaries of all their pages. The cache is per worker and is
+    only used from the event loop, so writes through other workers show up within ``ttl_seconds``.
+
+    :param ttl_seconds: How long a page is served before it is listed again.
+    :param max_entries: Maximum number of cached pages.
+    :param clock: Source of monotonic time in seconds, replaceable in tests.
+    :param coalescer: Optional coalescer to share the listing calls of concurrent misses.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int,
+        clock: Callable[[], float] = time.monotonic,
+        coalescer: Optional[ReadCoalescer] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.coalescer = coalescer
+        self.stats = ListingCacheStats()
+        self._entries: OrderedDict[ListingKey, CachedListing] = OrderedDict()
+        # bumped on every invalidation, so listings that raced with a write are not cached
+        self._invalidation_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def fetch(
+        self,
+        s3: S3Executor,
+        bucket_name: str,
+        prefix: str,
+        page_token: Optional[str],
+        page_size: int,
+        delimiter: Optional[str] = None,
+    ) -> tuple[list["ObjectTypeDef"], list[str], Optional[str]]:
+        """Fetch a page of a listing, from the cache when possible.
+
+        :param s3: Executor used to make the S3 calls.
+        :param bucket_name: Name of the S3 bucket to list objects from.
+        :param prefix: Prefix to filter objects by; without a `delimiter`, ignored when `page_token` is given.
+        :param page_token: Continuation token of the page to fetch, or None for the first page.
+        :param page_size: Maximum number of keys to return within this page.
+        :param delimiter: Optional character to group keys into directories by, usually "/".
+
+        :return: Tuple of a list of objects, a list of common prefixes and the next continuation token.
+        """
+        key = self._key(bucket_name, prefix, page_token, page_size, delimiter)
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry.fetched_at < self.ttl_seconds:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.files, entry.directories, entry.next_page_token
+
+        self.stats.misses += 1
+        entry = await self._list(s3, key)
+        return entry.files, entry.directories, entry.next_page_token
+
+    async def prefetch(
+        self,
+        s3: S3Executor,
+        bucket_name: str,
+        prefix: str,
+        page_token: str,
+        page_size: int,
+        delimiter: Optional[str] = None,
+    ) -> None:
+        """List the page ``page_token`` points to, unless it is already cached."""
+        key = self._key(bucket_name, prefix, page_token, page_size, delimiter)
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry.fetched_at < self.ttl_seconds:
+            return
+        self.stats.prefetches += 1
+        await self._list(s3, key)
+
+    def lookup(self, bucket_name: str, object_key: str) -> tuple[bool, Optional["ObjectTypeDef"]]:
+        """Look a file up in the cached pages, without contacting S3.
+
+        A file is known to exist if a fresh page lists it, and known not to exist if a fresh,
+        complete listing (a first page without a next page) of a directory containing it does not.
+
+        :return: Whether the cache knows if the file exists, and the file's listing entry if it does.
+        """
+        now = self.clock()
+        for (entry_bucket_name, _, page_token, _, delimiter), entry in self._entries.items():
+            if (
+                entry_bucket_name != bucket_name
+                or now - entry.fetched_at >= self.ttl_seconds
+                or not object_key.startswith(entry.prefix)
+            ):
+                continue
+            for obj in entry.files:
+                if obj["Key"] == object_key:
+                    self.stats.lookups += 1
+                    return True, obj
+            is_complete_listing = page_token is None and entry.next_page_token is None
+            is_listed_by_entry = not delimiter or delimiter not in object_key[len(entry.prefix) :]
+            if is_complete_listing and is_listed_by_entry:
+                self.stats.lookups += 1
+                return True, None
+        return False, None
+
+    def invalidate(self, bucket_name: str, object_key: str) -> None:
+        """Drop the pages of listings that contain a file that was just written or deleted."""
+        self._invalidation_count += 1
+        self.stats.invalidations += 1
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if key[0] == bucket_name and object_key.startswith(entry.prefix)
+        ]:
+            del self._entries[key]
+
+    def invalidate_prefix(self, bucket_name: str, prefix: str) -> None:
+        """Drop the pages of listings that may contain files under ``prefix``, e.g. after deleting many of them."""
+        self._invalidation_count += 1
+        self.stats.invalidations += 1
+        for key in [
+            key
+            for key, entry in self._entries.items()
+            if key[0] == bucket_name and (prefix.startswith(entry.prefix) or entry.prefix.startswith(prefix))
+        ]:
+            del self._entries[key]
+
+    @staticmethod
+    def _key(
+        bucket_name: str,
+        prefix: str,
+        page_token: Optional[str],
+        page_size: int,
+        delimiter: Optional[str],
+    ) -> ListingKey:
+        # undelimited S3 continuation tokens encode the prefix; the one passed along with them is unused
+        prefix_is_known = not page_token or delimiter
+        return (bucket_name, prefix if prefix_is_known else "", page_token, page_size, delimiter)
+
+    async def _list(self, s3: S3Executor, key: ListingKey) -> CachedListing:
+        bucket_name, prefix, page_token, page_size, delimiter = key
+        invalidation_count = self._invalidation_count
+        files, directories, next_page_token = await run_coalesced(
+            self.coalescer,
+            s3,
+            fetch_s3_objects_page,
+            bucket_name=bucket_name,
+            prefix=prefix,
+            page_token=page_token,
+            max_keys=page_size,
+            delimiter=delimiter,
+        )
+        if page_token and not delimiter:
+            prefix = self._prefix_of_token(page_token)
+        entry = CachedListing(
+            files=files,
+            directories=directories,
+            next_page_token=next_page_token,
+            prefix=prefix,
+            fetched_at=self.clock(),
+        )
+        if invalidation_count == self._invalidation_count:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return entry
+
+    def _prefix_of_token(self, page_token: str) -> str:
+        """Prefix of the listing a continuation token belongs to.
+
+        S3 tokens are opaque, so this is only known if the page that returned the token is cached.
+        Otherwise the page is assumed to belong to a listing of the whole bucket, which is only
+        pessimistic about which writes invalidate it.
+        """
+        for entry in self._entries.values():
+            if entry.next_page_token == page_token:
+                return entry.prefix
+        return ""
@@ -0,0 +1,189 @@
+"""An in-process cache of small, frequently read S3 objects."""
+
+import time
+from collections import OrderedDict
+from dataclasses import (
+    dataclass,
+    replace,
+)
+from datetime import datetime
+from typing import (
+    Callable,
+    Optional,
+    Union,
+)
+
+from files_api.errors import (
+    NotModifiedError,
+    ObjectNotFoundError,
+)
+from files_api.s3.coalescing import (
+    ReadCoalescer,
+    run_coalesced,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import (
+    ReadConditions,
+    fetch_s3_object,
+)
+
+try:
+    from mypy_boto3_s3.type_defs import GetObjectOutputTypeDef
+except ImportError:
+    ...
+
+
+@dataclass(frozen=True)
+class CachedObject:
+    """An S3 object held in memory, body included."""
+
+    body: bytes
+    content_type: str
+    etag: str
+    last_modified: datetime
+    fetched_at: float = 0.0
+    # the encoding ``body`` is compressed with, as stored
+    content_encoding: Optional[str] = None
+
+
+@dataclass
+class ObjectCacheStats:
+    """Counters for sizing an `ObjectCache`.
+
+    ``hits`` counts reads served from memory, including ones that were revalidated with S3
+    (also counted in ``revalidations``). ``misses`` counts reads that downloaded the object.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    revalidations: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class ObjectCache:
+    """LRU cache of S3 objects, bounded by their total size in bytes.
+
+    Entries younger than ``ttl_seconds`` are served without contacting S3. Older entries are
+    revalidated with a conditional get_object on their ETag, which costs a round-trip but no
+    transfer of the body unless the object changed.
+
+    The cache is per worker and is only used from the event loop, so it needs no locking.
+    Writes through other workers are only picked up once an entry needs revalidation.
+
+    :param max_size_bytes: Maximum total size of the cached bodies.
+    :param max_object_size_bytes: Objects larger than this are never cached.
+    :param ttl_seconds: How long an entry is served before it is revalidated.
+    :param clock: Source of monotonic time in seconds, replaceable in tests.
+    :param coalescer: Optional coalescer to share the get_object calls of concurrent misses.
+    """
+
+    def __init__(
+        self,
+        max_size_bytes: int,
+        max_object_size_bytes: int,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        coalescer: Optional[ReadCoalescer] = None,
+    ):
+        self.max_size_bytes = max_size_bytes
+        self.max_object_size_bytes = max_object_size_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.coalescer = coalescer
+        self.stats = ObjectCacheStats()
+        self.size_bytes = 0
+        self._entries: OrderedDict[tuple[str, str], CachedObject] = OrderedDict()
+        # bumped on every invalidation, so fetches that raced with a write are not cached
+        self._invalidation_count = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def fetch(
+        self,
+        s3: S3Executor,
+        bucket_name: str,
+        object_key: str,
+    ) -> Union[CachedObject, "GetObjectOutputTypeDef"]:
+        """Fetch a whole object, from the cache when possible.
+
+        :param s3: Executor used to make the S3 calls.
+        :param bucket_name: Name of the S3 bucket.
+        :param object_key: Key of the object to fetch.
+
+        :raises ObjectNotFoundError: If the object does not exist.
+
+        :return: The cached object, or, for objects too large to cache, the get_object response
+            with its body still unread.
+        """
+        entry = self._entries.get((bucket_name, object_key))
+        if entry is not None:
+            self._entries.move_to_end((bucket_name, object_key))
+            if self.clock() - entry.fetched_at < self.ttl_seconds:
+                self.stats.hits += 1
+                return entry
+
+        invalidation_count = self._invalidation_count
+        conditions = ReadConditions(if_none_match=entry.etag) if entry is not None else None
+        try:
+            response = await run_coalesced(
+                self.coalescer,
+                s3,
+                fetch_s3_object,
+                bucket_name=bucket_name,
+                object_key=object_key,
+                conditions=conditions,
+            )
+        except NotModifiedError:
+            self.stats.hits += 1
+            self.stats.revalidations += 1
+            if invalidation_count == self._invalidation_count:
+                self.put(bucket_name, object_key, entry)
+            return entry
+        except ObjectNotFoundError:
+            # deleted through another worker
+            self._remove((bucket_name, object_key))
+            raise
+
+        self.stats.misses += 1
+        if response["ContentLength"] > self.max_object_size_bytes:
+            self._remove((bucket_name, object_key))
+            return response
+
+        try:
+            body = await s3.run_sync(response["Body"].read)
+        finally:
+            response["Body"].close()
+        fetched = CachedObject(
+            body=body,
+            content_type=response["ContentType"],
+            etag=response["ETag"],
+            last_modified=response["LastModified"],
+            content_encoding=response.get("ContentEncoding"),
+        )
+        if invalidation_count == self._invalidation_count:
+            self.put(bucket_name, object_key, fetched)
+        return fetched
+
+    def put(self, bucket_name: str, object_key: str, entry: CachedObject) -> None:
+        """Cache ``entry`` as fresh, evicting the least recently used objects to make room for it."""
+        if len(entry.body) > min(self.max_object_size_bytes, self.max_size_bytes):
+            return
+        self._remove((bucket_name, object_key))
+        self._entries[(bucket_name, object_key)] = replace(entry, fetched_at=self.clock())
+        self.size_bytes += len(entry.body)
+        while self.size_bytes > self.max_size_bytes:
+            self._remove(next(iter(self._entries)))
+            self.stats.evictions += 1
+
+    def invalidate(self, bucket_name: str, object_key: str) -> None:
+        """Drop an object that was just written or deleted."""
+        self._invalidation_count += 1
+        self._remove((bucket_name, object_key))
+        self.stats.invalidations += 1
+
+    def _remove(self, cache_key: tuple[str, str]) -> None:
+        entry = self._entries.pop(cache_key, None)
+        if entry is not None:
+            self.size_bytes -= len(entry.body)
@@ -0,0 +1,100 @@
+"""Functions for issuing presigned URLs, which let clients transfer objects to and from S3 directly."""
+
+from typing import Optional
+
+import boto3
+
+try:
+    from mypy_boto3_s3 import S3Client
+except ImportError:
+    ...
+
+# the longest SigV4 presigned URLs can be valid for
+MAX_PRESIGNED_URL_EXPIRY_SECONDS = 7 * 24 * 60 * 60
+
+
+def generate_presigned_download_url(
+    bucket_name: str,
+    object_key: str,
+    expires_in: int,
+    content_type: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> str:
+    """Generate a URL that anyone can GET an object from, until it expires.
+
+    Signing happens locally: no request is made to S3, and the object is not checked to exist.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param expires_in: How long the URL is valid for, in seconds.
+    :param content_type: Optional `Content-Type` for S3 to respond with, instead of the object's.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :return: The presigned URL.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    params = {"Bucket": bucket_name, "Key": object_key}
+    if content_type:
+        params["ResponseContentType"] = content_type
+    return s3_client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+
+def generate_presigned_upload_url(
+    bucket_name: str,
+    object_key: str,
+    expires_in: int,
+    content_type: Optional[str] = None,
+    content_length: Optional[int] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> str:
+    """Generate a URL that anyone can PUT an object to, until it expires.
+
+    ``content_type`` and ``content_length`` are part of the signature: S3 rejects uploads to the URL
+    whose `Content-Type` and `Content-Length` headers do not match them exactly.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param expires_in: How long the URL is valid for, in seconds.
+    :param content_type: Optional MIME type the upload must declare, and the object is stored with.
+    :param content_length: Optional size in bytes the upload must have.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :return: The presigned URL.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    params = {"Bucket": bucket_name, "Key": object_key}
+    if content_type:
+        params["ContentType"] = content_type
+    if content_length is not None:
+        params["ContentLength"] = content_length
+    return s3_client.generate_presigned_url("put_object", Params=params, ExpiresIn=expires_in)
+
+
+def generate_presigned_upload_part_urls(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    part_count: int,
+    expires_in: int,
+    s3_client: Optional["S3Client"] = None,
+) -> list[str]:
+    """Generate a URL to PUT each part of a multipart upload to, until they expire.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID returned by `create_multipart_upload`.
+    :param part_count: The number of parts; the URL of part ``n`` is at index ``n - 1``.
+    :param expires_in: How long the URLs are valid for, in seconds.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :return: The presigned URLs, in part number order.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    return [
+        s3_client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": bucket_name, "Key": object_key, "UploadId": upload_id, "PartNumber": part_number},
+            ExpiresIn=expires_in,
+        )
+        for part_number in range(1, part_count + 1)
+    ]
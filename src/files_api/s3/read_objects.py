@@ -1,13 +1,25 @@
 """Functions for reading objects from an S3 bucket--the "R" in CRUD."""
 
-from typing import Optional
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import datetime
+from typing import (
+    Iterator,
+    Optional,
+)
 
 import boto3
+from botocore.exceptions import ClientError
+
+from files_api.errors import raise_storage_error
 
 try:
     from mypy_boto3_s3 import S3Client
     from mypy_boto3_s3.type_defs import (
         GetObjectOutputTypeDef,
+        HeadObjectOutputTypeDef,
         ObjectTypeDef,
     )
 except ImportError:
@@ -15,6 +27,64 @@ except ImportError:
 
 DEFAULT_MAX_KEYS = 1_000
 
+# files stored with deduplication are pointer objects whose body is the key of the blob holding their
+# content; these user metadata keys of the pointer name the blob and its size
+POINTER_BLOB_KEY_METADATA_KEY = "blob-key"
+POINTER_BLOB_SIZE_METADATA_KEY = "blob-size"
+
+
+@dataclass(frozen=True)
+class ObjectMetadata:
+    """Metadata of an S3 object, as returned by `head_object`.
+
+    For a pointer object, ``content_length`` is the size of the blob it points to.
+    """
+
+    content_type: str
+    content_length: int
+    last_modified: datetime
+    etag: str
+    cache_control: Optional[str] = None
+    metadata: dict[str, str] = field(default_factory=dict)
+    content_encoding: Optional[str] = None
+
+    @property
+    def blob_key(self) -> Optional[str]:
+        """Key of the blob holding the object's content, if the object is a pointer to one."""
+        return self.metadata.get(POINTER_BLOB_KEY_METADATA_KEY)
+
+
+@dataclass(frozen=True)
+class ReadConditions:
+    """Conditional request headers (RFC 9110, section 13.1) for S3 to evaluate when reading an object.
+
+    Evaluating them in S3 means a 304 or 412 outcome costs no transfer of the object's body.
+    """
+
+    if_match: Optional[str] = None
+    if_none_match: Optional[str] = None
+    if_modified_since: Optional[datetime] = None
+    if_unmodified_since: Optional[datetime] = None
+
+    def to_s3_kwargs(self) -> dict:
+        """Keyword arguments for `get_object` / `head_object`; unset conditions are left out."""
+        s3_kwargs = {
+            "IfMatch": self.if_match,
+            "IfNoneMatch": self.if_none_match,
+            "IfModifiedSince": self.if_modified_since,
+            "IfUnmodifiedSince": self.if_unmodified_since,
+        }
+        return {name: value for name, value in s3_kwargs.items() if value is not None}
+
+
+def is_not_found_error(err: ClientError) -> bool:
+    """Whether a botocore ``ClientError`` means the object does not exist.
+
+    ``head_object`` responses have no body, so S3 reports a bare "404" code for them,
+    whereas ``get_object`` reports "NoSuchKey".
+    """
+    return err.response["Error"]["Code"] in ("404", "NoSuchKey")
+
 
 def object_exists_in_s3(bucket_name: str, object_key: str, s3_client: Optional["S3Client"] = None) -> bool:
     """Check if an object exists in the S3 bucket using head_object.
@@ -30,28 +100,118 @@ def object_exists_in_s3(bucket_name: str, object_key: str, s3_client: Optional["
         s3_client.head_object(Bucket=bucket_name, Key=object_key)
         return True
     except s3_client.exceptions.ClientError as err:
-        error_code = err.response["Error"]["Code"]
-        if error_code == "404":
+        if is_not_found_error(err):
             return False
         raise
 
 
+def fetch_s3_object_metadata(
+    bucket_name: str,
+    object_key: str,
+    conditions: Optional[ReadConditions] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> ObjectMetadata:
+    """Fetch metadata of an object in the S3 bucket without downloading its body.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to fetch metadata for.
+    :param conditions: Optional conditions the object must meet.
+    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+
+    :raises ObjectNotFoundError: If the object does not exist.
+    :raises NotModifiedError: If `conditions.if_none_match` or `conditions.if_modified_since` do not hold.
+    :raises PreconditionFailedError: If `conditions.if_match` or `conditions.if_unmodified_since` do not hold.
+
+    :return: Metadata of the object.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    condition_kwargs = conditions.to_s3_kwargs() if conditions else {}
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=object_key, **condition_kwargs)
+    except s3_client.exceptions.ClientError as err:
+        raise_storage_error(err, bucket_name, object_key)
+    metadata = response.get("Metadata", {})
+    return ObjectMetadata(
+        content_type=response.get("ContentType", "binary/octet-stream"),
+        content_length=int(metadata.get(POINTER_BLOB_SIZE_METADATA_KEY, response["ContentLength"])),
+        last_modified=response["LastModified"],
+        etag=response["ETag"],
+        cache_control=response.get("CacheControl"),
+        metadata=metadata,
+        content_encoding=response.get("ContentEncoding"),
+    )
+
+
 def fetch_s3_object(
     bucket_name: str,
     object_key: str,
+    byte_range: Optional[str] = None,
+    conditions: Optional[ReadConditions] = None,
     s3_client: Optional["S3Client"] = None,
 ) -> "GetObjectOutputTypeDef":
-    """Fetch metadata of an object in the S3 bucket.
+    """Fetch an object in the S3 bucket, or a byte range of it.
+
+    A pointer object is followed to its blob: the response has the blob's body and size, and the
+    pointer's other metadata. ``conditions`` are evaluated against the pointer, whose ETag
+    changes whenever it points to other content.
 
     :param bucket_name: Name of the S3 bucket.
     :param object_key: Key of the object to fetch.
+    :param byte_range: Optional single HTTP byte range to fetch, e.g. "bytes=0-99".
+    :param conditions: Optional conditions the object must meet.
     :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
 
-    :return: Metadata of the object.
+    :raises ObjectNotFoundError: If the object does not exist.
+    :raises RangeNotSatisfiableError: If `byte_range` starts beyond the end of the object.
+    :raises NotModifiedError: If `conditions.if_none_match` or `conditions.if_modified_since` do not hold.
+    :raises PreconditionFailedError: If `conditions.if_match` or `conditions.if_unmodified_since` do not hold.
+
+    :return: Metadata of the object and a stream of its body.
     """
     s3_client = s3_client or boto3.client("s3")
-    response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
-    return response
+    extra_kwargs = conditions.to_s3_kwargs() if conditions else {}
+    if byte_range:
+        extra_kwargs["Range"] = byte_range
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=object_key, **extra_kwargs)
+    except s3_client.exceptions.ClientError as err:
+        if not (byte_range and err.response["Error"]["Code"] == "InvalidRange"):
+            raise_storage_error(err, bucket_name, object_key)
+        # the range may lie beyond the end of a pointer, yet within its blob
+        pointer_response = _fetch_pointer_head(s3_client, bucket_name, object_key, conditions)
+        if pointer_response is None:
+            raise_storage_error(err, bucket_name, object_key)
+        response = pointer_response
+
+    blob_key = response.get("Metadata", {}).get(POINTER_BLOB_KEY_METADATA_KEY)
+    if blob_key is None:
+        return response
+    if "Body" in response:
+        response["Body"].close()
+    blob_kwargs = {"Range": byte_range} if byte_range else {}
+    try:
+        blob_response = s3_client.get_object(Bucket=bucket_name, Key=blob_key, **blob_kwargs)
+    except s3_client.exceptions.ClientError as err:
+        raise_storage_error(err, bucket_name, object_key)
+    return {
+        **blob_response,
+        "ETag": response["ETag"],
+        "LastModified": response["LastModified"],
+        "ContentType": response["ContentType"],
+        "Metadata": response["Metadata"],
+    }
+
+
+def _fetch_pointer_head(
+    s3_client: "S3Client", bucket_name: str, object_key: str, conditions: Optional[ReadConditions]
+) -> Optional["HeadObjectOutputTypeDef"]:
+    """The head_object response of ``object_key`` if it is a pointer object, else None."""
+    condition_kwargs = conditions.to_s3_kwargs() if conditions else {}
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=object_key, **condition_kwargs)
+    except s3_client.exceptions.ClientError as err:
+        raise_storage_error(err, bucket_name, object_key)
+    return response if POINTER_BLOB_KEY_METADATA_KEY in response.get("Metadata", {}) else None
 
 
 def fetch_s3_objects_using_page_token(
@@ -113,3 +273,90 @@ def fetch_s3_objects_metadata(
     next_page_token: str | None = response.get("NextContinuationToken")
 
     return files, next_page_token
+
+
+def fetch_s3_objects_page(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    page_token: Optional[str] = None,
+    max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+    delimiter: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[list["ObjectTypeDef"], list[str], Optional[str]]:
+    """Fetch one page of object keys and their metadata.
+
+    With a ``delimiter``, keys that contain it after the prefix are not returned individually;
+    they are grouped into "common prefixes", e.g. with ``prefix="a/"`` and ``delimiter="/"``
+    the keys "a/b/1.txt" and "a/b/2.txt" are both represented by the common prefix "a/b/".
+    Each page holds up to ``max_keys`` objects and common prefixes combined.
+
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param prefix: Prefix to filter objects by. Without a `delimiter`, it is ignored when `page_token`
+        is given, since the token already encodes the prefix of the listing it continues.
+    :param page_token: Continuation token of the page to fetch, or None for the first page.
+    :param max_keys: Maximum number of keys to return within this page.
+    :param delimiter: Optional character to group keys by, usually "/".
+    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+
+    :return: Tuple of
+        1. Possibly empty list of objects in the current page.
+        2. Possibly empty list of common prefixes in the current page.
+        3. Next continuation token if there are more pages, otherwise None.
+    """
+    if not delimiter:
+        if page_token:
+            files, next_page_token = fetch_s3_objects_using_page_token(
+                bucket_name=bucket_name,
+                continuation_token=page_token,
+                max_keys=max_keys,
+                s3_client=s3_client,
+            )
+        else:
+            files, next_page_token = fetch_s3_objects_metadata(
+                bucket_name=bucket_name,
+                prefix=prefix,
+                max_keys=max_keys,
+                s3_client=s3_client,
+            )
+        return files, [], next_page_token
+
+    s3_client = s3_client or boto3.client("s3")
+    # delimited listings group keys relative to the prefix, so continuing one needs the prefix again
+    page_token_kwargs = {"ContinuationToken": page_token} if page_token else {}
+    response = s3_client.list_objects_v2(
+        Bucket=bucket_name,
+        Prefix=prefix or "",
+        Delimiter=delimiter,
+        MaxKeys=max_keys or DEFAULT_MAX_KEYS,
+        **page_token_kwargs,
+    )
+    common_prefixes = [common_prefix["Prefix"] for common_prefix in response.get("CommonPrefixes", [])]
+    return response.get("Contents", []), common_prefixes, response.get("NextContinuationToken")
+
+
+def iter_s3_object_pages(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    page_size: int = DEFAULT_MAX_KEYS,
+    s3_client: Optional["S3Client"] = None,
+) -> Iterator[list["ObjectTypeDef"]]:
+    """Lazily list every object under a prefix, one page at a time.
+
+    Each page is only requested from S3 when the previous one has been consumed,
+    so memory use does not grow with the number of objects.
+
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param prefix: Prefix to filter objects by.
+    :param page_size: Maximum number of keys per page; S3 caps this at 1000.
+    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+
+    :return: An iterator over possibly empty pages of objects.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(
+        Bucket=bucket_name,
+        Prefix=prefix or "",
+        PaginationConfig={"PageSize": page_size},
+    ):
+        yield page.get("Contents", [])
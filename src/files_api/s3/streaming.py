@@ -0,0 +1,487 @@
+"""Async helpers that stream object bytes to and from S3 without holding whole files in memory."""
+
+import heapq
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import (
+    AsyncIterator,
+    Optional,
+    Protocol,
+    Union,
+)
+
+import anyio
+from anyio.streams.memory import (
+    MemoryObjectReceiveStream,
+    MemoryObjectSendStream,
+)
+
+from files_api.archives import ArchiveWriter
+from files_api.compression import (
+    ENCODING_FILE_EXTENSIONS,
+    CompressionPolicy,
+    Decompressor,
+    compress_chunks,
+)
+from files_api.errors import ObjectNotFoundError
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import (
+    DEFAULT_MAX_KEYS,
+    fetch_s3_object,
+    fetch_s3_objects_page,
+    iter_s3_object_pages,
+)
+from files_api.s3.write_objects import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    upload_part,
+    upload_s3_object,
+)
+
+try:
+    from mypy_boto3_s3.type_defs import (
+        CompletedPartTypeDef,
+        ObjectTypeDef,
+    )
+except ImportError:
+    ...
+
+# S3 rejects multipart uploads whose parts (other than the last) are smaller than this
+MIN_MULTIPART_PART_SIZE_BYTES = 5 * 1024 * 1024
+DEFAULT_MULTIPART_PART_SIZE_BYTES = 8 * 1024 * 1024
+
+DEFAULT_DOWNLOAD_CHUNK_SIZE_BYTES = 1024 * 1024
+
+
+DEFAULT_ARCHIVE_PREFETCH_MAX_OBJECT_SIZE_BYTES = 1024 * 1024
+
+
+class ReadableBody(Protocol):
+    """The parts of botocore's ``StreamingBody`` used to download an object."""
+
+    def read(self, amt: Optional[int] = None) -> bytes: ...
+
+    def close(self) -> None: ...
+
+
+class ChunkSink(Protocol):
+    """Receives a copy of the bytes of an S3 object's body as they are read, e.g. to cache them.
+
+    `write` is called from worker threads, in order. Once the whole body was read, `commit` is
+    awaited; if reading stops early, `discard` is called instead. `discard` after `commit` does nothing.
+    """
+
+    def write(self, data: bytes) -> None: ...
+
+    async def commit(self) -> None: ...
+
+    def discard(self) -> None: ...
+
+
+async def upload_s3_object_from_stream(
+    s3: S3Executor,
+    chunks: AsyncIterator[bytes],
+    bucket_name: str,
+    object_key: str,
+    content_type: Optional[str] = None,
+    part_size: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    max_concurrent_parts: int = 4,
+    compression: Optional[CompressionPolicy] = None,
+) -> None:
+    """Upload an object to S3 while its bytes are still arriving.
+
+    Chunks are accumulated into parts of ``part_size`` bytes and each full part is uploaded
+    as soon as it is ready, with at most ``max_concurrent_parts`` part uploads in flight.
+    Reading from ``chunks`` pauses while all upload slots are busy, so peak memory is roughly
+    ``part_size * (max_concurrent_parts + 1)`` no matter how large the object is.
+
+    Objects smaller than one part are sent with a single ``put_object`` call instead.
+    If anything goes wrong, including the client disconnecting mid-upload, the multipart
+    upload is aborted so S3 discards the parts uploaded so far.
+
+    With ``compression``, objects of the content types it applies to are compressed as they
+    arrive, whatever their size, and parts are cut from the compressed bytes.
+
+    :param s3: Executor used to make the S3 calls.
+    :param chunks: The object's bytes, e.g. ``request.stream()``.
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param part_size: Size in bytes of each part; at least 5 MiB.
+    :param max_concurrent_parts: Maximum number of parts uploaded concurrently.
+    :param compression: Optional policy of which objects to compress, and how.
+    """
+    if part_size < MIN_MULTIPART_PART_SIZE_BYTES:
+        raise ValueError(f"part_size must be at least {MIN_MULTIPART_PART_SIZE_BYTES} bytes, got {part_size}")
+
+    content_encoding: Optional[str] = None
+    if compression is not None and compression.should_compress(content_type):
+        content_encoding = compression.encoding
+        chunks = compress_chunks(compression.create_compressor(), chunks)
+
+    buffer = bytearray()
+    upload_id: Optional[str] = None
+    completed_parts: list["CompletedPartTypeDef"] = []
+    upload_slots = anyio.Semaphore(max_concurrent_parts)
+
+    async def send_part(part_number: int, body: bytes) -> None:
+        try:
+            completed_parts.append(
+                await s3.run(
+                    upload_part,
+                    bucket_name=bucket_name,
+                    object_key=object_key,
+                    upload_id=upload_id,
+                    part_number=part_number,
+                    body=body,
+                )
+            )
+        finally:
+            upload_slots.release()
+
+    try:
+        async with anyio.create_task_group() as task_group:
+            part_number = 0
+            async for chunk in chunks:
+                buffer += chunk
+                while len(buffer) >= part_size:
+                    if upload_id is None:
+                        upload_id = await s3.run(
+                            create_multipart_upload,
+                            bucket_name=bucket_name,
+                            object_key=object_key,
+                            content_type=content_type,
+                            content_encoding=content_encoding,
+                        )
+                    part_number += 1
+                    part = bytes(buffer[:part_size])
+                    del buffer[:part_size]
+                    # back-pressure: stop consuming the stream until an upload slot is free
+                    await upload_slots.acquire()
+                    task_group.start_soon(send_part, part_number, part)
+
+            if upload_id is None:
+                await s3.run(
+                    upload_s3_object,
+                    bucket_name=bucket_name,
+                    object_key=object_key,
+                    file_content=bytes(buffer),
+                    content_type=content_type,
+                    content_encoding=content_encoding,
+                )
+                return
+
+            if buffer:
+                part_number += 1
+                await upload_slots.acquire()
+                task_group.start_soon(send_part, part_number, bytes(buffer))
+                buffer.clear()
+
+        await s3.run(
+            complete_multipart_upload,
+            bucket_name=bucket_name,
+            object_key=object_key,
+            upload_id=upload_id,
+            parts=completed_parts,
+        )
+    except BaseException:
+        if upload_id is not None:
+            # shielded so the abort still happens when the request task is being cancelled
+            with anyio.CancelScope(shield=True):
+                await s3.run(
+                    abort_multipart_upload,
+                    bucket_name=bucket_name,
+                    object_key=object_key,
+                    upload_id=upload_id,
+                )
+        raise
+
+
+async def read_s3_object_body(
+    s3: S3Executor,
+    body: ReadableBody,
+    chunks: MemoryObjectSendStream[bytes],
+    chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE_BYTES,
+    decompressor: Optional[Decompressor] = None,
+    sink: Optional[ChunkSink] = None,
+) -> None:
+    """Read an S3 object's body in chunks of ``chunk_size`` bytes and send them to ``chunks``.
+
+    Each blocking ``read`` runs through ``s3``, off the event loop. With an unbuffered
+    ``chunks`` stream, the next chunk is read from S3 while the receiver is still sending
+    the previous one, and reading pauses until the receiver takes it, so at most two chunks
+    are held in memory per download.
+
+    ``chunks`` is closed once the body is exhausted. The body is always closed, including when
+    this is cancelled because the client disconnected, which releases the S3 connection
+    instead of leaving the rest of the object unread on it.
+
+    :param s3: Executor used to read the body.
+    :param body: The ``Body`` of a ``get_object`` response.
+    :param chunks: Where to send the chunks.
+    :param chunk_size: Maximum size in bytes of each chunk read from S3.
+    :param decompressor: Optional decompressor for a compressed body, which then sends its
+        decompressed bytes instead, decompressed in the same worker thread call as they are read.
+    :param sink: Optional sink that gets a copy of the body's bytes as they are read from S3,
+        before any decompression. It is committed after the last chunk was sent.
+    """
+
+    def read_from_body() -> bytes:
+        data = body.read(chunk_size)
+        if sink is not None and data:
+            sink.write(data)
+        return data
+
+    def read_chunk() -> bytes:
+        if decompressor is None:
+            return read_from_body()
+        # a compressed chunk can decompress to nothing, which must not end the stream early
+        while compressed := read_from_body():
+            if decompressed := decompressor.decompress(compressed):
+                return decompressed
+        return decompressor.flush()
+
+    try:
+        async with chunks:
+            while chunk := await s3.run_sync(read_chunk):
+                await chunks.send(chunk)
+        if sink is not None:
+            await sink.commit()
+    finally:
+        body.close()
+        if sink is not None:
+            sink.discard()
+
+
+@dataclass
+class _FetchedObject:
+    """An object fetched ahead of the archive writer: either its whole ``content`` or its unread ``body``."""
+
+    object_key: str
+    size: int
+    last_modified: datetime
+    content: Optional[bytes] = None
+    body: Optional[ReadableBody] = None
+    content_encoding: Optional[str] = None
+
+
+@dataclass
+class _PendingFetch:
+    fetched: anyio.Event
+    # None once fetched means the object was deleted after it was listed
+    result: Optional[_FetchedObject] = None
+
+
+async def write_s3_objects_archive(  # pylint: disable=too-many-arguments
+    s3: S3Executor,
+    bucket_name: str,
+    prefix: str,
+    archive: ArchiveWriter,
+    chunks: MemoryObjectSendStream[bytes],
+    max_concurrent_objects: int = 8,
+    prefetch_max_object_size: int = DEFAULT_ARCHIVE_PREFETCH_MAX_OBJECT_SIZE_BYTES,
+    chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE_BYTES,
+    exclude_prefix: Optional[str] = None,
+) -> None:
+    """Write every object under ``prefix`` into ``archive``, in key order, and send the archive to ``chunks``.
+
+    Objects are fetched ahead of the archive writer, ``max_concurrent_objects`` at a time, so the
+    writer rarely waits for S3 between two small objects. Objects of up to ``prefetch_max_object_size``
+    bytes are read in full while they wait to be written; for larger ones only the get_object call
+    is made ahead, and their bodies are read ``chunk_size`` bytes at a time once the writer gets to
+    them. Peak memory is therefore about ``max_concurrent_objects * prefetch_max_object_size``
+    plus one chunk, however many and however large the objects are.
+
+    Paths in the archive are relative to ``prefix``. Objects stored compressed are archived as
+    they are stored, with their encoding's extension, e.g. ".gz", appended to their path.
+    Objects deleted after they were listed are left out. ``chunks`` is closed once the archive is complete.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket.
+    :param prefix: Prefix of the objects to archive, e.g. "path/to/".
+    :param archive: Writer of the archive format.
+    :param chunks: Where to send the archive's bytes.
+    :param max_concurrent_objects: Maximum number of objects fetched but not yet written.
+    :param prefetch_max_object_size: Objects larger than this are not read ahead of the writer.
+    :param chunk_size: Maximum number of bytes read from a large object's body at a time.
+    :param exclude_prefix: Optional prefix of objects to leave out, e.g. the blobs of deduplicated files.
+    """
+    fetch_slots = anyio.Semaphore(max_concurrent_objects)
+    pending_fetches_to_write, pending_fetches = anyio.create_memory_object_stream[_PendingFetch](
+        max_buffer_size=math.inf
+    )
+    # bodies fetched but not fully read yet, closed whatever happens
+    open_bodies: set[ReadableBody] = set()
+
+    async def fetch(object_key: str, pending: _PendingFetch) -> None:
+        try:
+            response = await s3.run(fetch_s3_object, bucket_name=bucket_name, object_key=object_key)
+        except ObjectNotFoundError:
+            pending.fetched.set()
+            return
+        fetched = _FetchedObject(
+            object_key=object_key,
+            size=response["ContentLength"],
+            last_modified=response["LastModified"],
+            content_encoding=response.get("ContentEncoding"),
+        )
+        body = response["Body"]
+        if fetched.size <= prefetch_max_object_size:
+            try:
+                fetched.content = await s3.run_sync(body.read)
+            finally:
+                body.close()
+        else:
+            open_bodies.add(body)
+            fetched.body = body
+        pending.result = fetched
+        pending.fetched.set()
+
+    async def list_and_fetch(task_group: anyio.abc.TaskGroup) -> None:
+        async with pending_fetches_to_write:
+            pages = iter_s3_object_pages(bucket_name, prefix=prefix, s3_client=s3.s3_client)
+            try:
+                while (page := await s3.run_sync(next, pages, None)) is not None:
+                    for obj in page:
+                        if exclude_prefix and obj["Key"].startswith(exclude_prefix):
+                            continue
+                        # back-pressure: stop fetching ahead until the writer has written an object
+                        await fetch_slots.acquire()
+                        pending = _PendingFetch(fetched=anyio.Event())
+                        task_group.start_soon(fetch, obj["Key"], pending)
+                        await pending_fetches_to_write.send(pending)
+            finally:
+                pages.close()
+
+    async def send(data: bytes) -> None:
+        if data:
+            await chunks.send(data)
+
+    async def write(fetched: _FetchedObject) -> None:
+        # compressed files are archived as stored, since their size must be known up front
+        path = fetched.object_key[len(prefix) :] + ENCODING_FILE_EXTENSIONS.get(fetched.content_encoding or "", "")
+        await send(archive.start_file(path, fetched.size, fetched.last_modified))
+        if fetched.body is None:
+            await send(archive.write(fetched.content or b""))
+        else:
+            try:
+                while chunk := await s3.run_sync(fetched.body.read, chunk_size):
+                    await send(archive.write(chunk))
+            finally:
+                fetched.body.close()
+                open_bodies.discard(fetched.body)
+        await send(archive.end_file())
+
+    try:
+        async with chunks, anyio.create_task_group() as task_group:
+            task_group.start_soon(list_and_fetch, task_group)
+            async with pending_fetches:
+                async for pending in pending_fetches:
+                    await pending.fetched.wait()
+                    if pending.result is not None:
+                        await write(pending.result)
+                    fetch_slots.release()
+            await send(archive.close())
+    finally:
+        for body in open_bodies:
+            body.close()
+
+
+async def list_s3_objects_sharded(  # pylint: disable=too-many-arguments
+    s3: S3Executor,
+    bucket_name: str,
+    prefix: str,
+    pages: MemoryObjectSendStream[list["ObjectTypeDef"]],
+    max_concurrent_shards: int = 8,
+    page_size: int = DEFAULT_MAX_KEYS,
+    first_page: Optional[tuple[list["ObjectTypeDef"], list[str], Optional[str]]] = None,
+) -> None:
+    """List every object under ``prefix``, listing its sub-prefixes concurrently, and send them to ``pages``.
+
+    A sequential listing makes one round-trip per 1000 keys. This lists ``prefix`` with ``delimiter="/"``
+    to discover its "sub-directories" and lists up to ``max_concurrent_shards`` of them at once, each one
+    page at a time through ``s3``. A sub-directory is only listed one page ahead of the page being sent,
+    so peak memory is about ``2 * max_concurrent_shards`` pages, however many objects there are.
+    Objects are sent in key order, the same order as `iter_s3_object_pages` yields them, in
+    non-empty pages of up to ``page_size`` objects. ``pages`` is closed once every object was sent.
+
+    Only the first level of sub-prefixes is sharded, so this helps most for prefixes whose
+    keys are spread over many sub-prefixes.
+
+    :param s3: Executor used to make the S3 calls.
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param prefix: Prefix of the objects to list, e.g. "path/to/".
+    :param pages: Where to send the pages of objects.
+    :param max_concurrent_shards: Maximum number of sub-prefixes being listed at once.
+    :param page_size: Maximum number of keys per S3 call.
+    :param first_page: The first page of the delimited listing of ``prefix``, as returned by
+        `fetch_s3_objects_page`, if it was already fetched, e.g. to fail before a response starts.
+    """
+    shard_slots = anyio.Semaphore(max_concurrent_shards)
+    # in key order: pages of the objects directly under the prefix, and streams of the pages of each sub-prefix
+    parts_to_send, parts = anyio.create_memory_object_stream[
+        Union[list["ObjectTypeDef"], MemoryObjectReceiveStream[list["ObjectTypeDef"]]]
+    ](max_buffer_size=max_concurrent_shards)
+
+    async def list_shard(shard_prefix: str, shard_pages: MemoryObjectSendStream[list["ObjectTypeDef"]]) -> None:
+        object_pages = iter_s3_object_pages(bucket_name, shard_prefix, page_size, s3_client=s3.s3_client)
+        try:
+            async with shard_pages:
+                while (page := await s3.run_sync(next, object_pages, None)) is not None:
+                    if page:
+                        await shard_pages.send(page)
+        finally:
+            object_pages.close()
+
+    async def list_prefix(task_group: anyio.abc.TaskGroup) -> None:
+        async with parts_to_send:
+            page, page_token = first_page, None
+            while True:
+                if page is None:
+                    page = await s3.run(
+                        fetch_s3_objects_page,
+                        bucket_name=bucket_name,
+                        prefix=prefix,
+                        page_token=page_token,
+                        max_keys=page_size,
+                        delimiter="/",
+                    )
+                files, directories, page_token = page
+                direct_objects: list["ObjectTypeDef"] = []
+                # S3 sorts objects and common prefixes together, as if each prefix were one key
+                for key, obj in heapq.merge(
+                    ((obj["Key"], obj) for obj in files),
+                    ((directory, None) for directory in directories),
+                    key=lambda entry: entry[0],
+                ):
+                    if obj is not None:
+                        direct_objects.append(obj)
+                        continue
+                    if direct_objects:
+                        await parts_to_send.send(direct_objects)
+                        direct_objects = []
+                    # back-pressure: start no more shards until the oldest one has been sent
+                    await shard_slots.acquire()
+                    # unbuffered: a shard lists its next page while the previous one waits to be sent
+                    shard_pages_to_send, shard_pages = anyio.create_memory_object_stream[list["ObjectTypeDef"]]()
+                    task_group.start_soon(list_shard, key, shard_pages_to_send)
+                    await parts_to_send.send(shard_pages)
+                if direct_objects:
+                    await parts_to_send.send(direct_objects)
+                if not page_token:
+                    return
+                page = None
+
+    async with pages, anyio.create_task_group() as task_group:
+        task_group.start_soon(list_prefix, task_group)
+        async with parts:
+            async for part in parts:
+                if isinstance(part, list):
+                    await pages.send(part)
+                    continue
+                async with part:
+                    async for shard_page in part:
+                        await pages.send(shard_page)
+                shard_slots.release()
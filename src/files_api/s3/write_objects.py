@@ -4,8 +4,14 @@ from typing import Optional
 
 import boto3
 
+from files_api.errors import (
+    PreconditionFailedError,
+    raise_storage_error,
+)
+
 try:
     from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import CompletedPartTypeDef
 except ImportError:
     ...
 
@@ -15,6 +21,10 @@ def upload_s3_object(
     object_key: str,
     file_content: bytes,
     content_type: Optional[str] = None,
+    if_match: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    content_encoding: Optional[str] = None,
+    metadata: Optional[dict[str, str]] = None,
     s3_client: Optional["S3Client"] = None,
 ) -> None:
     """Upload a file to an S3 bucket.
@@ -23,13 +33,204 @@ def upload_s3_object(
     :param object_key: path to the object in the S3 bucket.
     :param file_content: The content of the file to upload.
     :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param if_match: Only overwrite the object if its current ETag is this one.
+    :param if_none_match: Pass "*" to only write the object if no object exists at `object_key` yet.
+    :param content_encoding: The encoding `file_content` is compressed with, e.g. "gzip", if any.
+    :param metadata: Optional user-defined metadata to store with the object.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :raises PreconditionFailedError: If `if_match` or `if_none_match` do not hold.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    content_type = content_type or "application/octet-stream"
+    conditions = {"IfMatch": if_match, "IfNoneMatch": if_none_match}
+    conditions = {name: value for name, value in conditions.items() if value}
+    extra_kwargs = {"ContentEncoding": content_encoding} if content_encoding else {}
+    try:
+        s3_client.put_object(
+            Bucket=bucket_name,
+            Key=object_key,
+            Body=file_content,
+            ContentType=content_type,
+            Metadata=metadata or {},
+            **conditions,
+            **extra_kwargs,
+        )
+    except s3_client.exceptions.ClientError as err:
+        # an If-Match condition cannot hold for an object that does not exist
+        if if_match and err.response["Error"]["Code"] == "NoSuchKey":
+            raise PreconditionFailedError(bucket_name, object_key) from err
+        raise_storage_error(err, bucket_name, object_key)
+
+
+def copy_s3_object(
+    bucket_name: str,
+    source_key: str,
+    destination_key: str,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """Copy an object of up to 5 GiB within the bucket, without its bytes leaving S3.
+
+    The copy keeps the source's content type and metadata.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param source_key: path to the object to copy.
+    :param destination_key: path to copy the object to; an existing object there is overwritten.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :raises ObjectNotFoundError: If the source object does not exist.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    try:
+        s3_client.copy_object(
+            Bucket=bucket_name,
+            Key=destination_key,
+            CopySource={"Bucket": bucket_name, "Key": source_key},
+        )
+    except s3_client.exceptions.ClientError as err:
+        raise_storage_error(err, bucket_name, source_key)
+
+
+def create_multipart_upload(
+    bucket_name: str,
+    object_key: str,
+    content_type: Optional[str] = None,
+    cache_control: Optional[str] = None,
+    metadata: Optional[dict[str, str]] = None,
+    content_encoding: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> str:
+    """Start a multipart upload.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param cache_control: Optional Cache-Control header to store with the object.
+    :param metadata: Optional user-defined metadata to store with the object.
+    :param content_encoding: The encoding the parts are compressed with, e.g. "gzip", if any.
     :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :return: The ID of the multipart upload, needed to upload parts to it.
     """
     s3_client = s3_client or boto3.client("s3")
     content_type = content_type or "application/octet-stream"
-    s3_client.put_object(
+    extra_kwargs = {"CacheControl": cache_control, "ContentEncoding": content_encoding}
+    extra_kwargs = {name: value for name, value in extra_kwargs.items() if value}
+    response = s3_client.create_multipart_upload(
         Bucket=bucket_name,
         Key=object_key,
-        Body=file_content,
         ContentType=content_type,
+        Metadata=metadata or {},
+        **extra_kwargs,
+    )
+    return response["UploadId"]
+
+
+def upload_part(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    part_number: int,
+    body: bytes,
+    s3_client: Optional["S3Client"] = None,
+) -> "CompletedPartTypeDef":
+    """Upload one part of a multipart upload.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID returned by `create_multipart_upload`.
+    :param part_number: 1-based position of this part within the object.
+    :param body: The bytes of this part. Every part except the last must be at least 5 MiB.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :return: The part number and ETag, needed to complete the multipart upload.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    response = s3_client.upload_part(
+        Bucket=bucket_name,
+        Key=object_key,
+        UploadId=upload_id,
+        PartNumber=part_number,
+        Body=body,
+    )
+    return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+
+def upload_part_copy(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    part_number: int,
+    source_key: str,
+    byte_range: str,
+    s3_client: Optional["S3Client"] = None,
+) -> "CompletedPartTypeDef":
+    """Copy a byte range of another object in the bucket as one part of a multipart upload.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID returned by `create_multipart_upload`.
+    :param part_number: 1-based position of this part within the object.
+    :param source_key: path to the object to copy the part from.
+    :param byte_range: The bytes of the source to copy, e.g. "bytes=0-5242879". Every part except
+        the last must be at least 5 MiB.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+
+    :raises ObjectNotFoundError: If the source object does not exist.
+
+    :return: The part number and ETag, needed to complete the multipart upload.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    try:
+        response = s3_client.upload_part_copy(
+            Bucket=bucket_name,
+            Key=object_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            CopySource={"Bucket": bucket_name, "Key": source_key},
+            CopySourceRange=byte_range,
+        )
+    except s3_client.exceptions.ClientError as err:
+        raise_storage_error(err, bucket_name, source_key)
+    return {"PartNumber": part_number, "ETag": response["CopyPartResult"]["ETag"]}
+
+
+def complete_multipart_upload(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    parts: list["CompletedPartTypeDef"],
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """Assemble the uploaded parts into the final object.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID returned by `create_multipart_upload`.
+    :param parts: The values returned by `upload_part`, in any order.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    s3_client.complete_multipart_upload(
+        Bucket=bucket_name,
+        Key=object_key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": sorted(parts, key=lambda part: part["PartNumber"])},
     )
+
+
+def abort_multipart_upload(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """Abort a multipart upload so that S3 discards (and stops billing for) its uploaded parts.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID returned by `create_multipart_upload`.
+    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+    """
+    s3_client = s3_client or boto3.client("s3")
+    s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_key, UploadId=upload_id)
@@ -1,6 +1,7 @@
 import os
 from datetime import datetime
 from typing import (
+    Dict,
     List,
     Optional,
 )
@@ -14,6 +15,8 @@ from pydantic import (
 )
 from typing_extensions import Self
 
+from files_api.page_tokens import PageToken
+
 # constants
 DEFAULT_GET_FILES_PAGE_SIZE = 10
 DEFAULT_GET_FILES_MAX_PAGE_SIZE = 100
@@ -41,6 +44,13 @@ class GetFilesResponse(BaseModel):
     """Response model for `GET /v1/files`."""
 
     files: List[FileMetadata]
+    directories: List[str] = Field(
+        default_factory=list,
+        description=(
+            "Sub-directories of the listed directory, each ending with '/'. "
+            "Only returned when `recursive=false`; otherwise their files are part of `files`."
+        ),
+    )
     next_page_token: Optional[str]
 
     model_config = ConfigDict(
@@ -58,6 +68,7 @@ class GetFilesResponse(BaseModel):
                         "size_bytes": 256,
                     },
                 ],
+                "directories": [],
                 "next_page_token": "next_page_token_example",
             }
         }
@@ -67,14 +78,25 @@ class GetFilesResponse(BaseModel):
 class GetFilesQueryParams(BaseModel):
     """Query parameters for `GET /v1/files`."""
     
-    page_size: int = Field(
-        default=DEFAULT_GET_FILES_PAGE_SIZE, 
-        ge=DEFAULT_GET_FILES_MIN_PAGE_SIZE, 
-        le=DEFAULT_GET_FILES_MAX_PAGE_SIZE)
+    # FastAPI passes every query parameter to this model, defaults included, so page_size and directory
+    # default to None: that is how `check_page_token_is_exclusive` can tell whether they were sent with a page_token
+    page_size: Optional[int] = Field(
+        default=None,
+        ge=DEFAULT_GET_FILES_MIN_PAGE_SIZE,
+        le=DEFAULT_GET_FILES_MAX_PAGE_SIZE,
+        description=f"The number of files per page. Defaults to {DEFAULT_GET_FILES_PAGE_SIZE}.",
+    )
     
-    directory: str = Field(
-        DEFAULT_GET_FILES_DIRECTORY,
-        description="The directory to list files from.",
+    directory: Optional[str] = Field(
+        None,
+        description="The directory to list files from. Defaults to the whole bucket.",
+    )
+    recursive: Optional[bool] = Field(
+        None,
+        description=(
+            "Whether to list the files in sub-directories too. With `false`, only the files directly in "
+            "`directory` are listed and its sub-directories are returned in `directories`. Defaults to `true`."
+        ),
     )
     page_token: Optional[str] = Field(
         None,
@@ -82,13 +104,14 @@ class GetFilesQueryParams(BaseModel):
     )
 
     @model_validator(mode='after')
-    def check_passwords_match(self) -> Self:
+    def check_page_token_is_exclusive(self) -> Self:
         if self.page_token: #if page token is set, then page size and directory should not be set
-            get_files_query_params: dict = self.model_dump(exclude_unset=True)
-            page_size_set ="page_size" in get_files_query_params.keys()
-            directory_set = "directory" in get_files_query_params.keys()
-            if page_size_set or directory_set:
-                raise ValueError("page_token is mutually exclusive with page_size and directory")
+            page_size_set = self.page_size is not None
+            directory_set = self.directory is not None
+            recursive_set = self.recursive is not None
+            if page_size_set or directory_set or recursive_set:
+                raise ValueError("page_token is mutually exclusive with page_size, directory and recursive")
+            PageToken.decode(self.page_token)
         return self
 
 # delete (cruD)
@@ -108,4 +131,267 @@ class PutFileResponse(BaseModel):
         description="The path of the file.",
         json_schema_extra={"example": "path/to/pyproject.toml"},
     )
-    message: str = Field(description="A message about the operation.")
\ No newline at end of file
+    message: str = Field(description="A message about the operation.")
+
+
+# batch metadata lookup (cRud)
+class GetFilesMetadataRequest(BaseModel):
+    """Request model for `POST /v1/bulk/metadata`."""
+
+    file_paths: List[str] = Field(
+        min_length=1,
+        max_length=1000,
+        description="The paths of the files to look up.",
+        json_schema_extra={"example": ["path/to/pyproject.toml", "path/to/Makefile"]},
+    )
+
+
+class FileMetadataResult(BaseModel):
+    """Metadata of one file of `POST /v1/bulk/metadata`; all but `exists` are null for files that do not exist."""
+
+    file_path: str = Field(description="The path of the file.")
+    exists: bool = Field(description="Whether the file exists.")
+    size_bytes: Optional[int] = Field(None, description="The size of the file in bytes.")
+    last_modified: Optional[datetime] = Field(None, description="The last modified date of the file.")
+    etag: Optional[str] = Field(None, description="The ETag of the file, as returned by `HEAD /v1/files/{file_path}`.")
+
+
+class GetFilesMetadataResponse(BaseModel):
+    """Response model for `POST /v1/bulk/metadata`."""
+
+    files: List[FileMetadataResult] = Field(description="The metadata of each file, in the order they were requested.")
+
+
+# bulk upload (CrUd)
+class UploadFileResult(PutFileResponse):
+    """The outcome of uploading one file of `POST /v1/bulk/upload`."""
+
+    status_code: int = Field(
+        description=(
+            "201 if the file was created, 200 if an existing file was updated, "
+            "400 if the path is not a valid file path, or 502 if S3 rejected the upload."
+        )
+    )
+
+
+class UploadFilesResponse(BaseModel):
+    """Response model for `POST /v1/bulk/upload` and `POST /v1/bulk/upload/tar`."""
+
+    files: List[UploadFileResult] = Field(description="The outcome of each upload, in the order the files were sent.")
+    total_uploaded: int = Field(description="The number of files uploaded.")
+    total_errors: int = Field(description="The number of files that could not be uploaded.")
+
+
+# bulk delete (cruD)
+class DeleteFilesRequest(BaseModel):
+    """Request model for `POST /v1/bulk/delete`. Exactly one of the fields must be set."""
+
+    file_paths: Optional[List[str]] = Field(
+        None,
+        description="The paths of the files to delete.",
+        json_schema_extra={"example": ["path/to/pyproject.toml", "path/to/Makefile"]},
+    )
+    directory: Optional[str] = Field(
+        None,
+        min_length=1,
+        description="Delete every file in this directory, including its sub-directories.",
+    )
+
+    @model_validator(mode="after")
+    def check_exactly_one_target(self) -> Self:
+        if (self.file_paths is None) == (self.directory is None):
+            raise ValueError("exactly one of file_paths and directory must be set")
+        return self
+
+
+class FileError(BaseModel):
+    """A file that could not be deleted, copied or moved."""
+
+    file_path: str = Field(description="The path of the file.")
+    code: str = Field(description="The S3 error code, e.g. `AccessDenied`.")
+    message: str = Field(description="The S3 error message.")
+
+
+class DeleteFilesProgress(BaseModel):
+    """One line of the newline-delimited JSON response of `POST /v1/bulk/delete`, sent per batch of files."""
+
+    deleted: List[str] = Field(description="The paths of the files deleted in this batch.")
+    errors: List[FileError] = Field(description="The files of this batch that could not be deleted.")
+    total_deleted: int = Field(description="The number of files deleted so far.")
+    total_errors: int = Field(description="The number of files that could not be deleted so far.")
+
+
+# copy and move (CRUD)
+class CopyFileRequest(BaseModel):
+    """Request model for `POST /v1/files/:file_path/copy` and `POST /v1/files/:file_path/move`."""
+
+    destination: str = Field(
+        min_length=1,
+        description="The path to copy the file to. An existing file there is overwritten.",
+        json_schema_extra={"example": "path/to/copy-of-pyproject.toml"},
+    )
+
+
+class CopyFilesRequest(BaseModel):
+    """Request model for `POST /v1/bulk/copy` and `POST /v1/bulk/move`."""
+
+    source_directory: str = Field(
+        min_length=1,
+        description="The directory whose files, including those of its sub-directories, are copied.",
+        json_schema_extra={"example": "path/to/"},
+    )
+    destination_directory: str = Field(
+        min_length=1,
+        description="The directory to copy the files to, keeping their paths relative to `source_directory`.",
+        json_schema_extra={"example": "path/to/backup/"},
+    )
+
+    @model_validator(mode="after")
+    def check_destination_is_outside_source(self) -> Self:
+        # both are directories, so "a" is not a prefix of "ab/"
+        self.source_directory = self.source_directory.rstrip("/") + "/"
+        self.destination_directory = self.destination_directory.rstrip("/") + "/"
+        if self.destination_directory.startswith(self.source_directory):
+            raise ValueError("destination_directory must not be source_directory or one of its sub-directories")
+        return self
+
+
+class CopiedFile(BaseModel):
+    """A file that was copied or moved."""
+
+    source: str = Field(description="The path the file was copied from.")
+    destination: str = Field(description="The path the file was copied to.")
+
+
+class CopyFilesProgress(BaseModel):
+    """One line of the newline-delimited JSON response of `POST /v1/bulk/copy` and `POST /v1/bulk/move`."""
+
+    copied: List[CopiedFile] = Field(description="The files copied, or moved, in this batch.")
+    errors: List[FileError] = Field(description="The files of this batch that could not be copied or moved.")
+    total_copied: int = Field(description="The number of files copied, or moved, so far.")
+    total_errors: int = Field(description="The number of files that could not be copied or moved so far.")
+
+
+# presigned URLs
+class CreatePresignedDownloadUrlRequest(BaseModel):
+    """Request model for `POST /v1/presigned-urls/download`."""
+
+    file_path: str = Field(min_length=1, description="The path of the file to download.")
+    expires_in_seconds: Optional[int] = Field(
+        None, ge=1, description="How long the URL is valid for. Defaults to the server's configured expiry."
+    )
+
+
+class CreatePresignedUploadUrlRequest(BaseModel):
+    """Request model for `POST /v1/presigned-urls/upload`."""
+
+    file_path: str = Field(min_length=1, description="The path to upload the file to.")
+    content_type: Optional[str] = Field(
+        None, description="If set, the upload must send this `Content-Type`, which is stored as the file's."
+    )
+    content_length: Optional[int] = Field(None, ge=0, description="If set, the upload must be exactly this many bytes.")
+    expires_in_seconds: Optional[int] = Field(
+        None, ge=1, description="How long the URL is valid for. Defaults to the server's configured expiry."
+    )
+
+
+class PresignedUrlResponse(BaseModel):
+    """A URL that transfers a file to or from S3 directly, without going through this API."""
+
+    url: str = Field(description="The presigned URL.")
+    method: str = Field(description="The HTTP method to use with the URL.")
+    headers: Dict[str, str] = Field(
+        default_factory=dict, description="Headers the request to the URL must send, with these exact values."
+    )
+    expires_at: datetime = Field(description="When the URL stops working.")
+
+
+class CreatePresignedMultipartUploadRequest(BaseModel):
+    """Request model for `POST /v1/presigned-urls/multipart-upload`."""
+
+    file_path: str = Field(min_length=1, description="The path to upload the file to.")
+    content_type: Optional[str] = Field(None, description="The MIME type the file is stored with.")
+    part_count: int = Field(
+        ge=1,
+        le=10000,
+        description="The number of parts. Every part but the last must be at least 5 MiB, and at most 5 GiB.",
+    )
+    expires_in_seconds: Optional[int] = Field(
+        None, ge=1, description="How long the URLs are valid for. Defaults to the server's configured expiry."
+    )
+
+
+class PresignedUploadPart(BaseModel):
+    """Where to upload one part of a multipart upload."""
+
+    part_number: int = Field(description="The 1-based position of the part within the file.")
+    url: str = Field(description="The presigned URL to PUT the part's bytes to.")
+
+
+class PresignedMultipartUploadResponse(BaseModel):
+    """Response model for `POST /v1/presigned-urls/multipart-upload`.
+
+    PUT each part to its URL, keeping the `ETag` header of each response, then complete the upload
+    with `POST /v1/multipart-uploads/:upload_id/complete`, or abort it with `DELETE /v1/multipart-uploads/:upload_id`.
+    """
+
+    upload_id: str = Field(description="The ID of the multipart upload.")
+    file_path: str = Field(description="The path the file is uploaded to.")
+    parts: List[PresignedUploadPart] = Field(description="Where to upload each part.")
+    expires_at: datetime = Field(description="When the part URLs stop working.")
+
+
+class CompletedUploadPart(BaseModel):
+    """A part uploaded to its presigned URL."""
+
+    part_number: int = Field(ge=1, le=10000, description="The 1-based position of the part within the file.")
+    etag: str = Field(description="The `ETag` header of the response to the part's upload.")
+
+
+class CompleteMultipartUploadRequest(BaseModel):
+    """Request model for `POST /v1/multipart-uploads/:upload_id/complete`."""
+
+    file_path: str = Field(min_length=1, description="The path the file is uploaded to.")
+    parts: List[CompletedUploadPart] = Field(min_length=1, description="Every uploaded part, in any order.")
+
+
+# cache statistics
+class ObjectCacheStatsResponse(BaseModel):
+    """Response model for `GET /v1/object-cache/stats`."""
+
+    enabled: bool = Field(description="Whether this worker has an in-memory object cache.")
+    hits: int = Field(0, description="Reads served from memory, including revalidated ones.")
+    misses: int = Field(0, description="Reads that downloaded the file from S3.")
+    revalidations: int = Field(0, description="Expired entries that S3 confirmed were unchanged.")
+    evictions: int = Field(0, description="Entries dropped to make room for others.")
+    invalidations: int = Field(0, description="Entries dropped because the file was written or deleted.")
+    entries: int = Field(0, description="Number of files currently cached.")
+    size_bytes: int = Field(0, description="Total size of the files currently cached.")
+    max_size_bytes: int = Field(0, description="Maximum total size of the cached files.")
+
+
+class DiskCacheStatsResponse(BaseModel):
+    """Response model for `GET /v1/disk-cache/stats`."""
+
+    enabled: bool = Field(description="Whether this worker has a disk cache.")
+    hits: int = Field(0, description="Reads served from disk, including revalidated ones.")
+    misses: int = Field(0, description="Reads that downloaded the file from S3.")
+    revalidations: int = Field(0, description="Expired entries that S3 confirmed were unchanged.")
+    fills: int = Field(0, description="Files written to disk while they were downloaded.")
+    abandoned_fills: int = Field(0, description="Files whose download stopped before they were fully written.")
+    evictions: int = Field(0, description="Entries deleted to make room for others.")
+    invalidations: int = Field(0, description="Entries deleted because the file was written or deleted.")
+    entries: int = Field(0, description="Number of files currently cached.")
+    size_bytes: int = Field(0, description="Total size of the files currently cached.")
+    max_size_bytes: int = Field(0, description="Maximum total size of the cached files.")
+
+
+class ReadCoalescingStatsResponse(BaseModel):
+    """Response model for `GET /v1/read-coalescing/stats`."""
+
+    enabled: bool = Field(description="Whether this worker coalesces concurrent, identical reads.")
+    calls: int = Field(0, description="S3 calls made by reads that went through the coalescer.")
+    coalesced: int = Field(0, description="Reads answered by another read's in-flight S3 call instead of their own.")
+    unshared_bodies: int = Field(
+        0, description="Reads that waited for another read's download, but had to make their own as it was too large."
+    )
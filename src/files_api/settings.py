@@ -1,3 +1,8 @@
+from typing import (
+    Literal,
+    Optional,
+)
+
 from pydantic import (
     BaseModel,
     Field,
@@ -7,13 +12,307 @@ from pydantic_settings import (
     SettingsConfigDict,
 )
 
+from files_api.compression import DEFAULT_COMPRESSIBLE_CONTENT_TYPES
+from files_api.s3.presigned_urls import MAX_PRESIGNED_URL_EXPIRY_SECONDS
+
 
 class Settings(BaseSettings):
     """Settings for the files API.
-    
+
     Pydantic BaseSettings docs: https://docs.pydantic.dev/latest/concepts/pydantic_settings/#usage
     FastAPI guide to managing settings: https://fastapi.tiangolo.com/advanced/settings/
     """
     s3_bucket_name: str = Field(...)
-    
-    model_config = SettingsConfigDict(case_sensitive=False)
\ No newline at end of file
+
+    # --- shared S3 client --- #
+    s3_max_pool_connections: int = Field(
+        default=50,
+        ge=1,
+        description="Maximum number of pooled HTTP connections held by the app's shared S3 client.",
+    )
+    s3_tcp_keepalive: bool = Field(
+        default=True,
+        description="Whether to enable TCP keep-alive on the S3 client's pooled connections.",
+    )
+    s3_max_retry_attempts: int = Field(
+        default=3,
+        ge=1,
+        description="Maximum number of attempts for a single S3 call, including the initial attempt.",
+    )
+    s3_retry_mode: Literal["legacy", "standard", "adaptive"] = Field(
+        default="standard",
+        description="botocore retry mode used by the shared S3 client.",
+    )
+
+    # --- S3 call concurrency --- #
+    s3_io_mode: Literal["threadpool", "blocking"] = Field(
+        default="threadpool",
+        description=(
+            "How route handlers call the synchronous boto3 helpers. 'threadpool' offloads them to worker threads "
+            "so the event loop keeps serving other requests; 'blocking' calls them inline on the event loop."
+        ),
+    )
+    s3_max_concurrency: int = Field(
+        default=50,
+        ge=1,
+        description="Maximum number of S3 calls in flight at once per worker when s3_io_mode is 'threadpool'.",
+    )
+
+    # --- S3 round-trips per request --- #
+    upload_use_conditional_put: bool = Field(
+        default=False,
+        description=(
+            "Skip the head_object existence check in PUT /v1/files. New files are written with a single "
+            "put_object conditioned on If-None-Match: *; only overwrites of existing files need a second put_object."
+        ),
+    )
+    delete_missing_file_returns_404: bool = Field(
+        default=True,
+        description=(
+            "Whether DELETE /v1/files returns 404 for files that do not exist. S3 deletes succeed for missing keys, "
+            "so this costs a head_object per delete; when False, DELETE is a single delete_object and always 204."
+        ),
+    )
+
+    # --- streaming uploads --- #
+    upload_part_size_bytes: int = Field(
+        default=8 * 1024 * 1024,
+        ge=5 * 1024 * 1024,
+        description="Size of each S3 multipart upload part used by streaming uploads. S3 requires at least 5 MiB.",
+    )
+    upload_max_concurrent_parts: int = Field(
+        default=4,
+        ge=1,
+        description=(
+            "Maximum number of parts of a single streaming upload sent to S3 concurrently. "
+            "Peak memory per upload is roughly upload_part_size_bytes * (upload_max_concurrent_parts + 1)."
+        ),
+    )
+
+    # --- streaming downloads --- #
+    download_chunk_size_bytes: int = Field(
+        default=1024 * 1024,
+        ge=64 * 1024,
+        le=8 * 1024 * 1024,
+        description=(
+            "Size of the chunks GET /v1/files reads from S3 and sends to the client. One chunk is read ahead "
+            "while the previous one is sent, so each download holds up to two chunks in memory."
+        ),
+    )
+
+    # --- read coalescing --- #
+    read_coalescing: bool = Field(
+        default=False,
+        description=(
+            "Whether concurrent, identical reads of a file's content or metadata, or of a listing page, share "
+            "one in-flight S3 call per worker instead of each making their own, e.g. when many clients fetch "
+            "the same file at once."
+        ),
+    )
+    read_coalescing_max_shared_body_size_bytes: int = Field(
+        default=1024 * 1024,
+        ge=0,
+        description=(
+            "Largest file whose content is buffered in memory to share among coalesced reads. Concurrent reads "
+            "of larger files still wait for the same get_object call, then download the file separately."
+        ),
+    )
+
+    # --- in-memory object cache --- #
+    object_cache_max_size_bytes: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Total size of the small files each worker keeps in memory to serve GET /v1/files without "
+            "downloading them again. 0 disables the cache."
+        ),
+    )
+    object_cache_max_object_size_bytes: int = Field(
+        default=256 * 1024,
+        ge=1,
+        description="Files larger than this are never kept in the in-memory object cache.",
+    )
+    object_cache_ttl_seconds: float = Field(
+        default=30.0,
+        ge=0,
+        description=(
+            "How long a cached file is served without contacting S3. Older entries are revalidated with a "
+            "conditional get_object on their ETag, which skips the download when the file has not changed."
+        ),
+    )
+
+    # --- disk cache --- #
+    disk_cache_directory: Optional[str] = Field(
+        default=None,
+        description=(
+            "Directory where each worker keeps copies of the files GET /v1/files downloads, to serve them "
+            "from local disk afterwards. Each worker uses a subdirectory of its own, deleted on shutdown. "
+            "None disables the disk cache."
+        ),
+    )
+    disk_cache_max_size_bytes: int = Field(
+        default=10 * 1024 * 1024 * 1024,
+        ge=1,
+        description="Total size of the files each worker keeps in the disk cache; the least recently read go first.",
+    )
+    disk_cache_max_object_size_bytes: int = Field(
+        default=100 * 1024 * 1024,
+        ge=1,
+        description="Files larger than this are never kept in the disk cache.",
+    )
+    disk_cache_ttl_seconds: float = Field(
+        default=30.0,
+        ge=0,
+        description=(
+            "How long a file in the disk cache is served without contacting S3. Older entries are revalidated "
+            "with a conditional head_object on their ETag."
+        ),
+    )
+
+    # --- listing cache --- #
+    listing_cache_ttl_seconds: float = Field(
+        default=0.0,
+        ge=0,
+        description=(
+            "How long each worker serves a page of GET /v1/files from memory. Writes through the same worker "
+            "invalidate affected pages immediately; writes through other workers show up after this long. "
+            "0 disables the listing cache."
+        ),
+    )
+    listing_cache_max_entries: int = Field(
+        default=1000,
+        ge=1,
+        description="Maximum number of listing pages each worker keeps in memory.",
+    )
+    listing_prefetch_next_page: bool = Field(
+        default=True,
+        description=(
+            "Whether to list the next page in the background whenever GET /v1/files returns a next_page_token, "
+            "so following it is served from the listing cache. Only applies when the listing cache is enabled."
+        ),
+    )
+
+    # --- full listings --- #
+    listing_max_concurrent_shards: int = Field(
+        default=8,
+        ge=1,
+        description=(
+            "Maximum number of sub-directories GET /v1/listings lists from S3 concurrently, each at most "
+            "a page of 1000 keys ahead of the response. 1 lists the directory sequentially, one page at a time."
+        ),
+    )
+
+    # --- compression --- #
+    upload_compression: Optional[Literal["gzip", "zstd"]] = Field(
+        default=None,
+        description=(
+            "Compress uploaded files of upload_compression_content_types with this encoding before storing them, "
+            "and record it as their Content-Encoding. Clients whose Accept-Encoding allows it are sent the stored "
+            "bytes as-is; others get them decompressed on the fly. 'zstd' requires the zstandard package. "
+            "Off by default."
+        ),
+    )
+    upload_compression_level: Optional[int] = Field(
+        default=None,
+        description="Compression level, from 1 to 9 for gzip and up to 22 for zstd. Defaults to 6 for gzip, 3 for zstd.",
+    )
+    upload_compression_content_types: list[str] = Field(
+        default=list(DEFAULT_COMPRESSIBLE_CONTENT_TYPES),
+        description="Content types of the files to compress; 'text/*' matches any text type.",
+    )
+    upload_compression_min_size_bytes: int = Field(
+        default=1024,
+        ge=0,
+        description=(
+            "Files smaller than this are stored uncompressed. Files streamed to PUT /v1/uploads, whose size "
+            "is not known up front, are compressed whatever their size."
+        ),
+    )
+
+    # --- deduplication --- #
+    upload_deduplication: bool = Field(
+        default=False,
+        description=(
+            "Store files uploaded with PUT /v1/files and the bulk uploads once per distinct content: the content goes "
+            "to a blob named after its SHA-256 hash, and the file's path holds a small pointer to it. Re-uploading "
+            "content that is already stored sends none of its bytes to S3. Blobs are deleted with the last file "
+            "pointing to them, including by POST /v1/bulk/delete, which looks up each file it deletes first. "
+            "Presigned upload URLs are disabled, since files uploaded through them could not release their blobs."
+        ),
+    )
+    deduplication_blob_prefix: str = Field(
+        default=".blobs/",
+        pattern=r"^.+/$",
+        description="Prefix of the blobs of deduplicated files, which listings and archives leave out.",
+    )
+
+    # --- archive downloads --- #
+    archive_max_concurrent_objects: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum number of files GET /v1/archives fetches from S3 ahead of the archive being written.",
+    )
+    archive_prefetch_max_object_size_bytes: int = Field(
+        default=1024 * 1024,
+        ge=0,
+        description=(
+            "Files up to this size are read in full while they wait to be added to an archive; larger ones are "
+            "streamed once their turn comes. Peak memory per archive download is roughly this times "
+            "archive_max_concurrent_objects."
+        ),
+    )
+
+    # --- presigned URLs --- #
+    presigned_url_expiry_seconds: int = Field(
+        default=15 * 60,
+        ge=1,
+        le=MAX_PRESIGNED_URL_EXPIRY_SECONDS,
+        description="How long presigned URLs are valid for, unless the request asks for a different expiry.",
+    )
+    presigned_url_max_expiry_seconds: int = Field(
+        default=12 * 60 * 60,
+        ge=1,
+        le=MAX_PRESIGNED_URL_EXPIRY_SECONDS,
+        description=(
+            "The longest expiry a client may ask presigned URLs to be valid for. URLs signed with temporary "
+            "credentials, e.g. of an IAM role, stop working when the credentials expire, whichever comes first."
+        ),
+    )
+
+    # --- bulk operations --- #
+    bulk_metadata_max_concurrent_lookups: int = Field(
+        default=32,
+        ge=1,
+        description="Maximum number of head_object calls in flight per batch metadata lookup.",
+    )
+    bulk_upload_max_concurrent_uploads: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum number of files of a single batch upload sent to S3 concurrently.",
+    )
+    bulk_copy_max_concurrent_copies: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum number of files copied concurrently by POST /v1/bulk/copy and POST /v1/bulk/move.",
+    )
+    bulk_copy_max_concurrent_parts: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of parts copied concurrently per file larger than 5 GB, which S3 copies in parts.",
+    )
+    bulk_delete_max_concurrent_batches: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of delete_objects calls, of up to 1000 keys each, in flight per bulk delete.",
+    )
+
+    # --- metrics --- #
+    metrics_enabled: bool = Field(
+        default=True,
+        description=(
+            "Whether to record request and S3 call metrics, and expose them with the cache counters in the "
+            "Prometheus text format at GET /metrics. Each worker has its own metrics."
+        ),
+    )
+
+    model_config = SettingsConfigDict(case_sensitive=False)
@@ -1,5 +1,7 @@
 import sys
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Callable
 
 import pytest
 from fastapi.testclient import TestClient
@@ -19,3 +21,14 @@ def client(mocked_aws) -> TestClient:  # pylint: disable=unused-argument
     with TestClient(app) as client:
         yield client
 
+
+# Fixture for building test clients whose app uses non-default settings
+@pytest.fixture
+def make_client(mocked_aws) -> Callable[..., TestClient]:  # pylint: disable=unused-argument
+    with ExitStack() as stack:
+
+        def _make_client(**settings_overrides) -> TestClient:
+            settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, **settings_overrides)
+            return stack.enter_context(TestClient(create_app(settings=settings)))
+
+        yield _make_client
@@ -0,0 +1,124 @@
+"""Test cases for `s3.bulk`."""
+
+import anyio
+import boto3
+from botocore.exceptions import ParamValidationError
+
+from files_api.s3.bulk import (
+    ObjectToUpload,
+    UploadResult,
+    copy_s3_object_of_any_size,
+    copy_s3_objects_in_batches,
+    fetch_s3_objects_metadata_concurrently,
+    upload_s3_objects_concurrently,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.streaming import MIN_MULTIPART_PART_SIZE_BYTES
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+
+async def as_async_iterable(objects: list[ObjectToUpload]):
+    for obj in objects:
+        yield obj
+
+
+def test_upload_s3_objects_concurrently_reports_each_object_in_order(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="existing.txt", Body=b"old")
+    objects = [ObjectToUpload(f"new_{i}.txt", b"new", "text/plain") for i in range(5)]
+    objects += [ObjectToUpload("", b"empty key"), ObjectToUpload("existing.txt", b"new")]
+
+    results = anyio.run(
+        lambda: upload_s3_objects_concurrently(
+            s3=S3Executor(s3_client=s3_client),
+            bucket_name=TEST_BUCKET_NAME,
+            objects=as_async_iterable(objects),
+            max_concurrent_uploads=2,
+        )
+    )
+
+    assert results[:5] == [UploadResult(f"new_{i}.txt") for i in range(5)]
+    assert isinstance(results[5].error, ParamValidationError)
+    assert results[6] == UploadResult("existing.txt", already_existed=True)
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="new_0.txt")
+    assert response["Body"].read() == b"new"
+    assert response["ContentType"] == "text/plain"
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="existing.txt")["Body"].read() == b"new"
+
+
+def test_fetch_s3_objects_metadata_concurrently(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    for i in range(5):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"file_{i}.txt", Body=b"x" * i)
+
+    metadata = anyio.run(
+        lambda: fetch_s3_objects_metadata_concurrently(
+            s3=S3Executor(s3_client=s3_client),
+            bucket_name=TEST_BUCKET_NAME,
+            object_keys=["file_3.txt", "missing.txt", "file_0.txt"],
+            max_concurrent_lookups=2,
+        )
+    )
+
+    assert [obj.content_length if obj else None for obj in metadata] == [3, None, 0]
+
+
+def test_large_object_is_copied_in_parts(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    content = bytes(range(256)) * (11 * 1024 * 1024 // 256)
+    s3_client.put_object(
+        Bucket=TEST_BUCKET_NAME, Key="big.bin", Body=content, ContentType="video/mp4", Metadata={"owner": "me"}
+    )
+
+    with count_s3_calls(s3_client) as s3_calls:
+        anyio.run(
+            lambda: copy_s3_object_of_any_size(
+                s3=S3Executor(s3_client=s3_client),
+                bucket_name=TEST_BUCKET_NAME,
+                source_key="big.bin",
+                destination_key="copy/big.bin",
+                multipart_threshold=MIN_MULTIPART_PART_SIZE_BYTES,
+                part_size=MIN_MULTIPART_PART_SIZE_BYTES,
+            )
+        )
+
+    assert s3_calls == {
+        "HeadObject": 1,
+        "CreateMultipartUpload": 1,
+        "UploadPartCopy": 3,
+        "CompleteMultipartUpload": 1,
+    }
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="copy/big.bin")
+    assert response["Body"].read() == content
+    assert (response["ContentType"], response["Metadata"]) == ("video/mp4", {"owner": "me"})
+
+
+def test_objects_under_a_prefix_are_moved_in_batches(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    for i in range(5):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"from/file_{i}.txt", Body=b"%d" % i)
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="from-other/file.txt", Body=b"x")
+    results = []
+
+    async def on_batch_copied(result):
+        results.append(result)
+
+    anyio.run(
+        lambda: copy_s3_objects_in_batches(
+            s3=S3Executor(s3_client=s3_client),
+            bucket_name=TEST_BUCKET_NAME,
+            source_prefix="from/",
+            destination_prefix="to/nested/",
+            on_batch_copied=on_batch_copied,
+            delete_sources=True,
+            max_concurrent_copies=2,
+        )
+    )
+
+    (result,) = results
+    assert sorted(result.copied) == [(f"from/file_{i}.txt", f"to/nested/file_{i}.txt") for i in range(5)]
+    assert result.errors == []
+    keys = [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)["Contents"]]
+    assert keys == ["from-other/file.txt"] + [f"to/nested/file_{i}.txt" for i in range(5)]
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="to/nested/file_3.txt")["Body"].read() == b"3"
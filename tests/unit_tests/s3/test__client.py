@@ -0,0 +1,30 @@
+"""Test cases for `s3.client`."""
+
+from files_api.s3.client import create_s3_client
+from files_api.s3.read_objects import object_exists_in_s3
+from tests.consts import TEST_BUCKET_NAME
+
+
+# pylint: disable=unused-argument
+def test_create_s3_client_applies_connection_and_retry_config(mocked_aws: None):
+    s3_client = create_s3_client(
+        max_pool_connections=25,
+        tcp_keepalive=True,
+        max_retry_attempts=5,
+        retry_mode="adaptive",
+    )
+
+    config = s3_client.meta.config
+    assert config.max_pool_connections == 25
+    assert config.tcp_keepalive is True
+    assert config.retries == {"total_max_attempts": 5, "mode": "adaptive"}
+    assert config.signature_version == "s3v4"
+
+
+# pylint: disable=unused-argument
+def test_s3_client_is_reusable_across_calls(mocked_aws: None):
+    s3_client = create_s3_client()
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="testfile.txt", Body=b"test content!")
+
+    assert object_exists_in_s3(TEST_BUCKET_NAME, "testfile.txt", s3_client=s3_client) is True
+    assert object_exists_in_s3(TEST_BUCKET_NAME, "nonexistent.txt", s3_client=s3_client) is False
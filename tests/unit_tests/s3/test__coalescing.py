@@ -0,0 +1,124 @@
+"""Test cases for `s3.coalescing`."""
+
+import time
+
+import anyio
+import boto3
+import pytest
+
+from files_api.errors import ObjectNotFoundError
+from files_api.s3.coalescing import ReadCoalescer
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import fetch_s3_object
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+
+class SlowRead:
+    """A blocking read that takes a while, so concurrent calls overlap."""
+
+    def __init__(self, error: Exception = None):
+        self.calls = 0
+        self.error = error
+
+    def __call__(self, key: str, s3_client=None) -> str:
+        self.calls += 1
+        time.sleep(0.05)
+        if self.error is not None:
+            raise self.error
+        return f"value of {key}"
+
+
+def gather(coalescer: ReadCoalescer, s3: S3Executor, func, calls: list[dict]) -> list:
+    """Make the calls concurrently, returning their results or exceptions in order."""
+    results: list = [None] * len(calls)
+
+    async def call(index: int, kwargs: dict) -> None:
+        try:
+            results[index] = await coalescer.run(s3, func, **kwargs)
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            results[index] = err
+
+    async def main() -> None:
+        async with anyio.create_task_group() as task_group:
+            for index, kwargs in enumerate(calls):
+                task_group.start_soon(call, index, kwargs)
+
+    anyio.run(main)
+    return results
+
+
+def test_concurrent_identical_reads_share_one_call():
+    coalescer = ReadCoalescer(max_shared_body_size_bytes=1024)
+    read = SlowRead()
+
+    results = gather(coalescer, S3Executor(s3_client=None), read, [{"key": "a"}] * 5 + [{"key": "b"}])
+
+    assert results == ["value of a"] * 5 + ["value of b"]
+    assert read.calls == 2
+    assert (coalescer.stats.calls, coalescer.stats.coalesced) == (2, 4)
+
+    # the next read makes a new call
+    gather(coalescer, S3Executor(s3_client=None), read, [{"key": "a"}])
+    assert read.calls == 3
+
+
+def test_errors_are_shared():
+    coalescer = ReadCoalescer(max_shared_body_size_bytes=1024)
+    read = SlowRead(error=ObjectNotFoundError(TEST_BUCKET_NAME, "a"))
+
+    results = gather(coalescer, S3Executor(s3_client=None), read, [{"key": "a"}] * 3)
+
+    assert all(isinstance(result, ObjectNotFoundError) for result in results)
+    assert read.calls == 1
+
+
+def test_waiting_reads_make_the_call_again_if_it_is_interrupted():
+    coalescer = ReadCoalescer(max_shared_body_size_bytes=1024)
+    calls = []
+    results = []
+
+    async def call() -> str:
+        calls.append(None)
+        await anyio.sleep(0.05)
+        return "value"
+
+    async def main() -> None:
+        async def interrupted_read() -> None:
+            with anyio.move_on_after(0.01):
+                await coalescer._share("key", call)  # pylint: disable=protected-access
+
+        async def waiting_read() -> None:
+            results.append(await coalescer._share("key", call))  # pylint: disable=protected-access
+
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(interrupted_read)
+            task_group.start_soon(waiting_read)
+
+    anyio.run(main)
+
+    assert results == [("value", True)]
+    assert len(calls) == 2
+    assert coalescer.stats.coalesced == 0
+
+
+# pylint: disable=unused-argument
+@pytest.mark.parametrize(
+    "max_shared_body_size_bytes, expected_get_object_calls",
+    [(1024, 1), (4, 3)],
+    ids=["shared", "too-large-to-share"],
+)
+def test_get_object_bodies_are_shared_through_a_buffer(
+    mocked_aws: None, max_shared_body_size_bytes: int, expected_get_object_calls: int
+):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="manifest.json", Body=b'{"version": 2}')
+    coalescer = ReadCoalescer(max_shared_body_size_bytes=max_shared_body_size_bytes)
+    kwargs = {"bucket_name": TEST_BUCKET_NAME, "object_key": "manifest.json"}
+
+    with count_s3_calls(s3_client) as s3_calls:
+        responses = gather(coalescer, S3Executor(s3_client=s3_client), fetch_s3_object, [kwargs] * 3)
+
+    assert [response["Body"].read() for response in responses] == [b'{"version": 2}'] * 3
+    assert s3_calls == {"GetObject": expected_get_object_calls}
+    assert coalescer.stats.unshared_bodies == expected_get_object_calls - 1
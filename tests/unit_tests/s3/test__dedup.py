@@ -0,0 +1,194 @@
+"""Test cases for `s3.dedup`."""
+
+import hashlib
+import io
+from typing import (
+    BinaryIO,
+    Union,
+)
+
+import anyio
+import boto3
+import pytest
+
+from files_api.errors import ObjectNotFoundError
+from files_api.s3.bulk import iter_in_batches
+from files_api.s3.dedup import (
+    blob_key_of,
+    delete_deduplicated_s3_object,
+    delete_deduplicated_s3_objects_in_batches,
+    pointer_size,
+    resolve_listed_pointers,
+    transfer_blob_references,
+    upload_deduplicated_s3_object,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import (
+    fetch_s3_object,
+    fetch_s3_object_metadata,
+    fetch_s3_objects_page,
+)
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+CONTENT = b"build artifact" * 100
+BLOB_KEY = blob_key_of(hashlib.sha256(CONTENT).hexdigest())
+
+
+def upload(s3: S3Executor, object_key: str, content: Union[bytes, BinaryIO] = CONTENT) -> bool:
+    return anyio.run(
+        lambda: upload_deduplicated_s3_object(
+            s3=s3,
+            bucket_name=TEST_BUCKET_NAME,
+            object_key=object_key,
+            file_content=content,
+            content_type="application/octet-stream",
+        )
+    )
+
+
+def delete(s3: S3Executor, object_key: str) -> None:
+    anyio.run(lambda: delete_deduplicated_s3_object(s3=s3, bucket_name=TEST_BUCKET_NAME, object_key=object_key))
+
+
+def list_keys(s3_client) -> list[str]:
+    files, _, _ = fetch_s3_objects_page(TEST_BUCKET_NAME, s3_client=s3_client)
+    return [file["Key"] for file in files]
+
+
+# pylint: disable=unused-argument
+def test_identical_content_is_stored_once(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3 = S3Executor(s3_client=s3_client)
+
+    assert upload(s3, "builds/1/app.bin") is False
+    with count_s3_calls(s3_client) as s3_calls:
+        assert upload(s3, "builds/2/app.bin") is False
+    # the file and blob lookups, then the empty reference and the pointer: no content is sent
+    assert s3_calls == {"HeadObject": 2, "PutObject": 2}
+
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key=BLOB_KEY)["Body"].read() == CONTENT
+    for object_key in ("builds/1/app.bin", "builds/2/app.bin"):
+        pointer = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key=object_key)
+        assert pointer["ContentLength"] == pointer_size()
+        assert fetch_s3_object(TEST_BUCKET_NAME, object_key, s3_client=s3_client)["Body"].read() == CONTENT
+        assert fetch_s3_object_metadata(TEST_BUCKET_NAME, object_key, s3_client=s3_client).content_length == len(
+            CONTENT
+        )
+
+
+# pylint: disable=unused-argument
+def test_ranges_are_read_from_the_blob(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    upload(S3Executor(s3_client=s3_client), "app.bin")
+
+    # also beyond the end of the pointer itself
+    for first, last in [(0, 9), (1000, 1099)]:
+        response = fetch_s3_object(
+            TEST_BUCKET_NAME, "app.bin", byte_range=f"bytes={first}-{last}", s3_client=s3_client
+        )
+        assert response["Body"].read() == CONTENT[first : last + 1]
+        assert response["ContentRange"] == f"bytes {first}-{last}/{len(CONTENT)}"
+
+
+# pylint: disable=unused-argument
+def test_blob_is_deleted_with_its_last_pointer(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3 = S3Executor(s3_client=s3_client)
+    upload(s3, "a.bin")
+    upload(s3, "b.bin")
+
+    delete(s3, "a.bin")
+    assert BLOB_KEY in list_keys(s3_client)
+    delete(s3, "b.bin")
+
+    assert list_keys(s3_client) == []
+    with pytest.raises(ObjectNotFoundError):
+        delete(s3, "b.bin")
+
+
+# pylint: disable=unused-argument
+def test_overwriting_a_file_releases_its_previous_blob(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3 = S3Executor(s3_client=s3_client)
+    upload(s3, "app.bin")
+
+    assert upload(s3, "app.bin", b"new content") is True
+
+    assert BLOB_KEY not in list_keys(s3_client)
+    assert fetch_s3_object(TEST_BUCKET_NAME, "app.bin", s3_client=s3_client)["Body"].read() == b"new content"
+
+
+# pylint: disable=unused-argument
+def test_file_objects_are_only_read_in_full_if_their_content_is_new(mocked_aws: None):
+    s3 = S3Executor(s3_client=boto3.client("s3"))
+    upload(s3, "a.bin")
+
+    class UnreadableFile(io.BytesIO):
+        def read(self, size: int = -1) -> bytes:
+            assert size > 0, "the file was read in full"
+            return super().read(size)
+
+    assert upload(s3, "b.bin", UnreadableFile(CONTENT)) is False
+    with pytest.raises(AssertionError, match="in full"):
+        upload(s3, "c.bin", UnreadableFile(b"new content"))
+    assert upload(s3, "c.bin", io.BytesIO(b"new content")) is False
+    assert fetch_s3_object(TEST_BUCKET_NAME, "c.bin", s3_client=s3.s3_client)["Body"].read() == b"new content"
+
+
+# pylint: disable=unused-argument
+def test_deleting_pointers_in_batches_releases_their_blobs(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3 = S3Executor(s3_client=s3_client)
+    upload(s3, "a.bin")
+    upload(s3, "b.bin")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="plain.txt", Body=b"not a pointer")
+    deleted: list[str] = []
+
+    async def on_batch_deleted(result) -> None:
+        deleted.extend(result.deleted)
+
+    anyio.run(
+        lambda: delete_deduplicated_s3_objects_in_batches(
+            s3=s3,
+            bucket_name=TEST_BUCKET_NAME,
+            batches=iter_in_batches(["a.bin", "b.bin", "plain.txt"], batch_size=2),
+            on_batch_deleted=on_batch_deleted,
+        )
+    )
+
+    assert sorted(deleted) == ["a.bin", "b.bin", "plain.txt"]
+    assert list_keys(s3_client) == []
+
+
+# pylint: disable=unused-argument
+def test_copied_pointers_reference_their_blob(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3 = S3Executor(s3_client=s3_client)
+    upload(s3, "a.bin")
+    s3_client.copy_object(
+        Bucket=TEST_BUCKET_NAME, Key="b.bin", CopySource={"Bucket": TEST_BUCKET_NAME, "Key": "a.bin"}
+    )
+
+    anyio.run(
+        lambda: transfer_blob_references(
+            s3=s3, bucket_name=TEST_BUCKET_NAME, copied=[("a.bin", "b.bin")], release_sources=False
+        )
+    )
+    delete(s3, "a.bin")
+
+    assert fetch_s3_object(TEST_BUCKET_NAME, "b.bin", s3_client=s3_client)["Body"].read() == CONTENT
+
+
+# pylint: disable=unused-argument
+def test_listings_give_pointers_the_size_of_their_blob(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3 = S3Executor(s3_client=s3_client)
+    upload(s3, "app.bin")
+    # a file that is not a pointer, but happens to have the size of one
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="other.bin", Body=b"x" * pointer_size())
+    files, _, _ = fetch_s3_objects_page(TEST_BUCKET_NAME, s3_client=s3_client)
+
+    files = anyio.run(lambda: resolve_listed_pointers(s3=s3, bucket_name=TEST_BUCKET_NAME, files=files))
+
+    assert {file["Key"]: file["Size"] for file in files} == {"app.bin": len(CONTENT), "other.bin": pointer_size()}
@@ -1,8 +1,13 @@
 """Test cases for `s3.delete_objects`."""
 
 import boto3
+import pytest
 
-from files_api.s3.delete_objects import delete_s3_object
+from files_api.s3.delete_objects import (
+    MAX_KEYS_PER_DELETE_OBJECTS,
+    delete_s3_object,
+    delete_s3_objects,
+)
 from files_api.s3.read_objects import object_exists_in_s3
 from files_api.s3.write_objects import upload_s3_object
 from tests.consts import TEST_BUCKET_NAME
@@ -37,3 +42,22 @@ def test_delete_nonexistent_s3_object(mocked_aws: None):
     delete_s3_object(TEST_BUCKET_NAME, object)
     # Check that the object does not exist before deletion
     assert object_exists_in_s3(TEST_BUCKET_NAME, object) is False
+
+
+def test_delete_many_s3_objects(mocked_aws: None):
+    object_keys = [f"batch/file_{i}.txt" for i in range(5)]
+    for object_key in object_keys:
+        upload_s3_object(TEST_BUCKET_NAME, object_key, b"Hello, world!")
+
+    # keys that do not exist count as deleted
+    errors = delete_s3_objects(TEST_BUCKET_NAME, object_keys[:3] + ["batch/missing.txt"])
+
+    assert errors == []
+    remaining_keys = [object_key for object_key in object_keys if object_exists_in_s3(TEST_BUCKET_NAME, object_key)]
+    assert remaining_keys == object_keys[3:]
+
+
+def test_delete_s3_objects_rejects_more_keys_than_one_request_allows(mocked_aws: None):
+    assert delete_s3_objects(TEST_BUCKET_NAME, []) == []
+    with pytest.raises(ValueError):
+        delete_s3_objects(TEST_BUCKET_NAME, [f"file_{i}" for i in range(MAX_KEYS_PER_DELETE_OBJECTS + 1)])
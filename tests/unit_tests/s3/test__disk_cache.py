@@ -0,0 +1,160 @@
+"""Test cases for `s3.disk_cache`."""
+
+import os
+
+import anyio
+import boto3
+import pytest
+
+from files_api.errors import ObjectNotFoundError
+from files_api.s3.disk_cache import DiskCache
+from files_api.s3.executor import S3Executor
+from files_api.s3.streaming import read_s3_object_body
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def download(cache: DiskCache, s3_client, object_key: str, chunk_size: int = 4) -> bytes:
+    """Download an object like `GET /v1/files` does, filling the cache as its body is streamed."""
+
+    async def main() -> bytes:
+        s3 = S3Executor(s3_client=s3_client)
+        response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key=object_key)
+        sink = cache.start_fill(TEST_BUCKET_NAME, object_key, response)
+        chunks_to_send, chunks = anyio.create_memory_object_stream[bytes]()
+        received = bytearray()
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(read_s3_object_body, s3, response["Body"], chunks_to_send, chunk_size, None, sink)
+            async with chunks:
+                async for chunk in chunks:
+                    received += chunk
+        return bytes(received)
+
+    return anyio.run(main)
+
+
+def lookup(cache: DiskCache, s3_client, object_key: str):
+    return anyio.run(lambda: cache.lookup(S3Executor(s3_client=s3_client), TEST_BUCKET_NAME, object_key))
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+# pylint: disable=unused-argument
+def test_downloads_fill_the_cache(mocked_aws: None, tmp_path):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="data.bin", Body=b"0123456789", ContentType="text/plain")
+    cache = DiskCache(directory=str(tmp_path), max_size_bytes=1024, max_object_size_bytes=1024, ttl_seconds=30)
+
+    assert lookup(cache, s3_client, "data.bin") is None
+    assert download(cache, s3_client, "data.bin") == b"0123456789"
+
+    with count_s3_calls(s3_client) as s3_calls:
+        entry = lookup(cache, s3_client, "data.bin")
+    assert s3_calls == {}
+    assert read(entry.path) == b"0123456789"
+    assert (entry.size, entry.content_type) == (10, "text/plain")
+    assert entry.etag == s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="data.bin")["ETag"]
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.fills) == (1, 1, 1)
+    assert cache.size_bytes == 10
+    cache.release(entry)
+
+    # already cached, so not written again
+    download(cache, s3_client, "data.bin")
+    assert cache.stats.fills == 1
+
+    cache.close()
+    assert not os.path.exists(cache.directory)
+
+
+# pylint: disable=unused-argument
+def test_expired_entries_are_revalidated_by_etag(mocked_aws: None, tmp_path):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="data.bin", Body=b"v1")
+    clock = FakeClock()
+    cache = DiskCache(str(tmp_path), max_size_bytes=1024, max_object_size_bytes=1024, ttl_seconds=30, clock=clock)
+    download(cache, s3_client, "data.bin")
+
+    clock.now = 31
+    with count_s3_calls(s3_client) as s3_calls:
+        entry = lookup(cache, s3_client, "data.bin")
+    assert s3_calls == {"HeadObject": 1}
+    assert read(entry.path) == b"v1"
+    assert cache.stats.revalidations == 1
+    cache.release(entry)
+
+    # changed in S3, e.g. through another worker
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="data.bin", Body=b"v2")
+    clock.now = 100
+    assert lookup(cache, s3_client, "data.bin") is None
+    assert not os.path.exists(entry.path)
+    assert len(cache) == 0
+
+    download(cache, s3_client, "data.bin")
+    s3_client.delete_object(Bucket=TEST_BUCKET_NAME, Key="data.bin")
+    clock.now = 200
+    with pytest.raises(ObjectNotFoundError):
+        lookup(cache, s3_client, "data.bin")
+    assert len(cache) == 0
+
+
+# pylint: disable=unused-argument
+def test_large_objects_and_incomplete_downloads_are_not_cached(mocked_aws: None, tmp_path):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="large.bin", Body=b"x" * 100)
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="small.bin", Body=b"x" * 10)
+    cache = DiskCache(str(tmp_path), max_size_bytes=1024, max_object_size_bytes=50, ttl_seconds=30)
+
+    large_response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="large.bin")
+    assert cache.start_fill(TEST_BUCKET_NAME, "large.bin", large_response) is None
+    large_response["Body"].close()
+
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="small.bin")
+    sink = cache.start_fill(TEST_BUCKET_NAME, "small.bin", response)
+    # only one download of an object fills the cache at a time
+    assert cache.start_fill(TEST_BUCKET_NAME, "small.bin", response) is None
+    sink.write(response["Body"].read(4))
+    sink.discard()
+
+    assert len(cache) == 0
+    assert cache.stats.abandoned_fills == 1
+    assert os.listdir(cache.directory) == []
+
+
+# pylint: disable=unused-argument
+def test_least_recently_used_entries_are_evicted_once_released(mocked_aws: None, tmp_path):
+    s3_client = boto3.client("s3")
+    for key in "abc":
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=key.encode() * 10)
+    cache = DiskCache(str(tmp_path), max_size_bytes=25, max_object_size_bytes=10, ttl_seconds=30)
+
+    download(cache, s3_client, "a")
+    download(cache, s3_client, "b")
+    entry_a = lookup(cache, s3_client, "a")  # "a" is now most recent
+    entry_b = lookup(cache, s3_client, "b")
+    cache.release(entry_a)
+    lookup_a = lookup(cache, s3_client, "a")
+    cache.release(lookup_a)
+    download(cache, s3_client, "c")
+
+    assert cache.stats.evictions == 1
+    assert cache.size_bytes == 20
+    assert [key for _, key in cache._entries] == ["a", "c"]  # pylint: disable=protected-access
+    # "b" is still being read, so its file is kept until it is released
+    assert read(entry_b.path) == b"b" * 10
+    cache.release(entry_b)
+    assert not os.path.exists(entry_b.path)
+
+    cache.invalidate(TEST_BUCKET_NAME, "a")
+    assert cache.size_bytes == 10
+    assert cache.stats.invalidations == 1
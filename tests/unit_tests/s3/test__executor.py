@@ -0,0 +1,71 @@
+"""Test cases for `s3.executor`."""
+
+import threading
+import time
+
+import anyio
+import boto3
+
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import object_exists_in_s3
+from tests.consts import TEST_BUCKET_NAME
+
+
+def test_threadpool_mode_does_not_run_on_the_event_loop_thread():
+    executor = S3Executor(s3_client="shared-client", io_mode="threadpool")
+
+    def which_thread(s3_client):
+        return s3_client, threading.get_ident()
+
+    async def main():
+        return threading.get_ident(), await executor.run(which_thread)
+
+    event_loop_thread, (s3_client, worker_thread) = anyio.run(main)
+    assert s3_client == "shared-client"
+    assert worker_thread != event_loop_thread
+
+
+def test_blocking_mode_runs_inline():
+    executor = S3Executor(s3_client="shared-client", io_mode="blocking")
+
+    async def main():
+        return threading.get_ident(), await executor.run(lambda s3_client: threading.get_ident())
+
+    event_loop_thread, call_thread = anyio.run(main)
+    assert call_thread == event_loop_thread
+
+
+def test_max_concurrency_bounds_calls_in_flight():
+    executor = S3Executor(s3_client=None, io_mode="threadpool", max_concurrency=3)
+    lock = threading.Lock()
+    in_flight = 0
+    peak_in_flight = 0
+
+    def slow_s3_call(s3_client):  # pylint: disable=unused-argument
+        nonlocal in_flight, peak_in_flight
+        with lock:
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+
+    async def main():
+        async with anyio.create_task_group() as task_group:
+            for _ in range(10):
+                task_group.start_soon(executor.run, slow_s3_call)
+
+    anyio.run(main)
+    assert peak_in_flight == 3
+
+
+# pylint: disable=unused-argument
+def test_run_passes_the_shared_client_to_s3_helpers(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="testfile.txt", Body=b"test content!")
+    executor = S3Executor(s3_client=s3_client)
+
+    async def main():
+        return await executor.run(object_exists_in_s3, bucket_name=TEST_BUCKET_NAME, object_key="testfile.txt")
+
+    assert anyio.run(main) is True
@@ -0,0 +1,152 @@
+"""Test cases for `s3.listing_cache`."""
+
+import anyio
+import boto3
+
+from files_api.s3.executor import S3Executor
+from files_api.s3.listing_cache import ListingCache
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def list_page(cache: ListingCache, s3_client, prefix: str = "", page_token=None, page_size: int = 2, delimiter=None):
+    return anyio.run(
+        lambda: cache.fetch(
+            S3Executor(s3_client=s3_client), TEST_BUCKET_NAME, prefix, page_token, page_size, delimiter
+        )
+    )
+
+
+def prefetch(cache: ListingCache, s3_client, page_token: str, prefix: str = "", page_size: int = 2, delimiter=None):
+    anyio.run(
+        lambda: cache.prefetch(
+            S3Executor(s3_client=s3_client), TEST_BUCKET_NAME, prefix, page_token, page_size, delimiter
+        )
+    )
+
+
+def put_files(s3_client, *keys: str) -> None:
+    for key in keys:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=b"content")
+
+
+# pylint: disable=unused-argument
+def test_pages_are_served_from_the_cache_until_they_expire(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    put_files(s3_client, "a/1.txt", "a/2.txt", "a/3.txt")
+    clock = FakeClock()
+    cache = ListingCache(ttl_seconds=5, max_entries=10, clock=clock)
+
+    page = list_page(cache, s3_client, prefix="a/")
+    with count_s3_calls(s3_client) as s3_calls:
+        assert list_page(cache, s3_client, prefix="a/") == page
+    assert s3_calls == {}
+
+    clock.now = 5
+    with count_s3_calls(s3_client) as s3_calls:
+        list_page(cache, s3_client, prefix="a/")
+    assert s3_calls == {"ListObjectsV2": 1}
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+# pylint: disable=unused-argument
+def test_prefetched_next_page_is_served_from_the_cache(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    put_files(s3_client, "a/1.txt", "a/2.txt", "a/3.txt")
+    cache = ListingCache(ttl_seconds=5, max_entries=10)
+
+    _, _, next_page_token = list_page(cache, s3_client, prefix="a/")
+    prefetch(cache, s3_client, next_page_token)
+
+    with count_s3_calls(s3_client) as s3_calls:
+        files, _, next_page_token = list_page(cache, s3_client, page_token=next_page_token)
+    assert [file["Key"] for file in files] == ["a/3.txt"]
+    assert next_page_token is None
+    assert s3_calls == {}
+
+
+# pylint: disable=unused-argument
+def test_writes_invalidate_pages_of_listings_containing_them(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    put_files(s3_client, "a/1.txt", "a/2.txt", "a/3.txt", "b/1.txt")
+    cache = ListingCache(ttl_seconds=5, max_entries=10)
+    _, _, next_page_token = list_page(cache, s3_client, prefix="a/")
+    prefetch(cache, s3_client, next_page_token)
+    list_page(cache, s3_client, prefix="b/")
+    assert len(cache) == 3
+
+    cache.invalidate(TEST_BUCKET_NAME, "a/4.txt")
+
+    # both pages of the "a/" listing are gone, the "b/" listing is untouched
+    assert len(cache) == 1
+    with count_s3_calls(s3_client) as s3_calls:
+        list_page(cache, s3_client, prefix="b/")
+    assert s3_calls == {}
+
+
+# pylint: disable=unused-argument
+def test_least_recently_used_pages_are_evicted(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    put_files(s3_client, "a/1.txt", "b/1.txt", "c/1.txt")
+    cache = ListingCache(ttl_seconds=5, max_entries=2)
+
+    list_page(cache, s3_client, prefix="a/")
+    list_page(cache, s3_client, prefix="b/")
+    list_page(cache, s3_client, prefix="a/")
+    list_page(cache, s3_client, prefix="c/")
+
+    assert cache.stats.evictions == 1
+    with count_s3_calls(s3_client) as s3_calls:
+        list_page(cache, s3_client, prefix="a/")
+    assert s3_calls == {}
+
+
+# pylint: disable=unused-argument
+def test_directory_listings_are_cached_separately(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    put_files(s3_client, "a/1.txt", "a/b/1.txt", "a/c/1.txt")
+    cache = ListingCache(ttl_seconds=5, max_entries=10)
+
+    files, directories, next_page_token = list_page(cache, s3_client, prefix="a/", delimiter="/")
+    assert [file["Key"] for file in files] == ["a/1.txt"] and directories == ["a/b/"]
+    prefetch(cache, s3_client, next_page_token, prefix="a/", delimiter="/")
+
+    with count_s3_calls(s3_client) as s3_calls:
+        files, directories, next_page_token = list_page(
+            cache, s3_client, prefix="a/", page_token=next_page_token, delimiter="/"
+        )
+    assert (files, directories, next_page_token) == ([], ["a/c/"], None)
+    assert s3_calls == {}
+
+    assert len(list_page(cache, s3_client, prefix="a/")[0]) == 2
+
+
+# pylint: disable=unused-argument
+def test_lookup_answers_from_fresh_pages_only(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    put_files(s3_client, "a/1.txt", "a/2.txt", "a/3.txt", "b/1.txt", "b/nested/1.txt")
+    clock = FakeClock()
+    cache = ListingCache(ttl_seconds=5, max_entries=10, clock=clock)
+    list_page(cache, s3_client, prefix="a/")  # 2 of the 3 files
+    list_page(cache, s3_client, prefix="b/", page_size=10, delimiter="/")  # complete, direct children only
+
+    known, obj = cache.lookup(TEST_BUCKET_NAME, "a/1.txt")
+    assert known and obj["Key"] == "a/1.txt"
+    # the page of a/ is not a complete listing, so a/3.txt and a/4.txt may exist
+    assert cache.lookup(TEST_BUCKET_NAME, "a/3.txt") == (False, None)
+    assert cache.lookup(TEST_BUCKET_NAME, "a/4.txt") == (False, None)
+    # the listing of b/ is complete, but does not list files in sub-directories
+    assert cache.lookup(TEST_BUCKET_NAME, "b/2.txt") == (True, None)
+    assert cache.lookup(TEST_BUCKET_NAME, "b/nested/2.txt") == (False, None)
+    assert cache.stats.lookups == 2
+
+    clock.now = 5
+    assert cache.lookup(TEST_BUCKET_NAME, "a/1.txt") == (False, None)
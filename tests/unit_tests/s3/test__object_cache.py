@@ -0,0 +1,108 @@
+"""Test cases for `s3.object_cache`."""
+
+import anyio
+import boto3
+import pytest
+
+from files_api.errors import ObjectNotFoundError
+from files_api.s3.executor import S3Executor
+from files_api.s3.object_cache import (
+    CachedObject,
+    ObjectCache,
+)
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def fetch(cache: ObjectCache, s3_client, object_key: str):
+    return anyio.run(lambda: cache.fetch(S3Executor(s3_client=s3_client), TEST_BUCKET_NAME, object_key))
+
+
+# pylint: disable=unused-argument
+def test_fresh_entries_are_served_without_s3_calls(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="config.json", Body=b"{}", ContentType="application/json")
+    cache = ObjectCache(max_size_bytes=1024, max_object_size_bytes=1024, ttl_seconds=30)
+
+    first = fetch(cache, s3_client, "config.json")
+    with count_s3_calls(s3_client) as s3_calls:
+        second = fetch(cache, s3_client, "config.json")
+
+    assert first.body == second.body == b"{}"
+    assert second.etag == first.etag and second.content_type == "application/json"
+    assert s3_calls == {}
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+# pylint: disable=unused-argument
+def test_expired_entries_are_revalidated_by_etag(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="config.json", Body=b"v1")
+    clock = FakeClock()
+    cache = ObjectCache(max_size_bytes=1024, max_object_size_bytes=1024, ttl_seconds=30, clock=clock)
+    fetch(cache, s3_client, "config.json")
+
+    clock.now = 31
+    with count_s3_calls(s3_client) as s3_calls:
+        assert fetch(cache, s3_client, "config.json").body == b"v1"
+    assert s3_calls == {"GetObject": 1}
+    assert cache.stats.revalidations == 1
+
+    # revalidation made the entry fresh again
+    clock.now = 40
+    with count_s3_calls(s3_client) as s3_calls:
+        fetch(cache, s3_client, "config.json")
+    assert s3_calls == {}
+
+    # changed in S3, e.g. through another worker
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="config.json", Body=b"v2")
+    clock.now = 100
+    assert fetch(cache, s3_client, "config.json").body == b"v2"
+    assert cache.stats.misses == 2
+
+    s3_client.delete_object(Bucket=TEST_BUCKET_NAME, Key="config.json")
+    clock.now = 200
+    with pytest.raises(ObjectNotFoundError):
+        fetch(cache, s3_client, "config.json")
+    assert len(cache) == 0
+
+
+# pylint: disable=unused-argument
+def test_large_objects_are_not_cached(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="large.bin", Body=b"x" * 100)
+    cache = ObjectCache(max_size_bytes=1024, max_object_size_bytes=10, ttl_seconds=30)
+
+    response = fetch(cache, s3_client, "large.bin")
+
+    assert not isinstance(response, CachedObject)
+    assert response["Body"].read() == b"x" * 100
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = ObjectCache(max_size_bytes=25, max_object_size_bytes=10, ttl_seconds=30)
+
+    def entry(body: bytes) -> CachedObject:
+        return CachedObject(body=body, content_type="text/plain", etag='"etag"', last_modified=None)
+
+    cache.put(TEST_BUCKET_NAME, "a", entry(b"a" * 10))
+    cache.put(TEST_BUCKET_NAME, "b", entry(b"b" * 10))
+    anyio.run(lambda: cache.fetch(S3Executor(s3_client=None), TEST_BUCKET_NAME, "a"))  # "a" is now most recent
+    cache.put(TEST_BUCKET_NAME, "c", entry(b"c" * 10))
+
+    assert cache.stats.evictions == 1
+    assert cache.size_bytes == 20
+    assert [key for _, key in cache._entries] == ["a", "c"]  # pylint: disable=protected-access
+
+    cache.invalidate(TEST_BUCKET_NAME, "a")
+    assert cache.size_bytes == 10
+    assert cache.stats.invalidations == 1
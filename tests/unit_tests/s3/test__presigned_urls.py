@@ -0,0 +1,74 @@
+"""Test cases for `s3.presigned_urls`."""
+
+from urllib.parse import (
+    parse_qs,
+    urlparse,
+)
+
+import requests
+
+from files_api.s3.client import create_s3_client
+from files_api.s3.presigned_urls import (
+    generate_presigned_download_url,
+    generate_presigned_upload_part_urls,
+    generate_presigned_upload_url,
+)
+from files_api.s3.write_objects import (
+    complete_multipart_upload,
+    create_multipart_upload,
+    upload_s3_object,
+)
+from tests.consts import TEST_BUCKET_NAME
+
+
+# pylint: disable=unused-argument
+def test_presigned_download_url(mocked_aws: None):
+    s3_client = create_s3_client()
+    upload_s3_object(TEST_BUCKET_NAME, "docs/report.txt", b"Hello, world!", s3_client=s3_client)
+
+    url = generate_presigned_download_url(TEST_BUCKET_NAME, "docs/report.txt", expires_in=60, s3_client=s3_client)
+
+    query = parse_qs(urlparse(url).query)
+    assert urlparse(url).path.endswith("/docs/report.txt")
+    assert query["X-Amz-Expires"] == ["60"]
+    assert requests.get(url, timeout=5).content == b"Hello, world!"
+
+
+# pylint: disable=unused-argument
+def test_presigned_upload_url_signs_content_type_and_length(mocked_aws: None):
+    s3_client = create_s3_client()
+
+    url = generate_presigned_upload_url(
+        TEST_BUCKET_NAME,
+        "docs/report.txt",
+        expires_in=60,
+        content_type="text/plain",
+        content_length=13,
+        s3_client=s3_client,
+    )
+
+    signed_headers = parse_qs(urlparse(url).query)["X-Amz-SignedHeaders"][0].split(";")
+    assert {"content-type", "content-length"} <= set(signed_headers)
+    response = requests.put(url, data=b"Hello, world!", headers={"Content-Type": "text/plain"}, timeout=5)
+    assert response.status_code == 200
+    obj = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="docs/report.txt")
+    assert obj["Body"].read() == b"Hello, world!"
+    assert obj["ContentType"] == "text/plain"
+
+
+# pylint: disable=unused-argument
+def test_presigned_upload_part_urls(mocked_aws: None):
+    s3_client = create_s3_client()
+    upload_id = create_multipart_upload(TEST_BUCKET_NAME, "big.bin", s3_client=s3_client)
+
+    urls = generate_presigned_upload_part_urls(
+        TEST_BUCKET_NAME, "big.bin", upload_id, part_count=2, expires_in=60, s3_client=s3_client
+    )
+
+    assert [parse_qs(urlparse(url).query)["partNumber"] for url in urls] == [["1"], ["2"]]
+    parts = []
+    for part_number, (url, data) in enumerate(zip(urls, [b"a" * 5 * 1024 * 1024, b"b"]), start=1):
+        response = requests.put(url, data=data, timeout=5)
+        parts.append({"PartNumber": part_number, "ETag": response.headers["ETag"]})
+    complete_multipart_upload(TEST_BUCKET_NAME, "big.bin", upload_id, parts, s3_client=s3_client)
+    assert s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="big.bin")["ContentLength"] == 5 * 1024 * 1024 + 1
@@ -1,11 +1,16 @@
 """Test cases for `s3.read_objects`."""
 
 import boto3
+import pytest
 
 from files_api import s3
+from files_api.errors import ObjectNotFoundError
 from files_api.s3.read_objects import (
+    fetch_s3_object,
+    fetch_s3_object_metadata,
     fetch_s3_objects_metadata,
     fetch_s3_objects_using_page_token,
+    iter_s3_object_pages,
     object_exists_in_s3,
 )
 from tests.consts import TEST_BUCKET_NAME
@@ -22,6 +27,34 @@ def test_object_exists_in_s3(mocked_aws: None):
     assert object_exists_in_s3(TEST_BUCKET_NAME, "testfile.txt") is True
     assert object_exists_in_s3(TEST_BUCKET_NAME, "nonexistent.txt") is False
 
+# pylint: disable=unused-argument
+def test_fetch_s3_object_metadata(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(
+        Bucket=TEST_BUCKET_NAME,
+        Key="testfile.txt",
+        Body=b"test content!",
+        ContentType="text/plain",
+        CacheControl="max-age=60",
+        Metadata={"owner": "data-team"},
+    )
+
+    metadata = fetch_s3_object_metadata(TEST_BUCKET_NAME, "testfile.txt", s3_client=s3_client)
+    assert metadata.content_type == "text/plain"
+    assert metadata.content_length == len(b"test content!")
+    assert metadata.etag == s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="testfile.txt")["ETag"]
+    assert metadata.cache_control == "max-age=60"
+    assert metadata.metadata == {"owner": "data-team"}
+
+    with pytest.raises(ObjectNotFoundError):
+        fetch_s3_object_metadata(TEST_BUCKET_NAME, "nonexistent.txt", s3_client=s3_client)
+
+
+# pylint: disable=unused-argument
+def test_fetch_s3_object_raises_for_missing_object(mocked_aws: None):
+    with pytest.raises(ObjectNotFoundError):
+        fetch_s3_object(TEST_BUCKET_NAME, "nonexistent.txt")
+
 # pylint: disable=unused-argument
 def test_pagination(mocked_aws: None):
     s3_client = boto3.client("s3")
@@ -118,3 +151,20 @@ def test_directory_queries(mocked_aws: None):
 
     assert next_page_token is None
     
+
+
+# pylint: disable=unused-argument
+def test_iter_s3_object_pages(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    for i in range(5):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"folder/file{i}.txt", Body=b"content")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="other/file.txt", Body=b"content")
+
+    pages = list(iter_s3_object_pages(TEST_BUCKET_NAME, prefix="folder/", page_size=2))
+
+    assert [[obj["Key"] for obj in page] for page in pages] == [
+        ["folder/file0.txt", "folder/file1.txt"],
+        ["folder/file2.txt", "folder/file3.txt"],
+        ["folder/file4.txt"],
+    ]
+
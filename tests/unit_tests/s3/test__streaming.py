@@ -0,0 +1,318 @@
+"""Test cases for `s3.streaming`."""
+
+import functools
+import gzip
+import io
+import tarfile
+
+import anyio
+import boto3
+import pytest
+
+from files_api.archives import TarArchiveWriter
+from files_api.compression import (
+    CompressionPolicy,
+    create_decompressor,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import iter_s3_object_pages
+from files_api.s3.streaming import (
+    MIN_MULTIPART_PART_SIZE_BYTES,
+    list_s3_objects_sharded,
+    read_s3_object_body,
+    upload_s3_object_from_stream,
+    write_s3_objects_archive,
+)
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+PART_SIZE = MIN_MULTIPART_PART_SIZE_BYTES
+
+
+class ClientDisconnected(Exception):
+    """Stand-in for starlette's `ClientDisconnect`."""
+
+
+async def chunked(content: bytes, chunk_size: int = 64 * 1024, fail_after: int | None = None):
+    for sent in range(0, len(content), chunk_size):
+        if fail_after is not None and sent >= fail_after:
+            raise ClientDisconnected()
+        yield content[sent : sent + chunk_size]
+
+
+def upload(s3_client, chunks, object_key: str, max_concurrent_parts: int = 2) -> None:
+    anyio.run(
+        lambda: upload_s3_object_from_stream(
+            s3=S3Executor(s3_client=s3_client),
+            chunks=chunks,
+            bucket_name=TEST_BUCKET_NAME,
+            object_key=object_key,
+            content_type="text/plain",
+            part_size=PART_SIZE,
+            max_concurrent_parts=max_concurrent_parts,
+        )
+    )
+
+
+# pylint: disable=unused-argument
+def test_large_stream_is_uploaded_in_parts(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    content = bytes(range(256)) * (2 * PART_SIZE // 256) + b"tail"
+
+    upload(s3_client, chunked(content), "large.bin")
+
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="large.bin")
+    assert response["Body"].read() == content
+    assert response["ContentType"] == "text/plain"
+    # multipart uploads have ETags of the form "<md5>-<number of parts>"
+    assert response["ETag"].strip('"').endswith("-3")
+
+
+# pylint: disable=unused-argument
+def test_small_stream_is_uploaded_with_a_single_put(mocked_aws: None):
+    s3_client = boto3.client("s3")
+
+    upload(s3_client, chunked(b"small file"), "small.txt")
+
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="small.txt")
+    assert response["Body"].read() == b"small file"
+    assert "-" not in response["ETag"]
+
+
+# pylint: disable=unused-argument
+def test_multipart_upload_is_aborted_when_the_stream_fails(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    content = b"x" * (3 * PART_SIZE)
+
+    with pytest.raises(Exception) as exc_info:
+        upload(s3_client, chunked(content, fail_after=2 * PART_SIZE), "interrupted.bin")
+
+    assert "ClientDisconnected" in repr(exc_info.value)
+    assert s3_client.list_multipart_uploads(Bucket=TEST_BUCKET_NAME).get("Uploads", []) == []
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)
+
+
+def test_part_size_below_the_s3_minimum_is_rejected():
+    with pytest.raises(ValueError):
+        anyio.run(
+            lambda: upload_s3_object_from_stream(
+                s3=S3Executor(s3_client=None),
+                chunks=chunked(b""),
+                bucket_name=TEST_BUCKET_NAME,
+                object_key="unused",
+                part_size=PART_SIZE - 1,
+            )
+        )
+
+
+def test_object_body_is_read_in_chunks_and_closed():
+    body = io.BytesIO(b"x" * 250)
+
+    async def main():
+        send_stream, receive_stream = anyio.create_memory_object_stream[bytes]()
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(read_s3_object_body, S3Executor(s3_client=None), body, send_stream, 100)
+            return [chunk async for chunk in receive_stream]
+
+    assert [len(chunk) for chunk in anyio.run(main)] == [100, 100, 50]
+    assert body.closed
+
+
+def test_object_body_is_decompressed_while_it_is_read():
+    content = b"compressible text\n" * 1000
+    body = io.BytesIO(gzip.compress(content))
+
+    async def main():
+        send_stream, receive_stream = anyio.create_memory_object_stream[bytes]()
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(
+                functools.partial(
+                    read_s3_object_body,
+                    S3Executor(s3_client=None),
+                    body,
+                    send_stream,
+                    chunk_size=10,
+                    decompressor=create_decompressor("gzip"),
+                )
+            )
+            return [chunk async for chunk in receive_stream]
+
+    chunks = anyio.run(main)
+    # the first chunks hold only the gzip header, which decompresses to nothing
+    assert all(chunks)
+    assert b"".join(chunks) == content
+    assert body.closed
+
+
+# pylint: disable=unused-argument
+def test_stream_is_compressed_as_it_is_uploaded(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    content = bytes(range(256)) * (2 * PART_SIZE // 256)
+
+    anyio.run(
+        lambda: upload_s3_object_from_stream(
+            s3=S3Executor(s3_client=s3_client),
+            chunks=chunked(content),
+            bucket_name=TEST_BUCKET_NAME,
+            object_key="large.txt",
+            content_type="text/plain",
+            part_size=PART_SIZE,
+            compression=CompressionPolicy(encoding="gzip"),
+        )
+    )
+
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="large.txt")
+    assert response["ContentEncoding"] == "gzip"
+    assert response["ContentType"] == "text/plain"
+    assert gzip.decompress(response["Body"].read()) == content
+
+
+def test_object_body_is_closed_when_reading_is_cancelled():
+    body = io.BytesIO(b"x" * 250)
+
+    async def main():
+        send_stream, receive_stream = anyio.create_memory_object_stream[bytes]()
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(read_s3_object_body, S3Executor(s3_client=None), body, send_stream, 100)
+            # the receiver goes away after the first chunk, like a disconnected client
+            await receive_stream.receive()
+            task_group.cancel_scope.cancel()
+
+    anyio.run(main)
+    assert body.closed
+
+
+def write_archive(s3_client, prefix: str, max_concurrent_objects: int = 2, prefetch_max_object_size: int = 100):
+    async def main():
+        send_stream, receive_stream = anyio.create_memory_object_stream[bytes]()
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(
+                functools.partial(
+                    write_s3_objects_archive,
+                    S3Executor(s3_client=s3_client),
+                    TEST_BUCKET_NAME,
+                    prefix,
+                    TarArchiveWriter(),
+                    send_stream,
+                    max_concurrent_objects=max_concurrent_objects,
+                    prefetch_max_object_size=prefetch_max_object_size,
+                    chunk_size=64,
+                )
+            )
+            return b"".join([chunk async for chunk in receive_stream])
+
+    return anyio.run(main)
+
+
+def test_objects_under_a_prefix_are_archived_in_key_order(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    contents = {f"archive/file_{i}.txt": b"x" * (i * 50) for i in range(6)}
+    contents["archive/nested/big.bin"] = b"y" * 1000
+    for key, content in contents.items():
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=content)
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="elsewhere.txt", Body=b"z")
+
+    with tarfile.open(fileobj=io.BytesIO(write_archive(s3_client, "archive/"))) as archive:
+        assert {member.name: archive.extractfile(member).read() for member in archive} == {
+            key.removeprefix("archive/"): content for key, content in contents.items()
+        }
+        assert archive.getnames() == sorted(archive.getnames())
+
+
+def test_archive_of_an_empty_prefix_is_empty(mocked_aws: None):
+    with tarfile.open(fileobj=io.BytesIO(write_archive(boto3.client("s3"), "nothing/"))) as archive:
+        assert archive.getnames() == []
+
+
+def test_compressed_objects_are_archived_as_stored(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    compressed = gzip.compress(b"compressible text\n" * 100)
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="logs/app.log", Body=compressed, ContentEncoding="gzip")
+
+    with tarfile.open(fileobj=io.BytesIO(write_archive(s3_client, "logs/"))) as archive:
+        assert {member.name: archive.extractfile(member).read() for member in archive} == {"app.log.gz": compressed}
+
+
+# pylint: disable=unused-argument
+def test_sharded_listing_matches_a_sequential_listing(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    keys = [
+        "data/a.txt",
+        "data/a/1.txt",
+        "data/a/2.txt",
+        "data/a-b/1.txt",
+        "data/b/1.txt",
+        "data/b/nested/1.txt",
+        "data/c.txt",
+        "data/d/1.txt",
+        "data/e/1.txt",
+        "data/e/2.txt",
+        "data/e/3.txt",
+        "data/z.txt",
+        "elsewhere/1.txt",
+    ]
+    for key in keys:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=b"content")
+
+    async def main() -> list:
+        pages_to_send, pages = anyio.create_memory_object_stream[list]()
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(
+                functools.partial(
+                    list_s3_objects_sharded,
+                    S3Executor(s3_client=s3_client),
+                    TEST_BUCKET_NAME,
+                    "data/",
+                    pages_to_send,
+                    max_concurrent_shards=2,
+                    page_size=2,
+                )
+            )
+            async with pages:
+                return [page async for page in pages]
+
+    pages = anyio.run(main)
+
+    sequential_keys = [obj["Key"] for page in iter_s3_object_pages(TEST_BUCKET_NAME, prefix="data/") for obj in page]
+    assert [obj["Key"] for page in pages for obj in page] == sequential_keys == sorted(keys)[:-1]
+    assert all(0 < len(page) <= 2 for page in pages)
+
+
+# pylint: disable=unused-argument
+def test_sharded_listing_lists_ahead_of_the_receiver_by_a_page_per_shard_at_most(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    for shard in "abcd":
+        for i in range(10):
+            s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"data/{shard}/{i}.txt", Body=b"content")
+
+    async def main() -> tuple[list, int]:
+        pages_to_send, pages = anyio.create_memory_object_stream[list]()
+        with count_s3_calls(s3_client) as s3_calls:
+            async with anyio.create_task_group() as task_group:
+                task_group.start_soon(
+                    functools.partial(
+                        list_s3_objects_sharded,
+                        S3Executor(s3_client=s3_client),
+                        TEST_BUCKET_NAME,
+                        "data/",
+                        pages_to_send,
+                        max_concurrent_shards=2,
+                        page_size=2,
+                    )
+                )
+                async with pages:
+                    first_page = await pages.receive()
+                    await anyio.sleep(0.2)
+                    calls_while_waiting = s3_calls["ListObjectsV2"]
+                    # e.g. the client disconnected
+                    task_group.cancel_scope.cancel()
+            await anyio.sleep(0.2)
+        return first_page, calls_while_waiting, s3_calls["ListObjectsV2"]
+
+    first_page, calls_while_waiting, calls = anyio.run(main)
+
+    assert [obj["Key"] for obj in first_page] == ["data/a/0.txt", "data/a/1.txt"]
+    # the prefix itself, then no more than a few pages ahead for each of the 2 shards being listed
+    assert calls_while_waiting <= 1 + 2 * 3
+    # a full listing takes 21 calls, and none are made once the listing is cancelled
+    assert calls == calls_while_waiting
@@ -0,0 +1,92 @@
+"""Test cases for `archives`."""
+
+import io
+import tarfile
+import zipfile
+from datetime import (
+    datetime,
+    timezone,
+)
+
+import pytest
+
+from files_api.archives import (
+    ArchivedFile,
+    ArchiveWriter,
+    TarArchiveWriter,
+    ZipArchiveWriter,
+    iter_tar_files,
+)
+
+
+def make_tar(files: dict[str, bytes], mode: str = "w") -> io.BytesIO:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        directory = tarfile.TarInfo("./docs")
+        directory.type = tarfile.DIRTYPE
+        archive.addfile(directory)
+        for path, content in files.items():
+            info = tarfile.TarInfo(path)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("mode", ["w", "w:gz"])
+def test_iter_tar_files_returns_regular_files_with_normalized_paths(mode: str):
+    archive = make_tar({"./docs/readme.md": b"# hi", "/data.json": b"{}", "notes": b"x"}, mode=mode)
+
+    assert list(iter_tar_files(archive)) == [
+        ArchivedFile(path="docs/readme.md", content=b"# hi", content_type="text/markdown"),
+        ArchivedFile(path="data.json", content=b"{}", content_type="application/json"),
+        ArchivedFile(path="notes", content=b"x", content_type=None),
+    ]
+
+
+def test_iter_tar_files_returns_streams_of_files_larger_than_max_content_size():
+    archive = make_tar({"small.txt": b"x", "large.txt": b"y" * 100, "last.txt": b"z"}, mode="w:gz")
+
+    # each stream is read before the next file is
+    files = [
+        (archived_file.path, archived_file.content, archived_file.stream and archived_file.stream.read())
+        for archived_file in iter_tar_files(archive, max_content_size=10)
+    ]
+
+    assert files == [("small.txt", b"x", None), ("large.txt", None, b"y" * 100), ("last.txt", b"z", None)]
+
+
+def test_iter_tar_files_rejects_invalid_archives():
+    with pytest.raises(tarfile.TarError):
+        next(iter_tar_files(io.BytesIO(b"not a tar archive" * 100)))
+
+
+def write_archive(archive: ArchiveWriter, files: dict[str, bytes]) -> bytes:
+    output = b""
+    for path, content in files.items():
+        output += archive.start_file(path, len(content), datetime(2024, 5, 6, 7, 8, 10, tzinfo=timezone.utc))
+        for start in range(0, len(content), 1000):
+            output += archive.write(content[start : start + 1000])
+        output += archive.end_file()
+    return output + archive.close()
+
+
+FILES = {"readme.md": b"# hi", "data/big.bin": bytes(range(256)) * 20, "empty": b""}
+
+
+def test_tar_archive_writer():
+    output = write_archive(TarArchiveWriter(), FILES)
+
+    assert len(output) % tarfile.RECORDSIZE == 0
+    with tarfile.open(fileobj=io.BytesIO(output)) as archive:
+        assert {member.name: archive.extractfile(member).read() for member in archive} == FILES
+        assert archive.getmember("readme.md").mtime == datetime(2024, 5, 6, 7, 8, 10, tzinfo=timezone.utc).timestamp()
+
+
+def test_zip_archive_writer():
+    output = write_archive(ZipArchiveWriter(), FILES)
+
+    with zipfile.ZipFile(io.BytesIO(output)) as archive:
+        assert archive.testzip() is None
+        assert {name: archive.read(name) for name in archive.namelist()} == FILES
+        assert archive.getinfo("readme.md").date_time == (2024, 5, 6, 7, 8, 10)
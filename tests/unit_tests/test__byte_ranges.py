@@ -0,0 +1,74 @@
+"""Test cases for `byte_ranges`."""
+
+import pytest
+
+from files_api.byte_ranges import (
+    MAX_BYTE_RANGES_PER_REQUEST,
+    ByteRange,
+    multipart_byteranges_closing,
+    multipart_byteranges_length,
+    multipart_byteranges_part_header,
+    parse_content_range,
+    parse_range_header,
+)
+
+
+@pytest.mark.parametrize(
+    "range_header, expected",
+    [
+        ("bytes=0-99", [ByteRange(0, 99)]),
+        ("bytes=100-", [ByteRange(100, None)]),
+        ("bytes=-500", [ByteRange(None, 500)]),
+        ("bytes=0-0, 10-19,-5", [ByteRange(0, 0), ByteRange(10, 19), ByteRange(None, 5)]),
+    ],
+)
+def test_parse_range_header(range_header: str, expected: list[ByteRange]):
+    assert parse_range_header(range_header) == expected
+
+
+@pytest.mark.parametrize(
+    "range_header",
+    [
+        "items=0-99",
+        "bytes=",
+        "bytes=-",
+        "bytes=10-5",
+        "bytes=a-b",
+        ",".join(["bytes=0-1"] * (MAX_BYTE_RANGES_PER_REQUEST + 1)),
+    ],
+)
+def test_unsupported_range_headers_are_ignored(range_header: str):
+    assert parse_range_header(range_header) is None
+
+
+def test_byte_range_resolve():
+    assert ByteRange(0, 99).resolve(size=50) == (0, 49)
+    assert ByteRange(10, None).resolve(size=50) == (10, 49)
+    assert ByteRange(None, 10).resolve(size=50) == (40, 49)
+    assert ByteRange(None, 100).resolve(size=50) == (0, 49)
+    assert ByteRange(50, None).resolve(size=50) is None
+    assert ByteRange(None, 0).resolve(size=50) is None
+
+
+def test_byte_range_to_s3_range():
+    assert ByteRange(0, 99).to_s3_range() == "bytes=0-99"
+    assert ByteRange(None, 10).to_s3_range() == "bytes=-10"
+    assert ByteRange(10, None).to_s3_range() == "bytes=10-"
+
+
+def test_parse_content_range():
+    assert parse_content_range("bytes 0-99/1234") == (0, 99, 1234)
+    with pytest.raises(ValueError):
+        parse_content_range("bytes */1234")
+
+
+def test_multipart_byteranges_length_matches_body():
+    parts = [("bytes 0-2/10", b"abc"), ("bytes 7-9/10", b"hij")]
+    body = b"".join(
+        multipart_byteranges_part_header("boundary", "text/plain", content_range) + data + b"\r\n"
+        for content_range, data in parts
+    ) + multipart_byteranges_closing("boundary")
+
+    assert multipart_byteranges_length("boundary", "text/plain", [(0, 2, 10), (7, 9, 10)]) == len(body)
+    assert body.startswith(b"--boundary\r\nContent-Type: text/plain\r\nContent-Range: bytes 0-2/10\r\n\r\nabc\r\n")
+    assert body.endswith(b"hij\r\n--boundary--\r\n")
@@ -0,0 +1,103 @@
+"""Test cases for `compression`."""
+
+import gzip
+
+import anyio
+import pytest
+
+from files_api.compression import (
+    CompressionPolicy,
+    accepts_encoding,
+    compress_chunks,
+    compress_file_content,
+    create_decompressor,
+    decompress,
+    zstandard,
+)
+
+TEXT = b'{"level": "info", "message": "request handled"}\n' * 1000
+
+
+@pytest.mark.parametrize(
+    "content_type, size, expected",
+    [
+        ("application/json", 5000, True),
+        ("text/csv; charset=utf-8", 5000, True),
+        ("TEXT/PLAIN", None, True),
+        ("image/png", 5000, False),
+        ("application/json", 100, False),
+        (None, 5000, False),
+    ],
+)
+def test_policy_compresses_large_enough_files_of_text_content_types(content_type, size, expected):
+    assert CompressionPolicy(encoding="gzip").should_compress(content_type, size) is expected
+
+
+def test_gzip_round_trip():
+    compressed = CompressionPolicy(encoding="gzip").compress(TEXT)
+
+    assert len(compressed) < len(TEXT) / 10
+    assert gzip.decompress(compressed) == TEXT
+    assert decompress(compressed, "gzip") == TEXT
+
+
+def test_compress_file_content_leaves_files_the_policy_does_not_apply_to():
+    policy = CompressionPolicy(encoding="gzip")
+
+    assert anyio.run(compress_file_content, None, TEXT, "text/plain") == (TEXT, None)
+    assert anyio.run(compress_file_content, policy, TEXT, "image/png") == (TEXT, None)
+    content, encoding = anyio.run(compress_file_content, policy, TEXT, "text/plain")
+    assert (gzip.decompress(content), encoding) == (TEXT, "gzip")
+
+
+def test_streamed_compression_matches_the_content():
+    async def chunks():
+        for start in range(0, len(TEXT), 1000):
+            yield TEXT[start : start + 1000]
+
+    async def main():
+        compressor = CompressionPolicy(encoding="gzip").create_compressor()
+        return [chunk async for chunk in compress_chunks(compressor, chunks())]
+
+    compressed_chunks = anyio.run(main)
+    assert all(compressed_chunks)
+    decompressor = create_decompressor("gzip")
+    assert b"".join(decompressor.decompress(chunk) for chunk in compressed_chunks) + decompressor.flush() == TEXT
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", True),
+        ("deflate, GZIP;q=0.5", True),
+        ("x-gzip", True),
+        ("*", True),
+        ("br, *;q=0.1", True),
+        ("gzip;q=0, *", False),
+        ("identity", False),
+        ("br, zstd", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_accepts_encoding(accept_encoding, expected):
+    assert accepts_encoding(accept_encoding, "gzip") is expected
+
+
+def test_unsupported_encodings_are_rejected():
+    with pytest.raises(ValueError):
+        CompressionPolicy(encoding="br")
+
+
+@pytest.mark.skipif(zstandard is not None, reason="zstandard is installed")
+def test_zstd_requires_zstandard():
+    with pytest.raises(ValueError, match="zstandard"):
+        CompressionPolicy(encoding="zstd")
+
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard is not installed")
+def test_zstd_round_trip():
+    compressed = CompressionPolicy(encoding="zstd").compress(TEXT)
+
+    assert len(compressed) < len(TEXT) / 10
+    assert decompress(compressed, "zstd") == TEXT
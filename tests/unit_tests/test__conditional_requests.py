@@ -0,0 +1,42 @@
+"""Test cases for `conditional_requests`."""
+
+from datetime import (
+    datetime,
+    timezone,
+)
+
+from files_api.conditional_requests import (
+    format_http_date,
+    parse_http_date,
+    read_conditions_from_headers,
+)
+from files_api.s3.read_objects import ReadConditions
+
+SOME_DATE = datetime(1994, 11, 6, 8, 49, 37, tzinfo=timezone.utc)
+
+
+def test_http_date_round_trip():
+    assert format_http_date(SOME_DATE) == "Sun, 06 Nov 1994 08:49:37 GMT"
+    assert parse_http_date("Sun, 06 Nov 1994 08:49:37 GMT") == SOME_DATE
+    assert parse_http_date("not a date") is None
+
+
+def test_unconditional_request_has_no_conditions():
+    assert read_conditions_from_headers({"Accept": "*/*"}) is None
+
+
+def test_read_conditions_from_headers():
+    assert read_conditions_from_headers({"If-None-Match": '"abc"'}) == ReadConditions(if_none_match='"abc"')
+    assert read_conditions_from_headers({"If-Modified-Since": format_http_date(SOME_DATE)}) == ReadConditions(
+        if_modified_since=SOME_DATE
+    )
+
+
+def test_date_conditions_are_ignored_next_to_etag_conditions():
+    headers = {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": format_http_date(SOME_DATE),
+        "If-Match": '"def"',
+        "If-Unmodified-Since": format_http_date(SOME_DATE),
+    }
+    assert read_conditions_from_headers(headers) == ReadConditions(if_match='"def"', if_none_match='"abc"')
@@ -0,0 +1,77 @@
+"""Test cases for `metrics`."""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    AppMetrics,
+    MetricsRegistry,
+)
+from files_api.s3.object_cache import ObjectCache
+
+
+def test_metrics_are_rendered_in_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    duration = registry.histogram("duration_seconds", "Duration.", buckets=(0.1, 1.0))
+    requests.inc('/v1/files/"quoted"')
+    requests.inc('/v1/files/"quoted"', amount=2)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        duration.observe(value)
+
+    assert registry.render() == (
+        "# HELP requests_total Requests.\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/v1/files/\\"quoted\\""} 3\n'
+        "# HELP duration_seconds Duration.\n"
+        "# TYPE duration_seconds histogram\n"
+        'duration_seconds_bucket{le="0.1"} 2\n'
+        'duration_seconds_bucket{le="1"} 3\n'
+        'duration_seconds_bucket{le="+Inf"} 4\n'
+        "duration_seconds_sum 3.65\n"
+        "duration_seconds_count 4\n"
+    )
+
+
+def test_component_stats_are_exported():
+    metrics = AppMetrics()
+    object_cache = ObjectCache(max_size_bytes=1024, max_object_size_bytes=1024, ttl_seconds=30)
+    object_cache.stats.hits = 7
+    metrics.export_stats("object_cache", object_cache)
+    metrics.export_stats("listing_cache", None)
+
+    rendered = metrics.registry.render()
+
+    assert "\nfiles_api_object_cache_hits_total 7\n" in rendered
+    assert "\nfiles_api_object_cache_entries 0\n" in rendered
+    assert "\nfiles_api_object_cache_size_bytes 0\n" in rendered
+    assert "listing_cache" not in rendered
+
+
+def test_requests_and_s3_calls_are_measured(client: TestClient):
+    client.put("/v1/files/a.txt", files={"file": ("a.txt", b"hello", "text/plain")})
+    client.get("/v1/files/a.txt")
+    client.get("/v1/files/missing.txt")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == PROMETHEUS_CONTENT_TYPE
+    metrics = client.app.state.metrics
+    assert metrics.http_requests.value("PUT", "/v1/files/{file_path:path}", "201") == 1
+    assert metrics.http_requests.value("GET", "/v1/files/{file_path:path}", "200") == 1
+    assert metrics.http_requests.value("GET", "/v1/files/{file_path:path}", "404") == 1
+    assert metrics.http_request_duration.count("GET", "/v1/files/{file_path:path}") == 2
+    assert metrics.s3_requests.value("PutObject") == 1
+    assert metrics.s3_request_duration.count("PutObject") == 1
+    assert metrics.s3_errors.value("GetObject", "NoSuchKey") == 1
+    assert metrics.s3_body_bytes.value("PutObject", "upload") == 5
+    assert metrics.s3_body_bytes.value("GetObject", "download") == 5
+    # the request for the metrics themselves was in flight while they were rendered
+    assert 'files_api_http_requests_in_flight{method="GET",route="/metrics"} 1\n' in response.text
+
+
+def test_metrics_can_be_disabled(make_client):
+    client = make_client(metrics_enabled=False)
+    assert client.get("/metrics").status_code == status.HTTP_404_NOT_FOUND
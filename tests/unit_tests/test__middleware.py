@@ -0,0 +1,148 @@
+"""Test cases for `middleware`."""
+
+import logging
+import re
+
+import anyio
+import pytest
+from fastapi import (
+    FastAPI,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from files_api.metrics import AppMetrics
+from files_api.middleware import RequestLifecycleMiddleware
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import delete_s3_bucket
+
+
+def create_test_app(events: list) -> FastAPI:
+    """An app with the middleware and routes that stream, fail, and fail while streaming."""
+    app = FastAPI()
+    app.add_middleware(RequestLifecycleMiddleware, metrics=AppMetrics())
+
+    @app.get("/request-id")
+    async def get_request_id(request: Request) -> str:
+        return request.state.request_id
+
+    @app.get("/stream")
+    async def stream() -> StreamingResponse:
+        async def chunks():
+            for i in range(3):
+                events.append(f"produced {i}")
+                yield b"x" * 1024
+
+        return StreamingResponse(chunks())
+
+    @app.get("/fail")
+    async def fail() -> None:
+        raise RuntimeError("boom")
+
+    @app.get("/fail-while-streaming")
+    async def fail_while_streaming() -> StreamingResponse:
+        async def chunks():
+            yield b"x"
+            raise RuntimeError("boom")
+
+        return StreamingResponse(chunks())
+
+    return app
+
+
+def test_responses_carry_a_request_id_and_server_timing(client: TestClient):
+    response = client.get("/v1/files")
+    request_id = response.headers["X-Request-ID"]
+    assert len(request_id) == 32
+    assert response.headers["Server-Timing"].startswith("app;dur=")
+    assert client.get("/v1/files").headers["X-Request-ID"] != request_id
+
+    # the client's request id is propagated, unless it is malformed
+    assert client.get("/v1/files", headers={"X-Request-ID": "abc-123"}).headers["X-Request-ID"] == "abc-123"
+    assert client.get("/v1/files", headers={"X-Request-ID": "a b"}).headers["X-Request-ID"] != "a b"
+    assert client.get("/v1/files", headers={"X-Request-ID": "a" * 129}).headers["X-Request-ID"] != "a" * 129
+
+
+def test_the_request_id_is_in_the_request_state():
+    with TestClient(create_test_app(events=[])) as client:
+        response = client.get("/request-id", headers={"X-Request-ID": "abc-123"})
+    assert response.json() == "abc-123"
+
+
+def test_requests_are_access_logged(client: TestClient, caplog: pytest.LogCaptureFixture):
+    client.put("/v1/files/a.txt", files={"file": ("a.txt", b"hello", "text/plain")})
+
+    with caplog.at_level(logging.INFO, logger="files_api.access"):
+        client.get("/v1/files/a.txt", params={"x": "1"}, headers={"X-Request-ID": "abc-123"})
+
+    [record] = [record for record in caplog.records if record.name == "files_api.access"]
+    assert re.fullmatch(
+        r'.* - "GET /v1/files/a.txt\?x=1 HTTP/1.1" 200 5 [0-9.]+ms request_id=abc-123', record.getMessage()
+    )
+
+
+def test_unhandled_exceptions_are_logged_and_answered_with_a_500(client: TestClient, caplog: pytest.LogCaptureFixture):
+    delete_s3_bucket(TEST_BUCKET_NAME)
+
+    with caplog.at_level(logging.ERROR, logger="files_api.middleware"):
+        response = client.get("/v1/files", headers={"X-Request-ID": "abc-123"})
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.json() == {"detail": "Internal Server Error"}
+    assert response.headers["X-Request-ID"] == "abc-123"
+    [record] = caplog.records
+    assert record.getMessage() == "Unhandled exception during GET /v1/files (request id abc-123)"
+    assert record.exc_info is not None
+
+
+def test_exceptions_after_the_response_started_are_raised_to_the_server():
+    app = create_test_app(events=[])
+    with TestClient(app) as client:
+        with pytest.raises(RuntimeError, match="boom"):
+            client.get("/fail-while-streaming")
+        assert client.get("/fail").status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    metrics = app.user_middleware[0].kwargs["metrics"]
+    assert metrics.http_unhandled_exceptions.value("/fail-while-streaming", "RuntimeError") == 1
+    assert metrics.http_unhandled_exceptions.value("/fail", "RuntimeError") == 1
+
+
+def test_streamed_bodies_are_passed_through_chunk_by_chunk():
+    events: list = []
+    app = create_test_app(events)
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive() -> dict:
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.body" and message.get("body"):
+            events.append(f"sent {len(message['body'])} bytes")
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [],
+        "client": ("testclient", 123),
+        "server": ("testserver", 80),
+    }
+    anyio.run(app, scope, receive, send)
+
+    # each chunk reaches the server before the next one is produced
+    assert events == [
+        "produced 0",
+        "sent 1024 bytes",
+        "produced 1",
+        "sent 1024 bytes",
+        "produced 2",
+        "sent 1024 bytes",
+    ]
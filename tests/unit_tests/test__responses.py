@@ -0,0 +1,51 @@
+"""Test cases for `responses`."""
+
+import io
+
+import anyio
+import pytest
+
+from files_api.responses import S3ObjectStreamingResponse
+from files_api.s3.executor import S3Executor
+
+
+def make_response(body: io.BytesIO) -> S3ObjectStreamingResponse:
+    return S3ObjectStreamingResponse(
+        s3=S3Executor(s3_client=None),
+        body=body,
+        content_length=len(body.getvalue()),
+        chunk_size=100,
+        media_type="text/plain",
+    )
+
+
+async def receive_nothing():
+    await anyio.sleep_forever()
+
+
+def test_body_is_sent_in_chunks_with_content_length():
+    body = io.BytesIO(b"x" * 250)
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    anyio.run(make_response(body), {"type": "http", "asgi": {"spec_version": "2.4"}}, receive_nothing, send)
+
+    assert (b"content-length", b"250") in messages[0]["headers"]
+    assert [len(message["body"]) for message in messages[1:]] == [100, 100, 50, 0]
+    assert body.closed
+
+
+def test_body_is_closed_when_the_client_disconnects():
+    body = io.BytesIO(b"x" * 250)
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            raise OSError("client went away")
+
+    with pytest.raises(Exception) as exc_info:
+        anyio.run(make_response(body), {"type": "http", "asgi": {"spec_version": "2.4"}}, receive_nothing, send)
+
+    assert "ClientDisconnect" in repr(exc_info.value)
+    assert body.closed
@@ -0,0 +1,118 @@
+"""Test conditional requests (`ETag`, `If-None-Match`, `If-Match`, ...) against the files routes."""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.conditional_requests import format_http_date
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+TEST_FILE_PATH = "conditional/test_file.txt"
+TEST_FILE_CONTENT = b"test content"
+TEST_FILE_CONTENT_TYPE = "text/plain"
+
+
+def put_test_file(client: TestClient, content: bytes = TEST_FILE_CONTENT) -> str:
+    """Upload the test file and return its ETag."""
+    response = client.put(
+        f"/v1/files/{TEST_FILE_PATH}",
+        files={"file": (TEST_FILE_PATH, content, TEST_FILE_CONTENT_TYPE)},
+    )
+    assert response.status_code in (status.HTTP_200_OK, status.HTTP_201_CREATED)
+    return client.head(f"/v1/files/{TEST_FILE_PATH}").headers["ETag"]
+
+
+def test_get_and_head_return_validators(client: TestClient):
+    etag = put_test_file(client)
+    last_modified = client.app.state.s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key=TEST_FILE_PATH)["LastModified"]
+
+    for response in (client.get(f"/v1/files/{TEST_FILE_PATH}"), client.head(f"/v1/files/{TEST_FILE_PATH}")):
+        assert response.headers["ETag"] == etag
+        assert response.headers["Last-Modified"] == format_http_date(last_modified)
+
+
+def test_get_with_matching_if_none_match_is_not_modified(client: TestClient):
+    etag = put_test_file(client)
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert s3_calls == {"GetObject": 1}
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"If-None-Match": '"some-other-etag"'})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == TEST_FILE_CONTENT
+
+
+def test_head_with_matching_if_none_match_is_not_modified(client: TestClient):
+    etag = put_test_file(client)
+
+    response = client.head(f"/v1/files/{TEST_FILE_PATH}", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_get_with_if_modified_since(client: TestClient):
+    put_test_file(client)
+    last_modified = client.head(f"/v1/files/{TEST_FILE_PATH}").headers["Last-Modified"]
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    response = client.get(
+        f"/v1/files/{TEST_FILE_PATH}", headers={"If-Modified-Since": "Sun, 06 Nov 1994 08:49:37 GMT"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_get_with_failing_if_match(client: TestClient):
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"If-Match": '"some-other-etag"'})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+
+def test_put_with_if_match(client: TestClient):
+    etag = put_test_file(client)
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.put(
+            f"/v1/files/{TEST_FILE_PATH}",
+            files={"file": (TEST_FILE_PATH, b"second version", TEST_FILE_CONTENT_TYPE)},
+            headers={"If-Match": etag},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert s3_calls == {"PutObject": 1}
+
+    # the file changed since `etag` was read, so a second writer using it loses the race
+    response = client.put(
+        f"/v1/files/{TEST_FILE_PATH}",
+        files={"file": (TEST_FILE_PATH, b"conflicting version", TEST_FILE_CONTENT_TYPE)},
+        headers={"If-Match": etag},
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert client.get(f"/v1/files/{TEST_FILE_PATH}").content == b"second version"
+
+
+def test_put_with_if_match_on_missing_file(client: TestClient):
+    response = client.put(
+        "/v1/files/non_existent_file.txt",
+        files={"file": ("non_existent_file.txt", TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+        headers={"If-Match": '"some-etag"'},
+    )
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+
+def test_delete_with_if_match(client: TestClient):
+    etag = put_test_file(client)
+
+    response = client.delete(f"/v1/files/{TEST_FILE_PATH}", headers={"If-Match": '"some-other-etag"'})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert client.get(f"/v1/files/{TEST_FILE_PATH}").status_code == status.HTTP_200_OK
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.delete(f"/v1/files/{TEST_FILE_PATH}", headers={"If-Match": etag})
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert s3_calls == {"DeleteObject": 1}
+    assert client.get(f"/v1/files/{TEST_FILE_PATH}").status_code == status.HTTP_404_NOT_FOUND
@@ -1,3 +1,4 @@
+import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
@@ -48,6 +49,77 @@ def test_get_files_page_token_is_mutually_exclusive_with_page_size_and_directory
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     assert "mutually exclusive" in str(response.json())
 
+    response = client.get("/v1/files?page_token=some_token&recursive=false")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "mutually exclusive" in str(response.json())
+
+
+def test_get_files_with_malformed_directory_page_token(client: TestClient):
+    response = client.get("/v1/files?page_token=dir.not-base64-json")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize(
+    "body",
+    [{}, {"file_paths": ["a.txt"], "directory": "a/"}, {"directory": ""}],
+)
+def test_bulk_delete_needs_exactly_one_target(client: TestClient, body: dict):
+    response = client.post("/v1/bulk/delete", json=body)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_bulk_upload_tar_rejects_invalid_archives(client: TestClient):
+    response = client.post("/v1/bulk/upload/tar", content=b"not a tar archive" * 100)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"].startswith("Invalid archive")
+    assert "Contents" not in client.app.state.s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)
+
+
+def test_bulk_metadata_needs_file_paths(client: TestClient):
+    response = client.post("/v1/bulk/metadata", json={"file_paths": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_copy_nonexistent_file(client: TestClient):
+    response = client.post("/v1/files/missing.txt/copy", json={"destination": "copy.txt"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_move_file_onto_itself(client: TestClient):
+    client.put("/v1/files/a.txt", files={"file": ("a.txt", b"a", "text/plain")})
+    response = client.post("/v1/files/a.txt/move", json={"destination": "a.txt"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/v1/files/a.txt").content == b"a"
+
+
+@pytest.mark.parametrize("destination_directory", ["photos/", "photos", "photos/backup/"])
+def test_bulk_copy_into_source_directory(client: TestClient, destination_directory: str):
+    response = client.post(
+        "/v1/bulk/copy", json={"source_directory": "photos", "destination_directory": destination_directory}
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_presigned_url_expiry_above_maximum(make_client):
+    client = make_client(presigned_url_max_expiry_seconds=3600)
+    response = client.post("/v1/presigned-urls/download", json={"file_path": "a.txt", "expires_in_seconds": 3601})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_presigned_upload_urls_are_disabled_with_deduplication(make_client):
+    client = make_client(upload_deduplication=True)
+    response = client.post("/v1/presigned-urls/upload", json={"file_path": "a.txt"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_complete_multipart_upload_with_invalid_part(client: TestClient):
+    upload = client.post("/v1/presigned-urls/multipart-upload", json={"file_path": "big.bin", "part_count": 1}).json()
+    response = client.post(
+        f"/v1/multipart-uploads/{upload['upload_id']}/complete",
+        json={"file_path": "big.bin", "parts": [{"part_number": 1, "etag": '"not-uploaded"'}]},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
 
 def test_unforseen_error(client: TestClient):
     """Test that a 500 error is returned when an unseen error occurs."""
@@ -58,3 +130,14 @@ def test_unforseen_error(client: TestClient):
     response = client.get("/v1/files")
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
     assert response.json() == {"detail": "Internal Server Error"}
+
+
+def test_unforseen_errors_are_recorded_in_metrics(client: TestClient):
+    delete_s3_bucket(TEST_BUCKET_NAME)
+
+    assert client.get("/v1/files").status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    metrics = client.app.state.metrics
+    assert metrics.http_unhandled_exceptions.value("/v1/files", "NoSuchBucket") == 1
+    assert metrics.http_requests.value("GET", "/v1/files", "500") == 1
+    assert metrics.s3_errors.value("ListObjectsV2", "NoSuchBucket") == 1
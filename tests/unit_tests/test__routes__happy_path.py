@@ -1,6 +1,19 @@
+import gzip
+import io
+import json
+import tarfile
+import zipfile
+from unittest.mock import ANY
+from urllib.parse import urlparse
+
+import pytest
+import requests
 from fastapi import status
 from fastapi.testclient import TestClient
 
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
 # from src.files_api.main import app
 
 TEST_FILE_PATH = "/home/nimee/repos/cloud-course-project/tests/dummy_test.txt"
@@ -68,6 +81,31 @@ def test_get_file_metadata(client: TestClient):
     assert response2.status_code == status.HTTP_200_OK
     assert response2.headers["Content-Type"] == TEST_FILE_CONTENT_TYPE
     assert int(response2.headers["Content-Length"]) == len(TEST_FILE_CONTENT)
+    assert response2.headers["ETag"]
+
+
+def test_get_file_metadata_makes_a_single_head_object_call(client: TestClient):
+    s3_client = client.app.state.s3_client
+    s3_client.put_object(
+        Bucket=TEST_BUCKET_NAME,
+        Key="test_file_metadata.txt",
+        Body=TEST_FILE_CONTENT,
+        ContentType=TEST_FILE_CONTENT_TYPE,
+        CacheControl="max-age=60",
+        Metadata={"owner": "data-team"},
+    )
+
+    with count_s3_calls(s3_client) as s3_calls:
+        response = client.head("/v1/files/test_file_metadata.txt")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert s3_calls == {"HeadObject": 1}
+    assert (
+        response.headers["ETag"]
+        == s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="test_file_metadata.txt")["ETag"]
+    )
+    assert response.headers["Cache-Control"] == "max-age=60"
+    assert response.headers["x-amz-meta-owner"] == "data-team"
 
 
 def test_get_file(client: TestClient):
@@ -100,3 +138,666 @@ def test_delete_file(client: TestClient):
 
     response = client.get("/v1/files/dummy_file.txt")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_routes_reuse_the_app_s3_client(client: TestClient, monkeypatch):
+    """Test that no route builds its own boto3 client; they all use the one created by `create_app`."""
+
+    def fail_if_called(*args, **kwargs):
+        raise AssertionError("a new boto3 client was created while handling a request")
+
+    monkeypatch.setattr("boto3.client", fail_if_called)
+
+    file_path = "test_file_shared_client.txt"
+    response = client.put(
+        f"/v1/files/{file_path}",
+        files={"file": (file_path, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert client.get("/v1/files").status_code == status.HTTP_200_OK
+    assert client.head(f"/v1/files/{file_path}").status_code == status.HTTP_200_OK
+    assert client.get(f"/v1/files/{file_path}").content == TEST_FILE_CONTENT
+    assert client.delete(f"/v1/files/{file_path}").status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_upload_file_stream(client: TestClient):
+    file_path = "streamed/large_file.bin"
+    content = b"0123456789abcdef" * (700 * 1024)  # ~11 MiB, i.e. several multipart parts
+
+    response = client.put(
+        f"/v1/uploads/{file_path}",
+        content=content,
+        headers={"Content-Type": "application/octet-stream"},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.json() == {
+        "file_path": file_path,
+        "message": f"New file uploaded at path : /{file_path}",
+    }
+
+    response = client.get(f"/v1/files/{file_path}")
+    assert response.content == content
+    assert response.headers["Content-Type"] == "application/octet-stream"
+
+    response = client.put(f"/v1/uploads/{file_path}", content=b"small", headers={"Content-Type": "text/plain"})
+    assert response.status_code == status.HTTP_200_OK
+    assert client.get(f"/v1/files/{file_path}").content == b"small"
+
+
+def test_get_large_file_is_streamed_in_chunks(make_client):
+    client = make_client(download_chunk_size_bytes=64 * 1024)
+    content = bytes(range(256)) * 1000  # a few chunks, the last one partial
+    client.app.state.s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="large_file.bin", Body=content)
+
+    with client.stream("GET", "/v1/files/large_file.bin") as response:
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["Content-Length"] == str(len(content))
+        assert response.read() == content
+
+
+def test_get_file_is_served_from_the_object_cache(make_client):
+    client = make_client(object_cache_max_size_bytes=1024 * 1024)
+    s3_client = client.app.state.s3_client
+    client.put("/v1/files/config.json", files={"file": ("config.json", b"v1", "application/json")})
+
+    assert client.get("/v1/files/config.json").content == b"v1"
+    with count_s3_calls(s3_client) as s3_calls:
+        response = client.get("/v1/files/config.json")
+    assert response.content == b"v1"
+    assert response.headers["Content-Type"] == "application/json"
+    assert response.headers["ETag"] == s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="config.json")["ETag"]
+    assert s3_calls == {}
+
+    # writes through this worker invalidate the cached copy
+    client.put("/v1/files/config.json", files={"file": ("config.json", b"v2", "application/json")})
+    assert client.get("/v1/files/config.json").content == b"v2"
+    client.delete("/v1/files/config.json")
+    assert client.get("/v1/files/config.json").status_code == status.HTTP_404_NOT_FOUND
+
+    stats = client.get("/v1/object-cache/stats").json()
+    assert stats["enabled"] is True
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 3)
+
+
+def test_object_cache_is_disabled_by_default(client: TestClient):
+    assert client.get("/v1/object-cache/stats").json()["enabled"] is False
+
+
+def test_get_file_is_served_from_the_disk_cache(make_client, tmp_path):
+    client = make_client(disk_cache_directory=str(tmp_path))
+    s3_client = client.app.state.s3_client
+    content = bytes(range(256)) * 1024
+    client.put("/v1/files/data.bin", files={"file": ("data.bin", content, "application/octet-stream")})
+
+    assert client.get("/v1/files/data.bin").content == content
+    with count_s3_calls(s3_client) as s3_calls:
+        response = client.get("/v1/files/data.bin")
+        ranged_response = client.get("/v1/files/data.bin", headers={"Range": "bytes=10-19"})
+    assert s3_calls == {}
+    assert response.content == content
+    assert response.headers["Content-Type"] == "application/octet-stream"
+    assert response.headers["Content-Length"] == str(len(content))
+    assert response.headers["ETag"] == s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="data.bin")["ETag"]
+    assert ranged_response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert ranged_response.headers["Content-Range"] == f"bytes 10-19/{len(content)}"
+    assert ranged_response.content == content[10:20]
+
+    # writes through this worker invalidate the cached copy
+    client.put("/v1/files/data.bin", files={"file": ("data.bin", b"v2", "application/octet-stream")})
+    assert client.get("/v1/files/data.bin").content == b"v2"
+
+    stats = client.get("/v1/disk-cache/stats").json()
+    assert stats["enabled"] is True
+    assert (stats["hits"], stats["misses"], stats["fills"], stats["invalidations"]) == (2, 2, 2, 2)
+    assert (stats["entries"], stats["size_bytes"]) == (1, 2)
+
+
+def test_reads_go_through_the_read_coalescer(make_client):
+    client = make_client(read_coalescing=True)
+    client.put("/v1/files/manifest.json", files={"file": ("manifest.json", b"{}", "application/json")})
+
+    assert client.get("/v1/files/manifest.json").content == b"{}"
+    assert client.head("/v1/files/manifest.json").status_code == status.HTTP_200_OK
+    assert client.get("/v1/files").json()["files"][0]["file_path"] == "manifest.json"
+
+    stats = client.get("/v1/read-coalescing/stats").json()
+    assert stats == {"enabled": True, "calls": 3, "coalesced": 0, "unshared_bodies": 0}
+
+
+def test_list_files_uses_the_listing_cache_and_prefetches_the_next_page(make_client):
+    client = make_client(listing_cache_ttl_seconds=60)
+    s3_client = client.app.state.s3_client
+    for i in range(15):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"test_file_{i:02}.txt", Body=TEST_FILE_CONTENT)
+
+    first_page = client.get("/v1/files").json()
+    with count_s3_calls(s3_client) as s3_calls:
+        assert client.get("/v1/files").json() == first_page
+        second_page = client.get(f"/v1/files?page_token={first_page['next_page_token']}").json()
+    assert s3_calls == {}
+    assert len(second_page["files"]) == 5
+
+    # uploads through the app invalidate the cached pages
+    client.put("/v1/files/test_file_99.txt", files={"file": ("test_file_99.txt", TEST_FILE_CONTENT, "text/plain")})
+    second_page = client.get(f"/v1/files?page_token={first_page['next_page_token']}").json()
+    assert len(second_page["files"]) == 6
+
+
+def test_pages_following_a_page_token_keep_the_page_size_and_are_prefetched(make_client):
+    client = make_client(listing_cache_ttl_seconds=60)
+    s3_client = client.app.state.s3_client
+    for i in range(40):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"test_file_{i:02}.txt", Body=TEST_FILE_CONTENT)
+
+    first_page = client.get("/v1/files?page_size=15").json()
+    with count_s3_calls(s3_client) as s3_calls:
+        second_page = client.get(f"/v1/files?page_token={first_page['next_page_token']}").json()
+        third_page = client.get(f"/v1/files?page_token={second_page['next_page_token']}").json()
+    # both pages were prefetched: the only call is the prefetch of the third page, after the second request
+    assert s3_calls == {"ListObjectsV2": 1}
+    assert client.app.state.listing_cache.stats.hits == 2
+    assert [file["file_path"] for file in second_page["files"]] == [f"test_file_{i:02}.txt" for i in range(15, 30)]
+    assert len(third_page["files"]) == 10
+
+
+def test_stream_files_lists_every_file_as_ndjson(client: TestClient):
+    s3_client = client.app.state.s3_client
+    for i in range(15):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"stream/test_file_{i:02}.txt", Body=TEST_FILE_CONTENT)
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="elsewhere.txt", Body=TEST_FILE_CONTENT)
+
+    response = client.get("/v1/listings?directory=stream/")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    files = [json.loads(line) for line in response.text.splitlines()]
+    assert [file["file_path"] for file in files] == [f"stream/test_file_{i:02}.txt" for i in range(15)]
+    assert files[0]["size_bytes"] == len(TEST_FILE_CONTENT)
+
+    assert client.get("/v1/listings?directory=nothing-here/").text == ""
+
+
+@pytest.mark.parametrize("listing_max_concurrent_shards", [1, 4])
+def test_stream_files_lists_sub_directories_in_key_order(make_client, listing_max_concurrent_shards: int):
+    client = make_client(listing_max_concurrent_shards=listing_max_concurrent_shards)
+    keys = sorted(f"inventory/{folder}/file_{i}.txt" for folder in ("a", "b", "c", "d", "e", "f") for i in range(3))
+    keys += ["inventory/top_level.txt"]
+    for key in keys:
+        client.app.state.s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=TEST_FILE_CONTENT)
+
+    response = client.get("/v1/listings?directory=inventory/")
+
+    assert [json.loads(line)["file_path"] for line in response.text.splitlines()] == sorted(keys)
+
+
+def test_list_files_non_recursively(client: TestClient):
+    s3_client = client.app.state.s3_client
+    keys = [f"browse/file_{i:02}.txt" for i in range(6)] + [f"browse/folder_{i:02}/nested.txt" for i in range(6)]
+    keys += ["browse/folder_00/deeper/nested.txt", "elsewhere.txt"]
+    for key in keys:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=TEST_FILE_CONTENT)
+
+    response = client.get("/v1/files?directory=browse/&recursive=false")
+    assert response.status_code == status.HTTP_200_OK
+    first_page = response.json()
+    second_page = client.get(f"/v1/files?page_token={first_page['next_page_token']}").json()
+
+    # files and sub-directories share the page size
+    assert len(first_page["files"]) + len(first_page["directories"]) == 10
+    assert [file["file_path"] for file in first_page["files"] + second_page["files"]] == keys[:6]
+    assert first_page["directories"] + second_page["directories"] == [f"browse/folder_{i:02}/" for i in range(6)]
+    assert second_page["next_page_token"] is None
+
+    # recursive listings return no directories
+    response = client.get("/v1/files?directory=browse/&page_size=100").json()
+    assert response["directories"] == []
+    assert len(response["files"]) == 13
+
+
+def test_bulk_delete_files_by_path(client: TestClient):
+    s3_client = client.app.state.s3_client
+    keys = [f"bulk/file_{i}.txt" for i in range(4)]
+    for key in keys:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=TEST_FILE_CONTENT)
+
+    response = client.post("/v1/bulk/delete", json={"file_paths": keys[:3]})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    (progress,) = [json.loads(line) for line in response.text.splitlines()]
+    assert progress == {"deleted": keys[:3], "errors": [], "total_deleted": 3, "total_errors": 0}
+    assert [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)["Contents"]] == keys[3:]
+
+
+def test_bulk_delete_directory_in_batches(make_client):
+    client = make_client(listing_cache_ttl_seconds=60)
+    s3_client = client.app.state.s3_client
+    keys = [f"bulk/file_{i:04}.txt" for i in range(1001)]
+    for key in keys:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=b"")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="bulky.txt", Body=b"")
+    # cached listings of the directory are dropped
+    assert len(client.get("/v1/files?directory=bulk/").json()["files"]) == 10
+
+    response = client.post("/v1/bulk/delete", json={"directory": "bulk/"})
+
+    batches = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(len(batch["deleted"]) for batch in batches) == [1, 1000]
+    assert sorted(key for batch in batches for key in batch["deleted"]) == keys
+    assert batches[-1]["total_deleted"] == 1001
+    assert client.get("/v1/files?directory=bulk").json()["files"] == [
+        {"file_path": "bulky.txt", "last_modified": ANY, "size_bytes": 0}
+    ]
+
+
+def test_bulk_upload_files(client: TestClient):
+    client.put("/v1/files/batch/b.txt", files={"file": ("b.txt", b"old", TEST_FILE_CONTENT_TYPE)})
+
+    response = client.post(
+        "/v1/bulk/upload",
+        data={"directory": "batch/"},
+        files=[
+            ("files", ("a.txt", b"a", TEST_FILE_CONTENT_TYPE)),
+            ("files", ("b.txt", b"b", TEST_FILE_CONTENT_TYPE)),
+            ("files", ("nested/c.json", b"{}", "application/json")),
+        ],
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "files": [
+            {"file_path": "batch/a.txt", "message": "New file uploaded at path : /batch/a.txt", "status_code": 201},
+            {"file_path": "batch/b.txt", "message": "Existing file updated at path: /batch/b.txt", "status_code": 200},
+            {
+                "file_path": "batch/nested/c.json",
+                "message": "New file uploaded at path : /batch/nested/c.json",
+                "status_code": 201,
+            },
+        ],
+        "total_uploaded": 3,
+        "total_errors": 0,
+    }
+    assert client.get("/v1/files/batch/b.txt").content == b"b"
+    response = client.get("/v1/files/batch/nested/c.json")
+    assert response.content == b"{}"
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_bulk_upload_tar(make_client):
+    client = make_client(upload_use_conditional_put=True)
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        for i in range(50):
+            info = tarfile.TarInfo(f"./file_{i:02}.txt")
+            info.size = 4
+            tar.addfile(info, io.BytesIO(b"%04d" % i))
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.post(
+            "/v1/bulk/upload/tar?directory=ingest/",
+            content=archive.getvalue(),
+            headers={"Content-Type": "application/x-tar"},
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    body = response.json()
+    assert body["total_uploaded"] == 50
+    assert [file["file_path"] for file in body["files"]] == [f"ingest/file_{i:02}.txt" for i in range(50)]
+    # one put_object per new file
+    assert s3_calls == {"PutObject": 50}
+    response = client.get("/v1/files/ingest/file_07.txt")
+    assert response.content == b"0007"
+    assert response.headers["content-type"].startswith("text/plain")
+
+
+@pytest.mark.parametrize("upload_deduplication", [False, True])
+def test_bulk_upload_tar_streams_files_larger_than_a_part(make_client, upload_deduplication: bool):
+    client = make_client(upload_part_size_bytes=5 * 1024 * 1024, upload_deduplication=upload_deduplication)
+    large_content = bytes(range(256)) * (6 * 1024 * 4)
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        for path, content in [("a.txt", b"a"), ("large.bin", large_content), ("b.txt", b"b")]:
+            info = tarfile.TarInfo(path)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.post("/v1/bulk/upload/tar", content=archive.getvalue())
+
+    assert response.json()["total_uploaded"] == 3
+    # the large file went up in parts, as it was read from the archive
+    assert s3_calls["CreateMultipartUpload"] == 1
+    assert s3_calls["UploadPart"] == 2
+    assert client.get("/v1/files/large.bin").content == large_content
+    assert client.get("/v1/files/b.txt").content == b"b"
+
+
+def test_bulk_metadata(client: TestClient):
+    s3_client = client.app.state.s3_client
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="meta/a.txt", Body=b"abc")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="meta/b.txt", Body=b"")
+
+    with count_s3_calls(s3_client) as s3_calls:
+        response = client.post(
+            "/v1/bulk/metadata", json={"file_paths": ["meta/a.txt", "meta/missing.txt", "meta/b.txt", "meta/a.txt"]}
+        )
+
+    assert response.status_code == status.HTTP_200_OK
+    files = response.json()["files"]
+    assert [(file["file_path"], file["exists"], file["size_bytes"]) for file in files] == [
+        ("meta/a.txt", True, 3),
+        ("meta/missing.txt", False, None),
+        ("meta/b.txt", True, 0),
+        ("meta/a.txt", True, 3),
+    ]
+    assert files[0]["etag"] == client.head("/v1/files/meta/a.txt").headers["ETag"]
+    assert s3_calls == {"HeadObject": 3}
+
+
+def test_bulk_metadata_uses_the_listing_cache(make_client):
+    client = make_client(listing_cache_ttl_seconds=60)
+    s3_client = client.app.state.s3_client
+    for name in ("a", "b", "c"):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"meta/{name}.txt", Body=b"abc")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="other.txt", Body=b"abc")
+    client.get("/v1/files?directory=meta/")
+
+    with count_s3_calls(s3_client) as s3_calls:
+        response = client.post(
+            "/v1/bulk/metadata", json={"file_paths": ["meta/a.txt", "meta/missing.txt", "other.txt"]}
+        )
+
+    assert [file["exists"] for file in response.json()["files"]] == [True, False, True]
+    # meta/ was listed in full, so only other.txt needs a head_object call
+    assert s3_calls == {"HeadObject": 1}
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_download_directory_archive(client: TestClient, archive_format: str):
+    s3_client = client.app.state.s3_client
+    contents = {"photos/2024/a.jpg": b"a" * 100, "photos/2024/trip/b.jpg": b"b" * 2000, "photos/2025/c.jpg": b"c"}
+    for key, content in contents.items():
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=content)
+
+    response = client.get(f"/v1/archives/photos/2024?format={archive_format}")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-disposition"] == f'attachment; filename="2024.{archive_format}"'
+    if archive_format == "zip":
+        assert response.headers["content-type"] == "application/zip"
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            files = {name: archive.read(name) for name in archive.namelist()}
+    else:
+        assert response.headers["content-type"] == "application/x-tar"
+        with tarfile.open(fileobj=io.BytesIO(response.content)) as archive:
+            files = {member.name: archive.extractfile(member).read() for member in archive}
+    assert files == {"a.jpg": b"a" * 100, "trip/b.jpg": b"b" * 2000}
+
+
+def test_copy_and_move_file(client: TestClient):
+    client.put("/v1/files/docs/a.md", files={"file": ("a.md", b"# a", "text/markdown")})
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.post("/v1/files/docs/a.md/copy", json={"destination": "docs/b.md"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"file_path": "docs/b.md", "message": "File copied from /docs/a.md to /docs/b.md"}
+    assert s3_calls == {"HeadObject": 1, "CopyObject": 1}
+
+    response = client.post("/v1/files/docs/a.md/move", json={"destination": "archive/a.md"})
+    assert response.json()["message"] == "File moved from /docs/a.md to /archive/a.md"
+
+    assert client.get("/v1/files/docs/a.md").status_code == status.HTTP_404_NOT_FOUND
+    for path in ("docs/b.md", "archive/a.md"):
+        response = client.get(f"/v1/files/{path}")
+        assert response.content == b"# a"
+        assert response.headers["content-type"].startswith("text/markdown")
+
+
+@pytest.mark.parametrize("operation", ["copy", "move"])
+def test_bulk_copy_and_move_directory(client: TestClient, operation: str):
+    s3_client = client.app.state.s3_client
+    keys = [f"photos/{i}.jpg" for i in range(3)] + ["photos/2024/trip.jpg"]
+    for key in keys:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=key.encode())
+
+    response = client.post(
+        f"/v1/bulk/{operation}", json={"source_directory": "photos", "destination_directory": "backup/photos"}
+    )
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    (progress,) = [json.loads(line) for line in response.text.splitlines()]
+    assert progress["copied"] == [{"source": key, "destination": f"backup/{key}"} for key in sorted(keys)]
+    assert (progress["total_copied"], progress["total_errors"]) == (4, 0)
+    assert client.get("/v1/files/backup/photos/2024/trip.jpg").content == b"photos/2024/trip.jpg"
+    remaining = [file["file_path"] for file in client.get("/v1/files?directory=photos/&page_size=100").json()["files"]]
+    assert remaining == (keys if operation == "copy" else [])
+
+
+def test_get_file_redirects_to_presigned_url(client: TestClient):
+    client.put("/v1/files/docs/a.md", files={"file": ("a.md", b"# a", "text/markdown")})
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.get("/v1/files/docs/a.md?redirect=true", follow_redirects=False)
+
+    assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    assert "/docs/a.md?" in response.headers["location"]
+    assert "X-Amz-Signature=" in response.headers["location"]
+    # signing happens locally
+    assert s3_calls == {}
+
+
+def test_presigned_upload_and_download_urls(client: TestClient):
+    response = client.post(
+        "/v1/presigned-urls/upload",
+        json={
+            "file_path": "docs/a.md",
+            "content_type": "text/markdown",
+            "content_length": 3,
+            "expires_in_seconds": 60,
+        },
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    upload = response.json()
+    assert upload["method"] == "PUT"
+    assert upload["headers"] == {"Content-Type": "text/markdown", "Content-Length": "3"}
+    assert requests.put(upload["url"], data=b"# a", headers=upload["headers"], timeout=5).status_code == 200
+
+    download = client.post("/v1/presigned-urls/download", json={"file_path": "docs/a.md"}).json()
+    assert download["method"] == "GET"
+    assert requests.get(download["url"], timeout=5).content == b"# a"
+
+
+def test_presigned_multipart_upload(client: TestClient):
+    part_contents = [b"a" * 5 * 1024 * 1024, b"b"]
+    response = client.post(
+        "/v1/presigned-urls/multipart-upload",
+        json={"file_path": "big.bin", "content_type": "application/octet-stream", "part_count": 2},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    upload = response.json()
+    assert [part["part_number"] for part in upload["parts"]] == [1, 2]
+    parts = [
+        {
+            "part_number": part["part_number"],
+            "etag": requests.put(part["url"], data=content, timeout=5).headers["ETag"],
+        }
+        for part, content in zip(upload["parts"], part_contents)
+    ]
+
+    response = client.post(
+        f"/v1/multipart-uploads/{upload['upload_id']}/complete", json={"file_path": "big.bin", "parts": parts}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["file_path"] == "big.bin"
+    response = client.head("/v1/files/big.bin")
+    assert response.headers["content-length"] == str(5 * 1024 * 1024 + 1)
+    assert response.headers["content-type"] == "application/octet-stream"
+
+
+def test_abort_presigned_multipart_upload(client: TestClient):
+    upload = client.post("/v1/presigned-urls/multipart-upload", json={"file_path": "big.bin", "part_count": 1}).json()
+
+    response = client.delete(f"/v1/multipart-uploads/{upload['upload_id']}?file_path=big.bin")
+
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    s3_client = client.app.state.s3_client
+    assert "Uploads" not in s3_client.list_multipart_uploads(Bucket=TEST_BUCKET_NAME)
+
+
+def test_compressed_upload_is_served_encoded_or_decompressed(make_client):
+    client = make_client(upload_compression="gzip", object_cache_max_size_bytes=0)
+    content = b'{"id": 1, "name": "example"}\n' * 1000
+    client.put("/v1/files/logs/app.ndjson", files={"file": ("app.ndjson", content, "application/x-ndjson")})
+
+    stored = client.app.state.s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="logs/app.ndjson")
+    assert stored["ContentEncoding"] == "gzip"
+    assert gzip.decompress(stored["Body"].read()) == content
+
+    response = client.get("/v1/files/logs/app.ndjson", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-length"] == str(stored["ContentLength"])
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == content
+
+    response = client.get("/v1/files/logs/app.ndjson", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.content == content
+
+    # ranges of the decompressed file cannot be served, so the whole file is
+    response = client.get("/v1/files/logs/app.ndjson", headers={"Accept-Encoding": "identity", "Range": "bytes=0-9"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == content
+
+    response = client.head("/v1/files/logs/app.ndjson", headers={"Accept-Encoding": "identity"})
+    assert "content-length" not in response.headers
+    response = client.head("/v1/files/logs/app.ndjson", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("object_cache_max_size_bytes", [0, 1024 * 1024])
+def test_incompressible_and_small_uploads_are_stored_as_is(make_client, object_cache_max_size_bytes: int):
+    client = make_client(upload_compression="gzip", object_cache_max_size_bytes=object_cache_max_size_bytes)
+    client.put("/v1/files/image.png", files={"file": ("image.png", b"\x89PNG" * 1000, "image/png")})
+    client.put("/v1/uploads/small.txt", content=b"small", headers={"Content-Type": "text/plain"})
+
+    s3_client = client.app.state.s3_client
+    assert "ContentEncoding" not in s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="image.png")
+    # streamed uploads are compressed whatever their size
+    assert s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="small.txt")["ContentEncoding"] == "gzip"
+    for _ in range(2):
+        response = client.get("/v1/files/small.txt", headers={"Accept-Encoding": "identity"})
+        assert response.content == b"small"
+        assert "content-encoding" not in response.headers
+
+
+def test_deduplicated_uploads_share_their_content(make_client):
+    client = make_client(upload_deduplication=True)
+    content = b"identical artifact" * 100
+    for path in ("builds/1/app.bin", "builds/2/app.bin"):
+        response = client.put(f"/v1/files/{path}", files={"file": ("app.bin", content, "application/octet-stream")})
+        assert response.status_code == status.HTTP_201_CREATED
+
+    response = client.get("/v1/files/builds/2/app.bin")
+    assert response.content == content
+    assert response.headers["content-length"] == str(len(content))
+    assert client.get("/v1/files/builds/1/app.bin", headers={"Range": "bytes=100-199"}).content == content[100:200]
+    assert client.head("/v1/files/builds/1/app.bin").headers["content-length"] == str(len(content))
+    response = client.get("/v1/files/builds/1/app.bin?redirect=true", follow_redirects=False)
+    assert requests.get(response.headers["location"], timeout=5).content == content
+
+    # the blobs are left out of listings, and files have the size of their content
+    response = client.get("/v1/files?page_size=100")
+    assert [(file["file_path"], file["size_bytes"]) for file in response.json()["files"]] == [
+        ("builds/1/app.bin", len(content)),
+        ("builds/2/app.bin", len(content)),
+    ]
+    assert client.get("/v1/files?recursive=false").json()["directories"] == ["builds/"]
+
+    client.post("/v1/files/builds/1/app.bin/move", json={"destination": "releases/app.bin"})
+    client.delete("/v1/files/builds/2/app.bin")
+    assert client.get("/v1/files/releases/app.bin").content == content
+    client.delete("/v1/files/releases/app.bin")
+
+    # the last file pointing to the blob took it along
+    s3_client = client.app.state.s3_client
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)
+
+
+def test_deduplicated_files_release_their_blob_on_every_overwrite_and_delete(make_client):
+    client = make_client(upload_deduplication=True)
+    s3_client = client.app.state.s3_client
+
+    def stored_keys() -> list[str]:
+        return [obj["Key"] for obj in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME).get("Contents", [])]
+
+    # bulk uploads are deduplicated too
+    content = b"identical artifact" * 100
+    response = client.post(
+        "/v1/bulk/upload", files=[("files", (f"{i}.bin", content, "application/octet-stream")) for i in range(5)]
+    )
+    assert response.json()["total_uploaded"] == 5
+    assert len([key for key in stored_keys() if not key.startswith(".blobs/")]) == 5
+    assert len([key for key in stored_keys() if ".refs/" not in key and key.startswith(".blobs/")]) == 1
+
+    # overwriting pointers with streamed and multipart uploads releases them; tar uploads are deduplicated
+    client.put("/v1/uploads/0.bin", content=b"streamed", headers={"Content-Type": "text/plain"})
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        info = tarfile.TarInfo("1.bin")
+        info.size = len(b"archived")
+        tar.addfile(info, io.BytesIO(b"archived"))
+    client.post("/v1/bulk/upload/tar", content=archive.getvalue())
+    upload = client.post("/v1/presigned-urls/multipart-upload", json={"file_path": "2.bin", "part_count": 1}).json()
+    etag = requests.put(upload["parts"][0]["url"], data=b"in parts", timeout=5).headers["ETag"]
+    client.post(
+        f"/v1/multipart-uploads/{upload['upload_id']}/complete",
+        json={"file_path": "2.bin", "parts": [{"part_number": 1, "etag": etag}]},
+    )
+    assert sorted(key.rsplit("/", 1)[1] for key in stored_keys() if ".refs/" in key) == ["1.bin", "3.bin", "4.bin"]
+
+    # and so does deleting them in bulk, which took the blob along with the last one
+    response = client.post("/v1/bulk/delete", json={"file_paths": ["3.bin", "4.bin"]})
+    assert json.loads(response.text.splitlines()[-1])["total_deleted"] == 2
+    # only the blob of the archived file, and its reference, are left
+    assert len([key for key in stored_keys() if key.startswith(".blobs/")]) == 2
+    assert client.get("/v1/files/1.bin").content == b"archived"
+    assert [file["file_path"] for file in client.get("/v1/files?page_size=100").json()["files"]] == [
+        "0.bin",
+        "1.bin",
+        "2.bin",
+    ]
+
+
+def test_deduplicated_files_overwritten_by_copies_release_their_blob(make_client):
+    client = make_client(upload_deduplication=True)
+    for path, content in [("a.txt", b"AAAA"), ("b.txt", b"BBBB"), ("src/x.txt", b"XXXX"), ("dst/x.txt", b"YYYY")]:
+        client.put(f"/v1/files/{path}", files={"file": (path, content, "text/plain")})
+    # copying a file onto a pointer to the same content keeps their shared blob
+    client.put("/v1/files/c.txt", files={"file": ("c.txt", b"AAAA", "text/plain")})
+
+    client.post("/v1/files/a.txt/copy", json={"destination": "b.txt"})
+    client.post("/v1/files/a.txt/copy", json={"destination": "c.txt"})
+    client.post("/v1/bulk/copy", json={"source_directory": "src/", "destination_directory": "dst/"})
+
+    assert client.get("/v1/files/b.txt").content == b"AAAA"
+    assert client.get("/v1/files/c.txt").content == b"AAAA"
+    assert client.get("/v1/files/dst/x.txt").content == b"XXXX"
+    for path in ("a.txt", "b.txt", "c.txt", "src/x.txt", "dst/x.txt"):
+        client.delete(f"/v1/files/{path}")
+    assert "Contents" not in client.app.state.s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)
+
+
+def test_presigned_download_urls_of_deduplicated_files_are_for_their_blob(make_client):
+    client = make_client(upload_deduplication=True)
+    client.put("/v1/files/a.txt", files={"file": ("a.txt", b"AAAA", "text/plain")})
+
+    download = client.post("/v1/presigned-urls/download", json={"file_path": "a.txt"}).json()
+
+    blob_key = client.app.state.s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="a.txt")["Body"].read().decode()
+    assert urlparse(download["url"]).path.endswith(f"/{blob_key}")
+    response = requests.get(download["url"], timeout=5)
+    assert response.content == b"AAAA"
+    assert response.headers["Content-Type"] == "text/plain"
@@ -0,0 +1,123 @@
+"""Test HTTP range requests against `GET /v1/files/{file_path}`."""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from tests.consts import TEST_BUCKET_NAME
+
+TEST_FILE_PATH = "ranges/test_file.txt"
+TEST_FILE_CONTENT = b"0123456789abcdefghijklmnopqrstuvwxyz"
+TEST_FILE_CONTENT_TYPE = "text/plain"
+
+
+def put_test_file(client: TestClient) -> None:
+    client.app.state.s3_client.put_object(
+        Bucket=TEST_BUCKET_NAME,
+        Key=TEST_FILE_PATH,
+        Body=TEST_FILE_CONTENT,
+        ContentType=TEST_FILE_CONTENT_TYPE,
+    )
+
+
+def test_get_and_head_advertise_range_support(client: TestClient):
+    put_test_file(client)
+
+    assert client.get(f"/v1/files/{TEST_FILE_PATH}").headers["Accept-Ranges"] == "bytes"
+    assert client.head(f"/v1/files/{TEST_FILE_PATH}").headers["Accept-Ranges"] == "bytes"
+
+
+def test_get_single_range(client: TestClient):
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == TEST_FILE_CONTENT[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{len(TEST_FILE_CONTENT)}"
+    assert response.headers["Content-Length"] == "10"
+
+
+def test_get_suffix_range(client: TestClient):
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=-4"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == b"wxyz"
+
+
+def test_get_multiple_ranges(client: TestClient):
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=0-2,-3"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+
+    content_type, _, boundary = response.headers["Content-Type"].partition("; boundary=")
+    assert content_type == "multipart/byteranges"
+    assert int(response.headers["Content-Length"]) == len(response.content)
+    size = len(TEST_FILE_CONTENT)
+    assert response.content == (
+        f"--{boundary}\r\nContent-Type: {TEST_FILE_CONTENT_TYPE}\r\nContent-Range: bytes 0-2/{size}\r\n\r\n".encode()
+        + b"012\r\n"
+        + f"--{boundary}\r\nContent-Type: {TEST_FILE_CONTENT_TYPE}\r\nContent-Range: bytes {size - 3}-{size - 1}/{size}\r\n\r\n".encode()
+        + b"xyz\r\n"
+        + f"--{boundary}--\r\n".encode()
+    )
+
+
+def test_get_multiple_ranges_with_read_coalescing(make_client):
+    # the coalescer hands out buffered bodies rather than botocore's StreamingBody
+    client = make_client(read_coalescing=True)
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=0-4,10-14"})
+
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert int(response.headers["Content-Length"]) == len(response.content)
+    size = len(TEST_FILE_CONTENT)
+    assert f"Content-Range: bytes 0-4/{size}\r\n\r\n01234\r\n".encode() in response.content
+    assert f"Content-Range: bytes 10-14/{size}\r\n\r\nabcde\r\n".encode() in response.content
+
+
+def test_get_unsatisfiable_range(client: TestClient):
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=1000-"})
+    assert response.status_code == status.HTTP_416_RANGE_NOT_SATISFIABLE
+    assert response.headers["Content-Range"] == f"bytes */{len(TEST_FILE_CONTENT)}"
+
+
+def test_unsatisfiable_ranges_are_dropped_if_others_are_satisfiable(client: TestClient):
+    put_test_file(client)
+    size = len(TEST_FILE_CONTENT)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=999999-,0-4"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.headers["Content-Range"] == f"bytes 0-4/{size}"
+    assert response.content == b"01234"
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=999999-,0-2,1000-2000,-3"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert b"Content-Range: bytes 0-2/" in response.content
+    assert b"Content-Range: bytes 1000-" not in response.content
+    assert response.content.count(b"Content-Range") == 2
+
+
+def test_multiple_unsatisfiable_ranges(client: TestClient):
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=1000-,2000-2001"})
+
+    assert response.status_code == status.HTTP_416_RANGE_NOT_SATISFIABLE
+    assert response.headers["Content-Range"] == f"bytes */{len(TEST_FILE_CONTENT)}"
+
+
+def test_malformed_range_is_ignored(client: TestClient):
+    put_test_file(client)
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "lines=1-2"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == TEST_FILE_CONTENT
+
+
+def test_range_of_missing_file(client: TestClient):
+    response = client.get("/v1/files/non_existent_file.txt", headers={"Range": "bytes=0-10"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
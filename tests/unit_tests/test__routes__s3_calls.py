@@ -0,0 +1,93 @@
+"""Count the S3 calls each route makes, since S3 round-trips dominate the latency of every route."""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import count_s3_calls
+
+TEST_FILE_PATH = "test_file.txt"
+TEST_FILE_CONTENT = b"test content"
+TEST_FILE_CONTENT_TYPE = "text/plain"
+
+
+def put_test_file(client: TestClient) -> None:
+    client.app.state.s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=TEST_FILE_PATH, Body=TEST_FILE_CONTENT)
+
+
+def test_get_file_makes_a_single_get_object_call(client: TestClient):
+    put_test_file(client)
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.get(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.status_code == status.HTTP_200_OK
+    assert s3_calls == {"GetObject": 1}
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.get("/v1/files/non_existent_file.txt")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.json() == {"detail": "File not found"}
+    assert s3_calls == {"GetObject": 1}
+
+
+def test_head_file_makes_a_single_head_object_call(client: TestClient):
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.head("/v1/files/non_existent_file.txt")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert s3_calls == {"HeadObject": 1}
+
+
+def test_delete_file_checks_existence_by_default(client: TestClient):
+    put_test_file(client)
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.delete(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert s3_calls == {"HeadObject": 1, "DeleteObject": 1}
+
+
+def test_delete_file_without_existence_check_makes_a_single_call(make_client):
+    client: TestClient = make_client(delete_missing_file_returns_404=False)
+    put_test_file(client)
+
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.delete(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert s3_calls == {"DeleteObject": 1}
+
+    response = client.delete("/v1/files/non_existent_file.txt")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_upload_file_checks_existence_by_default(client: TestClient):
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.put(
+            f"/v1/files/{TEST_FILE_PATH}",
+            files={"file": (TEST_FILE_PATH, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+        )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert s3_calls == {"HeadObject": 1, "PutObject": 1}
+
+
+def test_upload_file_with_conditional_put(make_client):
+    client: TestClient = make_client(upload_use_conditional_put=True)
+
+    # new files are written with one conditional put_object
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.put(
+            f"/v1/files/{TEST_FILE_PATH}",
+            files={"file": (TEST_FILE_PATH, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+        )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert s3_calls == {"PutObject": 1}
+
+    # existing files are rejected by the condition and then overwritten
+    with count_s3_calls(client.app.state.s3_client) as s3_calls:
+        response = client.put(
+            f"/v1/files/{TEST_FILE_PATH}",
+            files={"file": (TEST_FILE_PATH, b"updated content", TEST_FILE_CONTENT_TYPE)},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["message"] == f"Existing file updated at path: /{TEST_FILE_PATH}"
+    assert s3_calls == {"PutObject": 2}
+    assert client.get(f"/v1/files/{TEST_FILE_PATH}").content == b"updated content"
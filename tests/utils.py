@@ -1,3 +1,7 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator
+
 import boto3
 
 
@@ -8,4 +12,21 @@ def delete_s3_bucket(bucket_name: str) -> None:
     s3 = boto3.resource("s3")
     bucket = s3.Bucket(bucket_name)
     bucket.objects.all().delete()
-    bucket.delete()
\ No newline at end of file
+    bucket.delete()
+
+
+@contextmanager
+def count_s3_calls(s3_client) -> Iterator[Counter]:
+    """
+    Count the S3 API calls made through `s3_client`, keyed by operation name, e.g. "HeadObject".
+    """
+    calls: Counter = Counter()
+
+    def on_call(event_name: str, **kwargs) -> None:  # pylint: disable=unused-argument
+        calls[event_name.rsplit(".", 1)[-1]] += 1
+
+    s3_client.meta.events.register("before-call.s3", on_call)
+    try:
+        yield calls
+    finally:
+        s3_client.meta.events.unregister("before-call.s3", on_call)